@@ -6,20 +6,81 @@ From: https://github.com/microsoft/presidio/blob/main/presidio-analyzer/app.py
 import json
 import logging
 import os
+import threading
+import time
+from contextlib import nullcontext
 from logging.config import fileConfig
 from pathlib import Path
 
-from flask import Flask, Response, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from presidio_analyzer import AnalyzerEngine, AnalyzerRequest
-from utils.engine_factory import create_analyzer_engine
+from core.metrics import AnalyzerMetrics, metrics_available
+from core.micro_batcher import MicroBatcher
+from core.model_registry import model_registry
+from core.result_cache import AnalysisCache, file_fingerprint
+from core.warmup import warm_up_engine
+from utils.engine_factory import (
+    DEFAULT_PROFILE_KEY,
+    analyzer_profiles,
+    create_analyzer_engine,
+    resolve_analyzer_conf_file,
+)
 from werkzeug.exceptions import HTTPException
 
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DEFAULT_PORT = "3000"
 
+# Micro-batching of concurrent /analyze requests, disabled with a max wait of 0
+DEFAULT_MICRO_BATCH_MAX_WAIT_MS = "0"
+DEFAULT_MICRO_BATCH_MAX_SIZE = "32"
+DEFAULT_MICRO_BATCH_TIMEOUT_SECONDS = "300"
+
+# Result cache in front of the engine, disabled with a size of 0
+DEFAULT_ANALYSIS_CACHE_SIZE = "0"
+DEFAULT_ANALYSIS_CACHE_TTL_SECONDS = "0"
+DEFAULT_ANALYSIS_CACHE_DISK_SIZE = "100000"
+
 LOGGING_CONF_FILE = "logging.ini"
 
+# Warm-up of the models before the server reports ready, run in the background
+# unless deferred (Gunicorn warms up each worker after the fork, see gunicorn.conf.py)
+DEFAULT_WARMUP = "true"
+DEFAULT_DEFER_WARMUP = "false"
+
+# Prometheus metrics on /metrics, if prometheus_client is installed
+DEFAULT_METRICS = "true"
+
+# Key of the Server in the extensions of its Flask app
+SERVER_EXTENSION = "guard_server"
+
+# Full results unless a request sets "compact", compact results (entity_type, start, end, score) are opt-in
+DEFAULT_COMPACT_RESPONSES = "false"
+COMPACT_FIELD = "compact"
+
+# Request field asking for the timing breakdown of the analysis ("profile" selects the engine profile)
+TIMING_FIELD = "timing"
+
+# Request field selecting the engine profile (guard.profiles of the analyzer configuration)
+PROFILE_FIELD = "profile"
+
+# Request fields passed on to AnalyzerEngine.analyze, they also become part of the cache key
+ANALYZE_OPTIONS = (
+    "entities",
+    "score_threshold",
+    "return_decision_process",
+    "ad_hoc_recognizers",
+    "context",
+    "allow_list",
+    "allow_list_match",
+    "regex_flags",
+)
+
 WELCOME_MESSAGE = r"""
     
  ________  ___  ___  ________  ________  ________     
@@ -46,17 +107,111 @@ class Server:
         self.logger.setLevel(os.environ.get("LOG_LEVEL", self.logger.level))
         self.app = Flask(__name__)
 
-        # Init the analyzer engine
+        # Init the analyzer engines, one per profile (GUARD_PROFILES limits the profiles served)
         self.logger.info("Initializing analyzer engine...")
-        self.engine:AnalyzerEngine = create_analyzer_engine(logger=self.logger)
+        self.engines = self.create_engines()
+        self.engine:AnalyzerEngine = self.engines[self.default_profile]
+
+        micro_batch_max_wait_ms = float(
+            os.environ.get("MICRO_BATCH_MAX_WAIT_MS", DEFAULT_MICRO_BATCH_MAX_WAIT_MS)
+        )
+        self.micro_batchers = {}
+        if micro_batch_max_wait_ms > 0:
+            self.micro_batchers = {
+                profile: MicroBatcher(
+                    engine,
+                    max_wait_ms=micro_batch_max_wait_ms,
+                    max_batch_size=int(
+                        os.environ.get("MICRO_BATCH_MAX_SIZE", DEFAULT_MICRO_BATCH_MAX_SIZE)
+                    ),
+                    timeout_seconds=float(
+                        os.environ.get("MICRO_BATCH_TIMEOUT_SECONDS", DEFAULT_MICRO_BATCH_TIMEOUT_SECONDS)
+                    ),
+                    logger=self.logger,
+                )
+                for profile, engine in self.engines.items()
+            }
+            self.logger.info(
+                "Micro-batching enabled (max wait %sms, max size %s)",
+                micro_batch_max_wait_ms,
+                self.micro_batchers[self.default_profile].max_batch_size,
+            )
+
+        analysis_cache_size = int(
+            os.environ.get("ANALYSIS_CACHE_SIZE", DEFAULT_ANALYSIS_CACHE_SIZE)
+        )
+        self.cache = None
+        if analysis_cache_size > 0:
+            self.cache = AnalysisCache(
+                max_size=analysis_cache_size,
+                ttl_seconds=float(
+                    os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", DEFAULT_ANALYSIS_CACHE_TTL_SECONDS)
+                ),
+                fingerprint=file_fingerprint(resolve_analyzer_conf_file()),
+                disk_path=os.environ.get("ANALYSIS_CACHE_PATH"),
+                disk_max_size=int(
+                    os.environ.get("ANALYSIS_CACHE_DISK_SIZE", DEFAULT_ANALYSIS_CACHE_DISK_SIZE)
+                ),
+            )
+            self.logger.info("Analysis cache enabled: %s", self.cache.stats())
+
+        self.compact_responses = (
+            os.environ.get("COMPACT_RESPONSES", DEFAULT_COMPACT_RESPONSES).lower() == "true"
+        )
+
+        self.metrics = None
+        if os.environ.get("GUARD_METRICS", DEFAULT_METRICS).lower() == "true":
+            if metrics_available():
+                self.metrics = AnalyzerMetrics(model_registry, model_managers=self.model_managers)
+            else:
+                self.logger.warning("Metrics disabled, prometheus_client is not installed")
+
+        self.app.extensions[SERVER_EXTENSION] = self
+        self.ready = threading.Event()
+        self.warmup_durations = None
+        self.warmup_error = None
+        if os.environ.get("GUARD_WARMUP", DEFAULT_WARMUP).lower() != "true":
+            self.set_ready()
+        elif os.environ.get("GUARD_DEFER_WARMUP", DEFAULT_DEFER_WARMUP).lower() != "true":
+            threading.Thread(target=self.warm_up, name="guard-warmup", daemon=True).start()
     
         self.logger.info(WELCOME_MESSAGE)
 
+        @self.app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter()
+
+        @self.app.after_request
+        def observe_request(response: Response) -> Response:
+            if self.metrics and "request_started" in g:
+                self.metrics.observe_request(
+                    endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+                    status=response.status_code,
+                    payload_bytes=request.content_length or 0,
+                    seconds=time.perf_counter() - g.request_started,
+                )
+            return response
+
+        @self.app.route("/metrics", methods=["GET"])
+        def metrics() -> Response:
+            """Return the Prometheus metrics of the requests, the analysis stages and recognizers, and the models."""
+            if not self.metrics:
+                return jsonify(error="Metrics are disabled"), 404
+            data, content_type = self.metrics.exposition()
+            return Response(data, content_type=content_type)
+
         @self.app.route("/health")
         def health() -> str:
-            """Return basic health probe result."""
+            """Return basic health probe result, without touching the engine (liveness)."""
             return "Presidio Analyzer service is up"
 
+        @self.app.route("/ready")
+        def ready() -> tuple[Response, int]:
+            """Return whether the engine is warmed up and ready for traffic (readiness)."""
+            if not self.ready.is_set():
+                return jsonify(ready=False, error=self.warmup_error), 503
+            return jsonify(ready=True, warmup=self.warmup_durations), 200
+
         @self.app.route("/analyze", methods=["POST"])
         def analyze():
             """Execute the analyzer function."""
@@ -72,23 +227,46 @@ class Server:
             if 'language' not in request_json:
                 return jsonify(error="No language provided"), 400
             
+            profile = request_json.get(PROFILE_FIELD) or self.default_profile
+            if profile not in self.engines:
+                return jsonify(error=f"Unknown profile '{profile}'. Available: {list(self.engines)}"), 400
+
             try:
                 req_data = AnalyzerRequest(request_json)
+                options = self.request_options(request_json)
+
+                # Timed requests run through the engine on their own, without cache and micro-batching
+                timing = bool(request_json.get(TIMING_FIELD))
+                cache = self.cache if not timing else None
+
+                cache_key = None
+                if cache:
+                    cache_key = cache.make_key(
+                        text=req_data.text, language=req_data.language, profile=profile, **options
+                    )
+                    cached_results = cache.get(cache_key)
+                    if cached_results is not None:
+                        return self.results_response(cached_results, **self.response_options(request_json))
                 
-                recognizer_result_list = self.engine.analyze(
-                    text=req_data.text,
-                    language=req_data.language,
-                )
+                # Concurrent requests are coalesced into batches if micro-batching is enabled
+                micro_batcher = self.micro_batchers.get(profile) if not timing else None
+                analyze_fn = micro_batcher.analyze if micro_batcher else self.engines[profile].analyze
+                with self.collect_timings(profile, timing) as timings:
+                    recognizer_result_list = analyze_fn(
+                        text=req_data.text,
+                        language=req_data.language,
+                        **self.analyze_kwargs(req_data, options),
+                    )
 
-                return Response(
-                    json.dumps(
-                        recognizer_result_list,
-                        # security measure as the o doesn't always have a proper result object, due to unexpected behaviour of the custom analyzer engine. 
-                        default=lambda o: o.to_dict() if hasattr(o, "to_dict") else str(o),
-                        sort_keys=True,
-                    ),
-                    content_type="application/json",
-                )
+                if cache:
+                    recognizer_result_list = self.serialize_results(recognizer_result_list)
+                    cache.set(cache_key, recognizer_result_list)
+
+                if timing:
+                    return self.timed_results_response(
+                        recognizer_result_list, timings, **self.response_options(request_json)
+                    )
+                return self.results_response(recognizer_result_list, **self.response_options(request_json))
             except TypeError as te:
                 error_msg = (
                     f"Failed to parse /analyze request "
@@ -104,6 +282,115 @@ class Server:
                 )
                 return jsonify(error="An internal server error has occurred!"), 500
 
+        @self.app.route("/analyze/batch", methods=["POST"])
+        def analyze_batch():
+            """Execute the analyzer function on a list of texts."""
+            request_json = request.get_json()
+
+            if not request_json:
+                return jsonify(error="Invalid JSON"), 400
+
+            items = request_json.get("items") if isinstance(request_json, dict) else None
+            if not items or not isinstance(items, list):
+                return jsonify(error="No items provided"), 400
+
+            for index, item in enumerate(items):
+                if not isinstance(item, dict) or 'text' not in item:
+                    return jsonify(error=f"No text provided for item {index}"), 400
+
+                if 'language' not in item:
+                    return jsonify(error=f"No language provided for item {index}"), 400
+
+            profile = request_json.get(PROFILE_FIELD) or self.default_profile
+            if profile not in self.engines:
+                return jsonify(error=f"Unknown profile '{profile}'. Available: {list(self.engines)}"), 400
+
+            try:
+                # The analyze options of the request apply to all items
+                req_data = AnalyzerRequest(request_json)
+                options = self.request_options(request_json)
+                analyze_kwargs = self.analyze_kwargs(req_data, options)
+                timing = bool(request_json.get(TIMING_FIELD))
+                cache = self.cache if not timing else None
+
+                results = [None] * len(items)
+                cache_keys = [None] * len(items)
+
+                # Group the items by language, each group runs through the models at once
+                indices_by_language = {}
+                for index, item in enumerate(items):
+                    if cache:
+                        cache_keys[index] = cache.make_key(
+                            text=item["text"], language=item["language"], profile=profile, **options
+                        )
+                        results[index] = cache.get(cache_keys[index])
+                        if results[index] is not None:
+                            continue
+                    indices_by_language.setdefault(item["language"], []).append(index)
+
+                with self.collect_timings(profile, timing) as timings:
+                    for language, indices in indices_by_language.items():
+                        batch_results = self.engines[profile].analyze_batch(
+                            texts=[items[index]["text"] for index in indices],
+                            language=language,
+                            **analyze_kwargs,
+                        )
+                        for index, recognizer_result_list in zip(indices, batch_results):
+                            if cache:
+                                recognizer_result_list = self.serialize_results(recognizer_result_list)
+                                cache.set(cache_keys[index], recognizer_result_list)
+                            results[index] = recognizer_result_list
+
+                if timing:
+                    return self.timed_results_response(
+                        results, timings, **self.response_options(request_json)
+                    )
+                return self.results_response(results, **self.response_options(request_json))
+            except TypeError as te:
+                error_msg = (
+                    f"Failed to parse /analyze/batch request "
+                    f"for AnalyzerEngine.analyze_batch(). {te.args[0]}"
+                )
+                self.logger.error(error_msg)
+                return jsonify(error=error_msg), 400
+
+            except Exception as e:
+                self.logger.error(
+                    f"A fatal error occurred during execution of "
+                    f"AnalyzerEngine.analyze_batch(). {e}"
+                )
+                return jsonify(error="An internal server error has occurred!"), 500
+
+        @self.app.route("/cache/stats", methods=["GET"])
+        def cache_stats() -> tuple[Response, int]:
+            """Return the hit/miss counters of the analysis cache."""
+            if not self.cache:
+                return jsonify(enabled=False), 200
+            return jsonify(enabled=True, **self.cache.stats()), 200
+
+        @self.app.route("/models", methods=["GET"])
+        def models() -> tuple[Response, int]:
+            """Return the shared models with their references and memory, and the loaded languages of every profile."""
+            # Models shared by the profiles are reported once by the model registry
+            return jsonify(
+                languages=self.language_stats(),
+                **model_registry.report(),
+            ), 200
+
+        @self.app.route("/profiles", methods=["GET"])
+        def profiles() -> tuple[Response, int]:
+            """Return the engine profiles with their measured throughput."""
+            return jsonify(
+                default=self.default_profile,
+                profiles={
+                    profile: {
+                        "throughput": engine.throughput(),
+                        "warmup": (self.warmup_durations or {}).get(profile),
+                    }
+                    for profile, engine in self.engines.items()
+                },
+            ), 200
+
         @self.app.route("/recognizers", methods=["GET"])
         def recognizers() -> tuple[Response, int]:
             """Return a list of supported recognizers."""
@@ -141,6 +428,202 @@ class Server:
         def http_exception(e):
             return jsonify(error=e.description), e.code
 
+    def create_engines(self) -> dict:
+        """Create the engine of every served profile, sharing the NLP engines between them."""
+        default_profile, profiles = analyzer_profiles()
+        if not profiles:
+            self.default_profile = DEFAULT_PROFILE_KEY
+            return {DEFAULT_PROFILE_KEY: create_analyzer_engine(logger=self.logger)}
+
+        served_profiles = os.environ.get("GUARD_PROFILES")
+        if served_profiles:
+            served_profiles = [profile.strip() for profile in served_profiles.split(",")]
+            if not set(served_profiles) & set(profiles):
+                raise ValueError(f"GUARD_PROFILES {served_profiles} names none of the profiles {profiles}")
+            profiles = [profile for profile in profiles if profile in served_profiles]
+            if default_profile not in profiles:
+                default_profile = profiles[0]
+
+        self.default_profile = default_profile
+        nlp_engines = {}
+        engines = {}
+        # The default profile first, it preloads the shared models
+        for profile in [default_profile] + [profile for profile in profiles if profile != default_profile]:
+            self.logger.info("Initializing analyzer engine of profile '%s'...", profile)
+            engines[profile] = create_analyzer_engine(
+                logger=self.logger, profile=profile, nlp_engines=nlp_engines
+            )
+        return engines
+
+    def warm_up(self) -> None:
+        """Run representative texts through the engines, then report ready."""
+        self.logger.info("Warming up analyzer engine...")
+        try:
+            warmup_durations = {}
+            for profile, engine in self.engines.items():
+                warmup_durations[profile] = warm_up_engine(engine, logger=self.logger)
+                # The throughput reports the traffic only
+                engine.reset_throughput()
+            self.warmup_durations = warmup_durations
+        except Exception as e:
+            # The server stays unready, its engine cannot analyze
+            self.warmup_error = f"Warm-up failed: {e}"
+            self.logger.error(self.warmup_error)
+            return
+        self.set_ready()
+        self.logger.info("Analyzer engine ready")
+
+    def set_ready(self) -> None:
+        """Report ready, and record the metrics of the engines from now on (without the warm-up)."""
+        if self.metrics:
+            for engine in self.engines.values():
+                engine.metrics = self.metrics
+        self.ready.set()
+
+    def model_managers(self) -> list:
+        """Return the distinct model managers of the engines, profiles may share one."""
+        model_managers = []
+        for engine in self.engines.values():
+            model_manager = getattr(engine, "model_manager", None)
+            if model_manager is not None and all(model_manager is not other for other in model_managers):
+                model_managers.append(model_manager)
+        return model_managers
+
+    def language_stats(self) -> list | None:
+        """Return the loaded languages of each distinct model manager, with the profiles sharing it."""
+        language_stats = [
+            {
+                "profiles": [profile for profile, engine in self.engines.items()
+                             if getattr(engine, "model_manager", None) is model_manager],
+                **model_manager.stats(),
+            }
+            for model_manager in self.model_managers()
+        ]
+        return language_stats or None
+
+    @staticmethod
+    def request_options(request_json: dict) -> dict:
+        """Return the analyze options set in the request, as sent by the client."""
+        return {
+            name: request_json[name]
+            for name in ANALYZE_OPTIONS
+            if request_json.get(name) is not None
+        }
+
+    @staticmethod
+    def analyze_kwargs(req_data: AnalyzerRequest, options: dict) -> dict:
+        """Return the parsed analyze options of the request, as expected by AnalyzerEngine.analyze."""
+        return {name: getattr(req_data, name) for name in options}
+
+    def response_options(self, request_json: dict) -> dict:
+        """Return the serialization options of the response to a request."""
+        compact = request_json.get(COMPACT_FIELD)
+        return {
+            "compact": self.compact_responses if compact is None else bool(compact),
+            "explanations": bool(request_json.get("return_decision_process")),
+        }
+
+    @staticmethod
+    def results_json(results) -> str:
+        """Serialize analyzer results (or a list of them) into JSON."""
+        return json.dumps(
+            results,
+            # security measure as the o doesn't always have a proper result object, due to unexpected behaviour of the custom analyzer engine. 
+            default=lambda o: o.to_dict() if hasattr(o, "to_dict") else str(o),
+            sort_keys=True,
+        )
+
+    @classmethod
+    def serialize_results(cls, results) -> list:
+        """Convert analyzer results into the plain dicts returned by the API."""
+        return json.loads(cls.results_json(results))
+
+    @staticmethod
+    def compact_result(result, explanations: bool = False) -> dict:
+        """Return the entity type, offsets and score of an analyzer result (object or dict), and its explanation if requested."""
+        if isinstance(result, dict):
+            compact = {
+                "entity_type": result["entity_type"],
+                "start": result["start"],
+                "end": result["end"],
+                "score": result["score"],
+            }
+            explanation = result.get("analysis_explanation")
+        else:
+            compact = {
+                "entity_type": result.entity_type,
+                "start": result.start,
+                "end": result.end,
+                "score": result.score,
+            }
+            explanation = result.analysis_explanation
+        if explanations:
+            compact["analysis_explanation"] = explanation
+        return compact
+
+    @classmethod
+    def compact_json(cls, results, explanations: bool = False) -> bytes:
+        """Serialize analyzer results (or a list of them) into compact JSON, with orjson if it is installed."""
+        compact_results = [
+            [cls.compact_result(result, explanations) for result in item]
+            if isinstance(item, list)
+            else cls.compact_result(item, explanations)
+            for item in results
+        ]
+        if orjson:
+            return orjson.dumps(compact_results, default=cls.explanation_default, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(compact_results, default=cls.explanation_default, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def explanation_default(value):
+        """Serialize what JSON cannot, only explanations need this fallback."""
+        return value.to_dict() if hasattr(value, "to_dict") else str(value)
+
+    @classmethod
+    def results_body(cls, results, compact: bool = False, explanations: bool = False) -> bytes:
+        """Serialize analyzer results (or a list of them) into JSON, compact if requested."""
+        if compact:
+            return cls.compact_json(results, explanations)
+        return cls.results_json(results).encode("utf-8")
+
+    @classmethod
+    def results_response(cls, results, compact: bool = False, explanations: bool = False) -> Response:
+        """Serialize analyzer results (or a list of them) into a JSON response, compact if requested."""
+        return Response(cls.results_body(results, compact, explanations), content_type="application/json")
+
+    def collect_timings(self, profile: str, enabled: bool):
+        """Return a context collecting the timings of the analyses of a profile's engine, if enabled."""
+        return self.engines[profile].collect_timings() if enabled else nullcontext()
+
+    @classmethod
+    def timed_results_response(
+        cls, results, timings: dict, compact: bool = False, explanations: bool = False
+    ) -> Response:
+        """
+        Serialize analyzer results into a JSON response holding the results and the timing breakdown of the request.
+
+        The breakdown holds the milliseconds spent per stage and recognizer, the
+        serialization of the results and the whole request, and the analyzed counts.
+        """
+        serialization_started = time.perf_counter()
+        results_body = cls.results_body(results, compact, explanations)
+        finished = time.perf_counter()
+
+        timing = {
+            "total_ms": round((finished - g.request_started) * 1000, 3),
+            "stages_ms": {
+                stage: round(seconds * 1000, 3) for stage, seconds in timings["stages"].items()
+            },
+            "recognizers_ms": {
+                recognizer: round(seconds * 1000, 3)
+                for recognizer, seconds in timings["recognizers"].items()
+            },
+            "serialization_ms": round((finished - serialization_started) * 1000, 3),
+            "counts": timings["counts"],
+        }
+        body = b'{"results":' + results_body + b',"timing":' + json.dumps(timing).encode("utf-8") + b"}"
+        return Response(body, content_type="application/json")
+
 def create_app(): # noqa
     server = Server()
     return server.app
@@ -1,13 +1,17 @@
-from typing import List, Optional, Set, Tuple
+import re
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from presidio_analyzer import (
     RecognizerResult,
     EntityRecognizer,
     AnalysisExplanation,
 )
 from presidio_analyzer.nlp_engine import NlpArtifacts
+from core.guard_analyzer_engine import DECISION_PROCESS_ATTRIBUTE
+from core.model_registry import DEFAULT_PRECISION, ModelKey, default_device, model_registry
+from core.quantization import quantize_model
 
 try:
-    from flair.data import Sentence
+    from flair.data import Sentence, Token
     from flair.models import SequenceTagger
 except ImportError:
     print("Flair is not installed")
@@ -66,22 +70,36 @@ class FlairRecognizer(EntityRecognizer):
         # 'MISC': 'MISCELLANEOUS'   # - Probably not PII
     }
 
+    DEFAULT_MINI_BATCH_SIZE = 32
+
+    # Attribute of NlpArtifacts holding predictions computed ahead of analyze()
+    PREDICTIONS_ATTRIBUTE = "flair_predictions"
+
+    # Sentence boundaries used if the nlp artifacts do not provide any
+    SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
     def __init__(
         self,
         supported_language: str = "en",
         supported_entities: Optional[List[str]] = None,
-        check_label_groups: Optional[Tuple[Set, Set]] = None,
+        check_label_groups: Optional[List[Tuple[Set, Set]]] = None,
         model: SequenceTagger = None,
+        mini_batch_size: int = DEFAULT_MINI_BATCH_SIZE,
+        model_provider: Optional[Callable[[], SequenceTagger]] = None,
     ):
+        self.mini_batch_size = mini_batch_size
         self.check_label_groups = (
             check_label_groups if check_label_groups else self.CHECK_LABEL_GROUPS
         )
+        self.label_entities = self._build_label_entities(self.check_label_groups)
 
         supported_entities = supported_entities if supported_entities else self.ENTITIES
-        self.model = (
+        # A model provider (e.g. a LanguageModelManager) loads the model on first use instead
+        self.model_provider = model_provider
+        self._model = (
             model
-            if model
-            else SequenceTagger.load(self.MODEL_LANGUAGES.get(supported_language))
+            if model or model_provider
+            else self.acquire_model(supported_language)
         )
 
         super().__init__(
@@ -90,8 +108,54 @@ class FlairRecognizer(EntityRecognizer):
             name="Flair Analytics",
         )
 
+    @classmethod
+    def load_model(cls, language: str, model_path: Optional[str] = None) -> SequenceTagger:
+        """
+        Load the Flair model of a language.
+
+        :param language: The language of the model, one of MODEL_LANGUAGES.
+        :param model_path: Optional local file of the model (e.g. in a ModelStore),
+            instead of loading it by name from the Hugging Face hub.
+        """
+        return SequenceTagger.load(model_path or cls.MODEL_LANGUAGES.get(language))
+
+    @classmethod
+    def acquire_model(
+        cls, language: str, model_path: Optional[str] = None, quantize: Optional[str] = None
+    ) -> SequenceTagger:
+        """
+        Return the Flair model of a language shared through the model registry, loading it on first use.
+
+        Release it with ``model_registry.release`` when it is no longer used.
+
+        :param language: The language of the model, one of MODEL_LANGUAGES.
+        :param model_path: Optional local file of the model, see ``load_model``.
+        :param quantize: Optional quantization mode of the model, see core.quantization.
+        """
+        def load():
+            model = cls.load_model(language, model_path=model_path)
+            return quantize_model(model, quantize) if quantize else model
+
+        key = ModelKey(
+            model_path or cls.MODEL_LANGUAGES.get(language),
+            default_device(),
+            quantize or DEFAULT_PRECISION,
+        )
+        return model_registry.acquire(key, load)
+
+    @property
+    def model(self) -> SequenceTagger:
+        """The Flair model, taken from the model provider if one is set."""
+        if self._model is None and self.model_provider:
+            return self.model_provider()
+        return self._model
+
+    @model.setter
+    def model(self, model: SequenceTagger) -> None:
+        self._model = model
+
     def load(self) -> None:
-        """Load the model, not used. Model is loaded during initialization."""
+        """Load the model, not used. Model is loaded during initialization or by the model provider."""
         pass
 
     def get_supported_entities(self) -> List[str]:
@@ -111,7 +175,8 @@ class FlairRecognizer(EntityRecognizer):
 
         :param text: The text for analysis.
         :param entities: Not working properly for this recognizer.
-        :param nlp_artifacts: Not used by this recognizer.
+        :param nlp_artifacts: Provides the tokens and sentence boundaries, or the
+            predictions made by prefetch().
         :param language: Text language. Supported languages in MODEL_LANGUAGES
         :return: The list of Presidio RecognizerResult constructed from the recognized
             Flair detections.
@@ -119,43 +184,185 @@ class FlairRecognizer(EntityRecognizer):
 
         results = []
 
-        sentences = Sentence(text)
-        self.model.predict(sentences)
+        sentences = self._get_prefetched_sentences(nlp_artifacts)
+        if sentences is None:
+            sentences = self._build_sentences(text, nlp_artifacts)
+            self.model.predict(sentences, mini_batch_size=self.mini_batch_size)
 
         # If there are no specific list of entities, we will look for all of it.
-        if not entities:
-            entities = self.supported_entities
-
-        for entity in entities:
-            if entity not in self.supported_entities:
-                continue
-
-            for ent in sentences.get_spans("ner"):
-                if not self.__check_label(
-                    entity, ent.labels[0].value, self.check_label_groups
-                ):
-                    continue
-                textual_explanation = self.DEFAULT_EXPLANATION.format(
-                    ent.labels[0].value
-                )
-                explanation = self.build_flair_explanation(
-                    round(ent.score, 2), textual_explanation
-                )
-                flair_result = self._convert_to_recognizer_result(ent, explanation)
-
-                results.append(flair_result)
+        requested_entities = set(entities or self.supported_entities)
+        requested_entities.intersection_update(self.supported_entities)
+
+        # Explanations are only built if the engine does not drop them anyway
+        with_explanation = getattr(nlp_artifacts, DECISION_PROCESS_ATTRIBUTE, True)
+
+        for sentence in sentences:
+            for ent in sentence.get_spans("ner"):
+                label = ent.labels[0].value
+                for entity in self.label_entities.get(label, ()):
+                    if entity not in requested_entities:
+                        continue
+
+                    explanation = None
+                    if with_explanation:
+                        explanation = self.build_flair_explanation(
+                            round(ent.score, 2), self.DEFAULT_EXPLANATION.format(label)
+                        )
+                    flair_result = self._convert_to_recognizer_result(
+                        ent, explanation, offset=sentence.start_position
+                    )
+
+                    results.append(flair_result)
 
         return results
 
-    def _convert_to_recognizer_result(self, entity, explanation) -> RecognizerResult:
+    def prefetch(
+        self, texts: List[str], nlp_artifacts_list: List[NlpArtifacts]
+    ) -> None:
+        """
+        Run the Flair model over a batch of texts in a single predict call.
+
+        The predicted sentences are attached to the matching nlp artifacts, so the
+        following analyze() calls for these texts skip the model entirely.
+
+        :param texts: The texts that will be analyzed.
+        :param nlp_artifacts_list: The nlp artifacts of each text, in the same order.
+        """
+        self.attach_predictions(
+            nlp_artifacts_list, self.predict_batch(texts, nlp_artifacts_list)
+        )
+
+    def predict_batch(
+        self,
+        texts: List[str],
+        nlp_artifacts_list: Optional[List[NlpArtifacts]] = None,
+    ) -> List[List[Sentence]]:
+        """
+        Predict the sentences of a batch of texts in a single predict call.
+
+        Without nlp artifacts (e.g. while the NLP engine is still running) the
+        texts are split into sentences and tokenized by Flair itself.
+
+        :param texts: The texts to predict.
+        :param nlp_artifacts_list: Optional nlp artifacts of each text, in the same order.
+        :return: The predicted sentences of each text.
+        """
+        nlp_artifacts_list = nlp_artifacts_list or [None] * len(texts)
+        sentences_per_text = [
+            self._build_sentences(text, nlp_artifacts)
+            for text, nlp_artifacts in zip(texts, nlp_artifacts_list)
+        ]
+        all_sentences = [
+            sentence for sentences in sentences_per_text for sentence in sentences
+        ]
+        if all_sentences:
+            self.model.predict(all_sentences, mini_batch_size=self.mini_batch_size)
+        return sentences_per_text
+
+    def attach_predictions(
+        self,
+        nlp_artifacts_list: List[NlpArtifacts],
+        predictions: List[List[Sentence]],
+    ) -> None:
+        """
+        Attach the predicted sentences of each text to its nlp artifacts, for analyze() to pick up.
+
+        :param nlp_artifacts_list: The nlp artifacts of each text.
+        :param predictions: The predicted sentences of each text, in the same order.
+        """
+        for nlp_artifacts, sentences in zip(nlp_artifacts_list, predictions):
+            prefetched = getattr(nlp_artifacts, self.PREDICTIONS_ATTRIBUTE, None)
+            if prefetched is None:
+                prefetched = {}
+                setattr(nlp_artifacts, self.PREDICTIONS_ATTRIBUTE, prefetched)
+            prefetched[self.id] = sentences
+
+    def _get_prefetched_sentences(
+        self, nlp_artifacts: Optional[NlpArtifacts]
+    ) -> Optional[List[Sentence]]:
+        """Return the sentences predicted by prefetch() for these artifacts, if any."""
+        predictions = getattr(nlp_artifacts, self.PREDICTIONS_ATTRIBUTE, None)
+        if not predictions:
+            return None
+        return predictions.get(self.id)
+
+    @classmethod
+    def _build_sentences(
+        cls, text: str, nlp_artifacts: Optional[NlpArtifacts] = None
+    ) -> List[Sentence]:
+        """
+        Split the text into the Flair sentences the model is run on.
+
+        Each sentence knows its offset in the text, so the predicted spans can be
+        mapped back. Predicting many short sentences in mini-batches is much faster
+        than predicting one sequence spanning the whole text.
+
+        If the nlp artifacts hold the spaCy doc of the text, its tokens are reused,
+        so the text is tokenized only once and Flair's offsets match spaCy's.
+        """
+        doc = cls._get_doc(text, nlp_artifacts)
+        if doc is None:
+            return [
+                Sentence(text[start:end], start_position=start)
+                for start, end in cls._sentence_spans(text)
+                if text[start:end].strip()
+            ]
+
+        sentences = []
+        for start, end in cls._sentence_spans(text, doc):
+            span = doc.char_span(start, end, alignment_mode="expand")
+            tokens = [token for token in span or () if not token.is_space]
+            if tokens:
+                sentences.append(cls._sentence_from_tokens(tokens))
+        return sentences
+
+    @staticmethod
+    def _sentence_from_tokens(tokens) -> Sentence:
+        """Build a Flair sentence from spaCy tokens, keeping their character offsets."""
+        offset = tokens[0].idx
+        flair_tokens = [
+            Token(
+                token.text,
+                start_position=token.idx - offset,
+                whitespace_after=next_token.idx - token.idx - len(token) if next_token else 0,
+            )
+            for token, next_token in zip(tokens, tokens[1:] + [None])
+        ]
+        return Sentence(flair_tokens, start_position=offset)
+
+    @staticmethod
+    def _get_doc(text: str, nlp_artifacts: Optional[NlpArtifacts]):
+        """Return the spaCy doc of the nlp artifacts, if it was built from this text."""
+        doc = getattr(nlp_artifacts, "tokens", None)
+        if doc is None or getattr(doc, "text", None) != text:
+            return None
+        return doc
+
+    @classmethod
+    def _sentence_spans(cls, text: str, doc=None) -> List[Tuple[int, int]]:
+        """Return the (start, end) offsets of the sentences, taken from spaCy if available."""
+        if doc is not None and doc.has_annotation("SENT_START"):
+            return [(sentence.start_char, sentence.end_char) for sentence in doc.sents]
+
+        spans = []
+        start = 0
+        for match in cls.SENTENCE_END_PATTERN.finditer(text):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(text)))
+        return spans
+
+    def _convert_to_recognizer_result(
+        self, entity, explanation, offset: int = 0
+    ) -> RecognizerResult:
 
         entity_type = self.PRESIDIO_EQUIVALENCES.get(entity.tag, entity.tag)
         flair_score = round(entity.score, 2)
 
         flair_results = RecognizerResult(
             entity_type=entity_type,
-            start=entity.start_position,
-            end=entity.end_position,
+            start=offset + entity.start_position,
+            end=offset + entity.end_position,
             score=flair_score,
             analysis_explanation=explanation,
         )
@@ -180,9 +387,10 @@ class FlairRecognizer(EntityRecognizer):
         return explanation
 
     @staticmethod
-    def __check_label(
-        entity: str, label: str, check_label_groups: Tuple[Set, Set]
-    ) -> bool:
-        return any(
-            [entity in egrp and label in lgrp for egrp, lgrp in check_label_groups]
-        )
\ No newline at end of file
+    def _build_label_entities(check_label_groups: List[Tuple[Set, Set]]) -> Dict[str, List[str]]:
+        """Map each Flair label to the Presidio entities it stands for."""
+        label_entities = {}
+        for entity_group, label_group in check_label_groups:
+            for label in label_group:
+                label_entities.setdefault(label, []).extend(sorted(entity_group))
+        return label_entities
@@ -0,0 +1,557 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+from presidio_analyzer import AnalyzerEngine, EntityRecognizer, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts
+from presidio_analyzer.predefined_recognizers import SpacyRecognizer
+
+from core.language_models import LanguageModelManager
+from core.metrics import (
+    STAGE_CHUNKING,
+    STAGE_CONTEXT_ENHANCER,
+    STAGE_DEDUPLICATION,
+    STAGE_MODEL_PREDICTIONS,
+    STAGE_NLP_ARTIFACTS,
+    STAGE_RECOGNIZERS,
+)
+from core.shared_nlp_engine import HF_PIPE_NAME
+from core.text_chunker import SentenceWindowChunker
+
+# Attribute of NlpArtifacts telling recognizers whether the decision process (explanations) is returned
+DECISION_PROCESS_ATTRIBUTE = "return_decision_process"
+
+logger = logging.getLogger("presidio-analyzer")
+
+# Recognizers may be shared by the engines of several profiles, they are wrapped under one lock
+_instrument_lock = threading.Lock()
+
+
+class ExecutionPlan(NamedTuple):
+    """The recognizers to run for a language and entity set, and whether they need the NER model."""
+
+    recognizers: List[EntityRecognizer]
+    needs_ner_model: bool
+
+
+class GuardAnalyzerEngine(AnalyzerEngine):
+    """
+    Presidio AnalyzerEngine with support for analyzing many texts in one pass.
+
+    The NLP engine (spaCy + transformers) processes the whole batch through
+    spaCy's pipe, and recognizers offering a ``prefetch`` method (e.g. the
+    FlairRecognizer) run their model once over all texts before the regular
+    per-text recognizer loop picks up their predictions.
+
+    If a text chunker is set, long texts are split into overlapping windows
+    which are analyzed as one batch. The results are moved back to the
+    offsets of the original text and entities found by two windows are merged.
+
+    With ``parallel_workers`` set, model-based recognizers offering
+    ``predict_batch`` and ``attach_predictions`` run on a thread pool while
+    the NLP engine processes the texts, so the latency of a request tends
+    towards the slowest model instead of the sum of all models. A recognizer
+    exceeding its time budget contributes no results to the request.
+
+    The engine measures its throughput (texts and characters per second of
+    analysis time), see ``throughput``. With ``metrics`` set (e.g. an
+    AnalyzerMetrics), every analysis reports the seconds spent per stage and
+    per recognizer to its ``observe_analysis``. ``collect_timings`` returns the
+    same breakdown for the analyses of a single request.
+
+    :param text_chunker: Optional chunker splitting long texts into windows.
+    :param model_manager: Optional LanguageModelManager loading the models of each language.
+    :param parallel_workers: Threads running model-based recognizers, 0 to run them sequentially.
+    :param recognizer_timeout: Default time budget of a parallel recognizer in seconds, None for no limit.
+    :param recognizer_timeouts: Time budgets overriding the default, by recognizer name.
+    :param metrics: Optional receiver of the stage and recognizer durations of each analysis.
+    :param kwargs: Parameters of the Presidio AnalyzerEngine.
+
+    :example:
+    >engine = create_analyzer_engine()
+    >results = engine.analyze_batch(
+    >    ["Max Mustermann wohnt in Innsbruck.", "Kontakt: max@example.at"],
+    >    language="de",
+    >)
+    """
+
+    DEFAULT_BATCH_SIZE = 32
+
+    # Execution plans kept, the least recently used ones are dropped first
+    MAX_EXECUTION_PLANS = 256
+
+    # spaCy pipes predicting the entities read by the NER recognizers
+    NER_MODEL_PIPES = (HF_PIPE_NAME, "ner")
+
+    def __init__(
+        self,
+        text_chunker: Optional[SentenceWindowChunker] = None,
+        model_manager: Optional[LanguageModelManager] = None,
+        parallel_workers: int = 0,
+        recognizer_timeout: Optional[float] = None,
+        recognizer_timeouts: Optional[Dict[str, float]] = None,
+        metrics=None,
+        **kwargs,
+    ):
+        self.text_chunker = text_chunker
+        self.model_manager = model_manager
+        self.parallel_workers = parallel_workers
+        self.recognizer_timeout = recognizer_timeout
+        self.recognizer_timeouts = recognizer_timeouts or {}
+        self.metrics = metrics
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._executor_lock = threading.Lock()
+
+        self._execution_plans: "OrderedDict[Tuple, ExecutionPlan]" = OrderedDict()
+        self._execution_plans_lock = threading.Lock()
+
+        self._throughput_lock = threading.Lock()
+        self.reset_throughput()
+        # Durations of the analysis running in the current thread, while metrics or timings are collected
+        self._timings = threading.local()
+
+        super().__init__(**kwargs)
+
+    def analyze(self, text: str, language: str, **kwargs) -> List[RecognizerResult]:
+        """
+        Analyze a text, splitting it into windows if it is too long.
+
+        :param text: The text to analyze.
+        :param language: The language of the text.
+        :param kwargs: Additional parameters for AnalyzerEngine.analyze.
+        :return: The results found in the text.
+        """
+        if kwargs.get("nlp_artifacts"):
+            return super().analyze(text=text, language=language, **kwargs)
+
+        return self.analyze_batch([text], language=language, **kwargs)[0]
+
+    def analyze_batch(
+        self,
+        texts: List[str],
+        language: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        **kwargs,
+    ) -> List[List[RecognizerResult]]:
+        """
+        Analyze a list of texts of the same language.
+
+        :param texts: The texts to analyze.
+        :param language: The language of all texts.
+        :param batch_size: Batch size used by the NLP engine.
+        :param kwargs: Additional parameters for AnalyzerEngine.analyze.
+        :return: One list of results per text, in the order of the input texts.
+        """
+        if not texts:
+            return []
+
+        started = time.perf_counter()
+        timings = self._start_timings()
+        plan = self.get_execution_plan(language, kwargs.get("entities"))
+        # Windows must fit into the input of the transformer model, if it runs
+        count_tokens = self._model_token_counter(language) if plan.needs_ner_model else None
+        windows_per_text = [self._split(text, count_tokens) for text in texts]
+        window_texts = [
+            text[start:end]
+            for text, windows in zip(texts, windows_per_text)
+            for start, end in windows
+        ]
+        lap = self._lap(timings, STAGE_CHUNKING, started)
+
+        if timings is not None:
+            for recognizer in plan.recognizers:
+                self._instrument(recognizer)
+        # Start the model-based recognizers first, they run alongside the NLP engine
+        pending = self._submit_predictions(plan.recognizers, window_texts)
+
+        nlp_artifacts_list = self._process_batch(
+            window_texts, language, batch_size, with_ner_model=plan.needs_ner_model
+        )
+        lap = self._lap(timings, STAGE_NLP_ARTIFACTS, lap)
+        if timings is not None:
+            timings["counts"] = {
+                "texts": len(texts),
+                "windows": len(window_texts),
+                "characters": sum(len(text) for text in texts),
+                "tokens": sum(len(nlp_artifacts.tokens) for nlp_artifacts in nlp_artifacts_list),
+            }
+
+        return_decision_process = bool(kwargs.get("return_decision_process"))
+        for nlp_artifacts in nlp_artifacts_list:
+            setattr(nlp_artifacts, DECISION_PROCESS_ATTRIBUTE, return_decision_process)
+
+        for recognizer in plan.recognizers:
+            if recognizer in pending:
+                self._attach_predictions(recognizer, *pending[recognizer], nlp_artifacts_list)
+            elif hasattr(recognizer, "prefetch"):
+                recognizer.prefetch(window_texts, nlp_artifacts_list)
+            else:
+                continue
+            lap = self._lap(timings, STAGE_MODEL_PREDICTIONS, lap, recognizer=recognizer.name)
+
+        if timings is not None:
+            timings["prefetch_seconds"] = sum(timings["recognizers"].values())
+        window_results = [
+            super(GuardAnalyzerEngine, self).analyze(
+                text=window_text,
+                language=language,
+                nlp_artifacts=nlp_artifacts,
+                **kwargs,
+            )
+            for window_text, nlp_artifacts in zip(window_texts, nlp_artifacts_list)
+        ]
+        lap = self._lap(timings, STAGE_RECOGNIZERS, lap)
+
+        results = []
+        position = 0
+        for windows in windows_per_text:
+            results.append(
+                self._merge_windows(windows, window_results[position:position + len(windows)])
+            )
+            position += len(windows)
+        self._lap(timings, STAGE_DEDUPLICATION, lap)
+
+        self._record_throughput(texts, time.perf_counter() - started)
+        if timings is not None:
+            self._finish_timings(language, timings)
+        return results
+
+    def throughput(self) -> Dict[str, float]:
+        """
+        Return the texts and characters analyzed since the last reset, with their rates.
+
+        The rates are per second of analysis time: concurrent requests add up
+        their time, so they describe a single request stream.
+        """
+        with self._throughput_lock:
+            texts, characters, seconds = self._texts, self._characters, self._seconds
+        return {
+            "texts": texts,
+            "characters": characters,
+            "seconds": round(seconds, 3),
+            "texts_per_second": round(texts / seconds, 2) if seconds else None,
+            "characters_per_second": round(characters / seconds, 1) if seconds else None,
+        }
+
+    def reset_throughput(self) -> None:
+        """Reset the throughput measurement, e.g. after the warm-up."""
+        with self._throughput_lock:
+            self._texts = 0
+            self._characters = 0
+            self._seconds = 0.0
+
+    def _record_throughput(self, texts: List[str], seconds: float) -> None:
+        with self._throughput_lock:
+            self._texts += len(texts)
+            self._characters += sum(len(text) for text in texts)
+            self._seconds += seconds
+
+    @contextmanager
+    def collect_timings(self) -> Iterator[Dict[str, Any]]:
+        """
+        Collect the durations of the analyses run by the current thread within the context.
+
+        The yielded dict is filled as the analyses finish: seconds per stage
+        (``stages``) and per recognizer (``recognizers``), and the number of
+        texts, windows, characters and tokens analyzed (``counts``).
+
+        :example:
+        >with engine.collect_timings() as timings:
+        >    engine.analyze(text, language="de")
+        >print(timings["stages"]["nlp_artifacts"])
+        """
+        collected = {"stages": {}, "recognizers": {}, "counts": {}}
+        self._timings.collector = collected
+        try:
+            yield collected
+        finally:
+            self._timings.collector = None
+
+    def _start_timings(self) -> Optional[Dict[str, Any]]:
+        """Start recording the durations of an analysis in the current thread, if metrics or timings are collected."""
+        if not self.metrics and getattr(self._timings, "collector", None) is None:
+            return None
+        timings = {"stages": {}, "recognizers": {}, "counts": {}}
+        self._timings.current = timings
+        return timings
+
+    def _finish_timings(self, language: str, timings: Dict[str, Any]) -> None:
+        self._timings.current = None
+        # The recognizers stage ran the recognizers, the context enhancement and Presidio's
+        # score filter and de-duplication, which count towards the de-duplication
+        stages = timings["stages"]
+        recognizers_seconds = sum(timings["recognizers"].values()) - timings.get("prefetch_seconds", 0.0)
+        other_seconds = stages.get(STAGE_RECOGNIZERS, 0.0) - stages.get(STAGE_CONTEXT_ENHANCER, 0.0)
+        stages[STAGE_RECOGNIZERS] = max(0.0, min(recognizers_seconds, other_seconds))
+        stages[STAGE_DEDUPLICATION] = stages.get(STAGE_DEDUPLICATION, 0.0) + max(
+            0.0, other_seconds - stages[STAGE_RECOGNIZERS]
+        )
+
+        collected = getattr(self._timings, "collector", None)
+        if collected is not None:
+            for name in ("stages", "recognizers", "counts"):
+                for key, value in timings[name].items():
+                    collected[name][key] = collected[name].get(key, 0) + value
+
+        if self.metrics:
+            try:
+                self.metrics.observe_analysis(language, stages, timings["recognizers"])
+            except Exception as e:
+                logger.warning("Failed to record the analysis metrics: %s", e)
+
+    @staticmethod
+    def _lap(
+        timings: Optional[Dict[str, Dict[str, float]]],
+        stage: str,
+        since: float,
+        recognizer: Optional[str] = None,
+    ) -> float:
+        """Add the time since the last lap to a stage (and recognizer), returning the current time."""
+        now = time.perf_counter()
+        if timings is not None:
+            timings["stages"][stage] = timings["stages"].get(stage, 0.0) + now - since
+            if recognizer:
+                timings["recognizers"][recognizer] = timings["recognizers"].get(recognizer, 0.0) + now - since
+        return now
+
+    def _instrument(self, recognizer: EntityRecognizer) -> None:
+        """Wrap the analyze method of a recognizer, adding its duration to the analysis of the current thread."""
+        if getattr(recognizer, "_guard_timed", False):
+            return
+        with _instrument_lock:
+            # Another request may have wrapped it meanwhile, a second wrapper would count its time twice
+            if not getattr(recognizer, "_guard_timed", False):
+                self._wrap_analyze(recognizer)
+
+    def _wrap_analyze(self, recognizer: EntityRecognizer) -> None:
+        analyze = recognizer.analyze
+        thread_timings = self._timings
+
+        def timed_analyze(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return analyze(*args, **kwargs)
+            finally:
+                timings = getattr(thread_timings, "current", None)
+                if timings is not None:
+                    recognizers = timings["recognizers"]
+                    recognizers[recognizer.name] = recognizers.get(recognizer.name, 0.0) + time.perf_counter() - start
+
+        recognizer.analyze = timed_analyze
+        recognizer._guard_timed = True
+
+    def _enhance_using_context(self, text, raw_results, nlp_artifacts, recognizers, context=None):
+        """Enhance the scores using context words, timing the enhancement while metrics are recorded."""
+        timings = getattr(self._timings, "current", None)
+        if timings is None:
+            return super()._enhance_using_context(text, raw_results, nlp_artifacts, recognizers, context)
+        start = time.perf_counter()
+        try:
+            return super()._enhance_using_context(text, raw_results, nlp_artifacts, recognizers, context)
+        finally:
+            self._lap(timings, STAGE_CONTEXT_ENHANCER, start)
+
+    def get_execution_plan(
+        self, language: str, entities: Optional[List[str]] = None
+    ) -> ExecutionPlan:
+        """
+        Return the recognizers needed for a language and entity set.
+
+        :param language: The language of the texts.
+        :param entities: The requested entities, None or empty for all entities.
+        :return: The execution plan, computed once per language and entity set.
+        """
+        requested: Optional[FrozenSet[str]] = None
+        if entities:
+            # Entities without a recognizer change nothing, they must not make up plans of their own
+            requested = frozenset(entities).intersection(self.get_supported_entities(language))
+        # Recognizers may be added after the engine is created, a changed registry needs a new plan
+        key = (language, requested, len(self.registry.recognizers))
+        with self._execution_plans_lock:
+            plan = self._execution_plans.get(key)
+            if plan is not None:
+                self._execution_plans.move_to_end(key)
+                return plan
+
+        recognizers = self.registry.get_recognizers(
+            language=language, entities=sorted(requested or entities or []), all_fields=not entities
+        )
+        if requested:
+            recognizers = self._drop_covered_ner_recognizers(recognizers, requested)
+        plan = ExecutionPlan(
+            recognizers=recognizers,
+            needs_ner_model=any(
+                isinstance(recognizer, SpacyRecognizer) for recognizer in recognizers
+            ),
+        )
+        with self._execution_plans_lock:
+            self._execution_plans[key] = plan
+            while len(self._execution_plans) > self.MAX_EXECUTION_PLANS:
+                self._execution_plans.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def _drop_covered_ner_recognizers(
+        recognizers: List[EntityRecognizer], requested: FrozenSet[str]
+    ) -> List[EntityRecognizer]:
+        """
+        Leave out the NER recognizers whose requested entities are all found by rule-based recognizers.
+
+        The NER model also maps some entities the pattern recognizers find (e.g. EMAIL_ADDRESS),
+        a request for these entities only must not run it.
+        """
+        rule_based_entities = {
+            entity
+            for recognizer in recognizers
+            if not isinstance(recognizer, SpacyRecognizer) and not hasattr(recognizer, "prefetch")
+            for entity in recognizer.supported_entities
+        }
+        return [
+            recognizer
+            for recognizer in recognizers
+            if not isinstance(recognizer, SpacyRecognizer)
+            or not requested.intersection(recognizer.supported_entities) <= rule_based_entities
+        ]
+
+    def _process_batch(
+        self, texts: List[str], language: str, batch_size: int, with_ner_model: bool = True
+    ) -> List[NlpArtifacts]:
+        """Run the NLP engine over the texts, leaving out its NER model if no recognizer needs it."""
+        nlp = getattr(self.nlp_engine, "nlp", None)
+        if with_ner_model or not nlp or language not in nlp:
+            return [
+                nlp_artifacts
+                for _, nlp_artifacts in self.nlp_engine.process_batch(
+                    texts=texts, language=language, batch_size=batch_size
+                )
+            ]
+
+        # Tokens and lemmas are still needed, e.g. by the context enhancement
+        pipeline = nlp[language]
+        disable = [name for name in self.NER_MODEL_PIPES if name in pipeline.pipe_names]
+        return [
+            NlpArtifacts(
+                entities=[],
+                tokens=doc,
+                tokens_indices=[token.idx for token in doc],
+                lemmas=[token.lemma_ for token in doc],
+                nlp_engine=self.nlp_engine,
+                language=language,
+                scores=[],
+            )
+            for doc in pipeline.pipe(texts, batch_size=batch_size, disable=disable)
+        ]
+
+    def _submit_predictions(
+        self, recognizers: List[EntityRecognizer], texts: List[str]
+    ) -> Dict[EntityRecognizer, Tuple[Future, Optional[float]]]:
+        """Start the batch predictions of the parallel recognizers, returning their futures and deadlines."""
+        if self.parallel_workers <= 0:
+            return {}
+
+        pending = {}
+        for recognizer in recognizers:
+            if not (hasattr(recognizer, "predict_batch") and hasattr(recognizer, "attach_predictions")):
+                continue
+            timeout = self.recognizer_timeouts.get(recognizer.name, self.recognizer_timeout)
+            deadline = time.monotonic() + timeout if timeout else None
+            pending[recognizer] = (
+                self._get_executor().submit(recognizer.predict_batch, texts),
+                deadline,
+            )
+        return pending
+
+    @staticmethod
+    def _attach_predictions(
+        recognizer: EntityRecognizer,
+        future: Future,
+        deadline: Optional[float],
+        nlp_artifacts_list: List,
+    ) -> None:
+        """Wait for a parallel recognizer within its time budget and hand its predictions to analyze()."""
+        timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        try:
+            predictions = future.result(timeout=timeout)
+        except TimeoutError:
+            # The running prediction cannot be interrupted, it finishes in the background
+            logger.warning(
+                "Recognizer '%s' exceeded its time budget, its results are skipped", recognizer.name
+            )
+            predictions = [[] for _ in nlp_artifacts_list]
+        recognizer.attach_predictions(nlp_artifacts_list, predictions)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive fork(), every worker process needs its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.parallel_workers, thread_name_prefix="guard-recognizer"
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _split(
+        self, text: str, count_tokens: Optional[Callable[[List[str]], List[int]]] = None
+    ) -> List[Tuple[int, int]]:
+        if not self.text_chunker:
+            return [(0, len(text))]
+        return self.text_chunker.split(text, count_tokens)
+
+    def _model_token_counter(self, language: str) -> Optional[Callable[[List[str]], List[int]]]:
+        """Return a function counting the tokens of the transformer model per word, None without such a model."""
+        nlp = getattr(self.nlp_engine, "nlp", None)
+        if not self.text_chunker or not nlp or language not in nlp:
+            return None
+        pipeline = nlp[language]
+        if HF_PIPE_NAME not in pipeline.pipe_names:
+            return None
+        tokenizer = getattr(pipeline.get_pipe(HF_PIPE_NAME).hf_pipeline, "tokenizer", None)
+        if tokenizer is None:
+            return None
+
+        def count_tokens(words: List[str]) -> List[int]:
+            return [len(ids) for ids in tokenizer(words, add_special_tokens=False)["input_ids"]]
+
+        return count_tokens
+
+    @staticmethod
+    def _merge_windows(
+        windows: List[Tuple[int, int]], window_results: List[List[RecognizerResult]]
+    ) -> List[RecognizerResult]:
+        """
+        Move the results of each window to the offsets of the original text and merge them.
+
+        A result touching the border a window shares with its neighbour may be cut
+        off, it is dropped if the neighbour covers it completely.
+        """
+        if len(windows) == 1:
+            return window_results[0]
+
+        merged = []
+        for index, ((start, end), results) in enumerate(zip(windows, window_results)):
+            for result in results:
+                result.start += start
+                result.end += start
+
+                cut_at_end = (
+                    index < len(windows) - 1
+                    and result.end == end
+                    and windows[index + 1][0] <= result.start
+                )
+                cut_at_start = (
+                    index > 0
+                    and result.start == start
+                    and windows[index - 1][1] >= result.end
+                )
+                if not (cut_at_end or cut_at_start):
+                    merged.append(result)
+
+        return EntityRecognizer.remove_duplicates(merged)
@@ -0,0 +1,216 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from logging import Logger
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def resident_memory_mb() -> float:
+    """Return the resident memory of this process in MB, 0 if it cannot be determined."""
+    try:
+        with open("/proc/self/statm") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0.0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class LanguageModelManager:
+    """
+    Load the models of a language on first use and evict idle languages beyond a memory budget.
+
+    Models are registered per language and name with a loader. ``get`` loads a
+    model when it is first needed and keeps it until its language is evicted.
+    The memory of a language is estimated by the growth of the resident memory
+    while its models load. Whenever the loaded languages exceed the budget,
+    the least recently used ones are evicted, except the preloaded languages
+    and the one just used.
+
+    With Gunicorn, preload the languages needed by every worker: they are
+    loaded in the master before forking and shared by all workers, models
+    loaded on demand are loaded by each worker on its own.
+
+    :param memory_budget_mb: Memory budget of all loaded languages in MB, None for no limit.
+    :param preload: Languages loaded by ``preload()`` and never evicted.
+    :param logger: Optional logger for loads and evictions.
+
+    :example:
+    >manager = LanguageModelManager(memory_budget_mb=4000, preload=["de"])
+    >manager.register("de", "flair", lambda: SequenceTagger.load("flair/ner-german"))
+    >manager.preload()
+    >tagger = manager.get("de", "flair")
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: Optional[float] = None,
+        preload: Iterable[str] = (),
+        logger: Optional[Logger] = None,
+    ):
+        self.memory_budget_mb = memory_budget_mb or None
+        self.preload_languages = list(preload)
+        self.logger = logger
+
+        self._loaders: Dict[str, Dict[str, Callable[[], Any]]] = {}
+        self._unloaders: Dict[str, Dict[str, Callable[[Any], None]]] = {}
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._memory_mb: Dict[str, float] = {}
+        # Loaded languages, least recently used first
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def register(
+        self,
+        language: str,
+        name: str,
+        loader: Callable[[], Any],
+        unloader: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """
+        Register the loader of a model.
+
+        :param language: The language the model belongs to.
+        :param name: The name of the model within its language, e.g. "nlp" or "flair".
+        :param loader: Callable returning the loaded model.
+        :param unloader: Optional callable receiving the model when its language is evicted,
+            e.g. to release it from the model registry.
+        """
+        with self._lock:
+            self._loaders.setdefault(language, {})[name] = loader
+            if unloader:
+                self._unloaders.setdefault(language, {})[name] = unloader
+            self._load_locks.setdefault(language, threading.Lock())
+
+    def languages(self) -> List[str]:
+        """Return the languages with registered models."""
+        return list(self._loaders)
+
+    def loaded_languages(self) -> List[str]:
+        """Return the languages with loaded models, least recently used first."""
+        with self._lock:
+            return list(self._last_used)
+
+    def get(self, language: str, name: str) -> Any:
+        """
+        Return a model, loading it if needed.
+
+        :param language: The language the model belongs to.
+        :param name: The name of the model within its language.
+        :return: The loaded model.
+        """
+        with self._lock:
+            model = self._models.get(language, {}).get(name)
+            if model is not None:
+                self._touch(language)
+                return model
+            if name not in self._loaders.get(language, {}):
+                raise KeyError(f"No model '{name}' registered for language '{language}'")
+
+        # Loads of one language are serialized, so the memory growth is attributed correctly
+        with self._load_locks[language]:
+            with self._lock:
+                model = self._models.get(language, {}).get(name)
+            if model is None:
+                model = self._load(language, name)
+
+        with self._lock:
+            self._touch(language)
+            self._evict_over_budget(keep=language)
+        return model
+
+    def preload(self) -> None:
+        """Load all models of the preloaded languages."""
+        for language in self.preload_languages:
+            for name in list(self._loaders.get(language, {})):
+                self.get(language, name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the loaded languages with their estimated memory and the budget."""
+        with self._lock:
+            return {
+                "memory_budget_mb": self.memory_budget_mb,
+                "preload": self.preload_languages,
+                "loaded": {
+                    language: {
+                        "models": sorted(self._models.get(language, {})),
+                        "memory_mb": round(self._memory_mb.get(language, 0.0), 1),
+                        "idle_seconds": round(time.monotonic() - last_used, 1),
+                    }
+                    for language, last_used in self._last_used.items()
+                },
+            }
+
+    def _load(self, language: str, name: str) -> Any:
+        if self.logger: self.logger.info("Loading model '%s' for language '%s'", name, language)
+        memory_before = resident_memory_mb()
+        model = self._loaders[language][name]()
+        memory_growth = max(0.0, resident_memory_mb() - memory_before)
+
+        with self._lock:
+            self._models.setdefault(language, {})[name] = model
+            self._memory_mb[language] = self._memory_mb.get(language, 0.0) + memory_growth
+        return model
+
+    def _touch(self, language: str) -> None:
+        self._last_used[language] = time.monotonic()
+        self._last_used.move_to_end(language)
+
+    def _evict_over_budget(self, keep: str) -> None:
+        if not self.memory_budget_mb:
+            return
+
+        evicted = []
+        for language in list(self._last_used):
+            if sum(self._memory_mb.values()) <= self.memory_budget_mb:
+                break
+            if language == keep or language in self.preload_languages:
+                continue
+            # Requests still using the models keep them alive until they are done
+            for name, model in self._models.pop(language, {}).items():
+                unloader = self._unloaders.get(language, {}).get(name)
+                if unloader:
+                    unloader(model)
+            self._memory_mb.pop(language, None)
+            del self._last_used[language]
+            evicted.append(language)
+
+        if evicted:
+            gc.collect()
+            if self.logger: self.logger.info("Evicted the models of %s to stay within the memory budget", evicted)
+
+
+class LazyModelMapping(Mapping):
+    """
+    Read-only mapping of language to model, loading the models through a LanguageModelManager.
+
+    Used as ``nlp`` of the NLP engine, so its spaCy pipelines are loaded on
+    first use. Listing the languages does not load anything, accessing the
+    values does.
+
+    :param manager: The manager loading the models.
+    :param name: The name of the models within their language.
+    :param languages: The languages of the mapping.
+    """
+
+    def __init__(self, manager: LanguageModelManager, name: str, languages: Iterable[str]):
+        self.manager = manager
+        self.name = name
+        self._languages = list(languages)
+
+    def __getitem__(self, language: str) -> Any:
+        if language not in self._languages:
+            raise KeyError(language)
+        return self.manager.get(language, self.name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._languages)
+
+    def __len__(self) -> int:
+        return len(self._languages)
+
+    def __contains__(self, language) -> bool:
+        return language in self._languages
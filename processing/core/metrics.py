@@ -0,0 +1,183 @@
+import os
+from typing import Callable, Dict, Iterable, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    CollectorRegistry = None
+
+from core.model_registry import ModelRegistry
+
+# Latency buckets in seconds, from regex-only texts to full PDF pages on CPU
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PAYLOAD_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Stages of GuardAnalyzerEngine.analyze_batch
+STAGE_CHUNKING = "chunking"
+STAGE_NLP_ARTIFACTS = "nlp_artifacts"
+STAGE_MODEL_PREDICTIONS = "model_predictions"
+STAGE_RECOGNIZERS = "recognizers"
+STAGE_CONTEXT_ENHANCER = "context_enhancer"
+# Score filter and de-duplication of Presidio, and merging the results of the windows
+STAGE_DEDUPLICATION = "deduplication"
+
+BYTES_PER_MB = 1024 * 1024
+
+
+def metrics_available() -> bool:
+    """Return whether prometheus_client is installed."""
+    return CollectorRegistry is not None
+
+
+class ModelMemoryCollector:
+    """
+    Collector reporting the memory of the shared models and the loaded languages when scraped.
+
+    :param model_registry: The registry of the shared models.
+    :param model_managers: Callable returning the LanguageModelManagers of the engines.
+    """
+
+    def __init__(self, model_registry: ModelRegistry, model_managers: Callable[[], Iterable]):
+        self.model_registry = model_registry
+        self.model_managers = model_managers
+
+    def collect(self):
+        report = self.model_registry.report()
+        resident_memory = GaugeMetricFamily(
+            "guard_resident_memory_bytes", "Resident memory of the worker process."
+        )
+        resident_memory.add_metric([], report["resident_memory_mb"] * BYTES_PER_MB)
+        yield resident_memory
+
+        model_memory = GaugeMetricFamily(
+            "guard_model_memory_bytes",
+            "Memory of a shared model, estimated while loading it.",
+            labels=["model_id", "device", "precision"],
+        )
+        model_references = GaugeMetricFamily(
+            "guard_model_references",
+            "Languages and recognizers using a shared model.",
+            labels=["model_id", "device", "precision"],
+        )
+        for model in report["models"]:
+            labels = [model["model_id"], model["device"], model["precision"]]
+            model_memory.add_metric(labels, model["memory_mb"] * BYTES_PER_MB)
+            model_references.add_metric(labels, model["references"])
+        yield model_memory
+        yield model_references
+
+        language_memory = GaugeMetricFamily(
+            "guard_language_memory_bytes",
+            "Memory of the loaded models of a language, estimated while loading them.",
+            labels=["language"],
+        )
+        languages = {}
+        for model_manager in self.model_managers():
+            # Profiles may share their model manager
+            languages.update(model_manager.stats()["loaded"])
+        for language, stats in languages.items():
+            language_memory.add_metric([language], stats["memory_mb"] * BYTES_PER_MB)
+        yield language_memory
+
+
+class AnalyzerMetrics:
+    """
+    Prometheus metrics of the analyzer server.
+
+    Requests are counted with their payload size and latency per endpoint.
+    GuardAnalyzerEngine reports the duration of each stage and recognizer of an
+    analysis by language through ``observe_analysis``. The memory gauges are
+    read from the model registry when scraped.
+
+    With PROMETHEUS_MULTIPROC_DIR set (e.g. by gunicorn.conf.py), the counters
+    and histograms of all worker processes are aggregated. The memory gauges
+    are the ones of the worker answering the scrape.
+
+    :param model_registry: The registry of the shared models.
+    :param model_managers: Callable returning the LanguageModelManagers of the engines.
+    """
+
+    def __init__(
+        self,
+        model_registry: ModelRegistry,
+        model_managers: Callable[[], Iterable] = tuple,
+    ):
+        if not metrics_available():
+            raise ImportError("Metrics require prometheus_client: pip install prometheus-client")
+
+        self.registry = CollectorRegistry(auto_describe=True)
+        self.requests = Counter(
+            "guard_requests",
+            "Requests by endpoint and status code.",
+            ["endpoint", "status"],
+            registry=self.registry,
+        )
+        self.request_payload = Histogram(
+            "guard_request_payload_bytes",
+            "Size of the request bodies.",
+            ["endpoint"],
+            buckets=PAYLOAD_BUCKETS,
+            registry=self.registry,
+        )
+        self.request_latency = Histogram(
+            "guard_request_latency_seconds",
+            "End-to-end latency of the requests.",
+            ["endpoint"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.stage_latency = Histogram(
+            "guard_stage_latency_seconds",
+            "Duration of a stage of an analysis (one analyze or analyze_batch call).",
+            ["stage", "language"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.recognizer_latency = Histogram(
+            "guard_recognizer_latency_seconds",
+            "Time a recognizer spent on an analysis, including its batch predictions.",
+            ["recognizer", "language"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.memory_collector = ModelMemoryCollector(model_registry, model_managers)
+        self.registry.register(self.memory_collector)
+
+    def observe_request(self, endpoint: str, status: int, payload_bytes: int, seconds: float) -> None:
+        """Count a request with its payload size and latency."""
+        self.requests.labels(endpoint, str(status)).inc()
+        self.request_payload.labels(endpoint).observe(payload_bytes)
+        self.request_latency.labels(endpoint).observe(seconds)
+
+    def observe_analysis(
+        self, language: str, stages: Dict[str, float], recognizers: Dict[str, float]
+    ) -> None:
+        """
+        Record the durations of an analysis.
+
+        :param language: The language of the analyzed texts.
+        :param stages: Seconds spent per stage.
+        :param recognizers: Seconds spent per recognizer name.
+        """
+        for stage, seconds in stages.items():
+            self.stage_latency.labels(stage, language).observe(seconds)
+        for recognizer, seconds in recognizers.items():
+            self.recognizer_latency.labels(recognizer, language).observe(seconds)
+
+    def exposition(self) -> Tuple[bytes, str]:
+        """Return the metrics in the Prometheus text format, and its content type."""
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            registry.register(self.memory_collector)
+        else:
+            registry = self.registry
+        return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from logging import Logger
+from typing import Any, Dict, List, Optional, Tuple
+
+from presidio_analyzer import RecognizerResult
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-text analyze calls into batched engine calls.
+
+    Every call to ``analyze`` is queued and blocks until its result is ready.
+    A background worker collects queued calls for at most ``max_wait_ms``
+    (or until ``max_batch_size`` calls are waiting), groups them by language
+    and analyze parameters and runs each group through
+    ``GuardAnalyzerEngine.analyze_batch``. The results are then handed back
+    to the waiting callers.
+
+    :param engine: The engine offering analyze_batch().
+    :param max_wait_ms: How long the first queued call waits for company.
+    :param max_batch_size: Maximum number of calls combined into one batch.
+    :param timeout_seconds: Time budget of a batch; a call waits at most this long (plus max_wait_ms) for its results.
+    :param logger: Optional logger for batch statistics and failures.
+    """
+
+    def __init__(
+        self,
+        engine,
+        max_wait_ms: float = 5,
+        max_batch_size: int = 32,
+        timeout_seconds: float = 300,
+        logger: Optional[Logger] = None,
+    ):
+        self.engine = engine
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout_seconds
+        self.logger = logger
+
+        self._queue: "queue.Queue[Tuple[Tuple, str, Dict[str, Any], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def analyze(self, text: str, language: str, **kwargs) -> List[RecognizerResult]:
+        """
+        Analyze a single text as part of the next batch.
+
+        :param text: The text to analyze.
+        :param language: The language of the text.
+        :param kwargs: Additional parameters for AnalyzerEngine.analyze.
+        :return: The results of the text, as returned by the engine.
+        :raises concurrent.futures.TimeoutError: If the results are not ready within the time budget.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((self._batch_key(language, kwargs), text, kwargs, future))
+        return future.result(timeout=self.max_wait + self.timeout)
+
+    @classmethod
+    def _batch_key(cls, language: str, kwargs: Dict[str, Any]) -> Tuple:
+        """Only calls sharing language and parameters can be batched together."""
+        try:
+            key = (language,) + tuple((name, cls._freeze(value)) for name, value in sorted(kwargs.items()))
+            hash(key)
+        except TypeError:
+            # Parameters that cannot be compared make up a batch of their own
+            return (language, object())
+        return key
+
+    @classmethod
+    def _freeze(cls, value: Any) -> Any:
+        """Return a hashable equivalent of lists, sets and dicts of request parameters."""
+        if isinstance(value, (list, tuple)):
+            return tuple(cls._freeze(item) for item in value)
+        if isinstance(value, (set, frozenset)):
+            return frozenset(cls._freeze(item) for item in value)
+        if isinstance(value, dict):
+            return tuple(sorted((name, cls._freeze(item)) for name, item in value.items()))
+        return value
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="guard-micro-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[Tuple, str, Dict[str, Any], Future]]) -> None:
+        """Run the batch, every future gets its results or an exception, whatever fails."""
+        try:
+            groups: Dict[Tuple, List[Tuple[str, Dict[str, Any], Future]]] = {}
+            for key, text, kwargs, future in batch:
+                groups.setdefault(key, []).append((text, kwargs, future))
+        except Exception as e:
+            self._fail([future for _, _, _, future in batch], e, "Grouping a micro-batch")
+            return
+
+        if self.logger:
+            self.logger.debug(
+                "Micro-batch of %d request(s) in %d group(s)", len(batch), len(groups)
+            )
+
+        for key, items in groups.items():
+            futures = [future for _, _, future in items]
+            try:
+                batch_results = self.engine.analyze_batch(
+                    texts=[text for text, _, _ in items],
+                    language=key[0],
+                    **items[0][1],
+                )
+                if len(batch_results) != len(futures):
+                    raise ValueError(
+                        f"analyze_batch returned {len(batch_results)} result lists for {len(futures)} texts"
+                    )
+                for future, results in zip(futures, batch_results):
+                    future.set_result(results)
+            except Exception as e:
+                self._fail(futures, e, f"Micro-batch for language '{key[0]}'")
+
+    def _fail(self, futures: List[Future], error: Exception, what: str) -> None:
+        if self.logger:
+            self.logger.error(f"{what} failed. {error}")
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
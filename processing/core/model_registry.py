@@ -0,0 +1,130 @@
+import gc
+import threading
+from logging import Logger
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import torch
+
+from core.language_models import resident_memory_mb
+
+# Precision of models loaded as they are, quantized models use their quantization mode instead
+DEFAULT_PRECISION = "fp32"
+
+
+class ModelKey(NamedTuple):
+    """Identity of a loaded model: models with the same key share one instance."""
+
+    model_id: str
+    device: str
+    precision: str = DEFAULT_PRECISION
+
+
+def default_device() -> str:
+    """Return the device models are loaded to."""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+class ModelRegistry:
+    """
+    Process-wide registry handing out shared, read-only model instances.
+
+    ``acquire`` loads a model on the first request of its key and returns the
+    same instance to every later request, counting the references. ``release``
+    drops a reference, the model is unloaded with the last one. Torch models
+    are put into evaluation mode without gradients, as they are shared by all
+    recognizers and engines of the process.
+
+    :param logger: Optional logger for loads and unloads.
+
+    :example:
+    >key = ModelKey("flair/ner-german", default_device())
+    >tagger = model_registry.acquire(key, lambda: SequenceTagger.load("flair/ner-german"))
+    >model_registry.release(tagger)
+    """
+
+    def __init__(self, logger: Optional[Logger] = None):
+        self.logger = logger
+        self._models: Dict[ModelKey, Any] = {}
+        self._references: Dict[ModelKey, int] = {}
+        self._memory_mb: Dict[ModelKey, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+
+    def acquire(self, key: ModelKey, loader: Callable[[], Any]) -> Any:
+        """
+        Return the shared model of a key, loading it if needed.
+
+        :param key: The identity of the model.
+        :param loader: Callable loading the model, only called if it is not loaded yet.
+        :return: The shared model.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests of one key wait for a single load
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._references[key] += 1
+                    return self._models[key]
+
+            if self.logger: self.logger.info("Loading shared model %s", key)
+            memory_before = resident_memory_mb()
+            model = self._freeze(loader())
+            memory_growth = max(0.0, resident_memory_mb() - memory_before)
+
+            with self._lock:
+                self._models[key] = model
+                self._references[key] = 1
+                self._memory_mb[key] = memory_growth
+        return model
+
+    def release(self, model: Any) -> None:
+        """
+        Drop a reference to a shared model, unloading it with the last reference.
+
+        :param model: A model returned by ``acquire``.
+        """
+        with self._lock:
+            key = next((key for key, shared in self._models.items() if shared is model), None)
+            if key is None:
+                return
+            self._references[key] -= 1
+            if self._references[key] > 0:
+                return
+            del self._models[key], self._references[key], self._memory_mb[key]
+
+        gc.collect()
+        if self.logger: self.logger.info("Unloaded shared model %s", key)
+
+    def report(self) -> Dict[str, Any]:
+        """Return the loaded models with their references and estimated memory, and the resident memory of the process."""
+        with self._lock:
+            models = [
+                {
+                    **key._asdict(),
+                    "references": self._references[key],
+                    "memory_mb": round(self._memory_mb[key], 1),
+                }
+                for key in self._models
+            ]
+        return {
+            "resident_memory_mb": round(resident_memory_mb(), 1),
+            "model_memory_mb": round(sum(model["memory_mb"] for model in models), 1),
+            "models": models,
+        }
+
+    @staticmethod
+    def _freeze(model: Any) -> Any:
+        modules = [model] if isinstance(model, torch.nn.Module) else []
+        # Hugging Face pipelines hold their torch model
+        if isinstance(getattr(model, "model", None), torch.nn.Module):
+            modules.append(model.model)
+        for module in modules:
+            module.eval()
+            module.requires_grad_(False)
+        return model
+
+
+# The registry shared by all engines and recognizers of the process
+model_registry = ModelRegistry()
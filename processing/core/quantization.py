@@ -0,0 +1,30 @@
+import torch
+
+# Supported quantization modes and the weight type they quantize to
+QUANTIZATION_DTYPES = {
+    "int8": torch.qint8,
+}
+
+# Layers quantized dynamically, they hold nearly all weights of the NER models
+QUANTIZED_LAYERS = {torch.nn.Linear, torch.nn.LSTM}
+
+
+def quantize_model(model: torch.nn.Module, mode: str) -> torch.nn.Module:
+    """
+    Return a copy of the model with dynamically quantized linear and LSTM layers.
+
+    Weights are stored as int8, activations are quantized on the fly. This only
+    runs on CPU and trades a little accuracy for faster inference and less memory.
+
+    :param model: The torch model to quantize.
+    :param mode: The quantization mode, one of QUANTIZATION_DTYPES.
+    :return: The quantized model.
+    """
+    if mode not in QUANTIZATION_DTYPES:
+        raise ValueError(
+            f"Unsupported quantization mode '{mode}'. Available: {list(QUANTIZATION_DTYPES)}"
+        )
+    return torch.ao.quantization.quantize_dynamic(
+        model, QUANTIZED_LAYERS, dtype=QUANTIZATION_DTYPES[mode]
+    )
+
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def file_fingerprint(path) -> str:
+    """Return a SHA-256 hash of a file's content, used to tie cache entries to a configuration."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Content-addressed LRU cache for serialized analyzer results.
+
+    Entries are keyed by a hash of the text, its language, the analyze
+    parameters and a fingerprint of the analyzer configuration, so a changed
+    configuration never serves stale results. The values are the JSON-ready
+    results (lists of dicts), exactly as returned by the API.
+
+    Besides the in-process LRU, an optional SQLite file can be used as a
+    second level shared by all workers of a host. Only point it to a location
+    that is not writable by other users.
+
+    :param max_size: Maximum number of entries kept in memory.
+    :param ttl_seconds: Lifetime of an entry, None or 0 to keep entries until evicted.
+    :param fingerprint: Fingerprint of the analyzer configuration.
+    :param disk_path: Optional path of the shared SQLite cache file.
+    :param disk_max_size: Maximum number of entries kept in the SQLite file.
+    """
+
+    DISK_PRUNE_INTERVAL = 100
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        fingerprint: str = "",
+        disk_path: Optional[str] = None,
+        disk_max_size: int = 100000,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds or None
+        self.fingerprint = fingerprint
+        self.disk_path = disk_path
+        self.disk_max_size = disk_max_size
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, Tuple[Optional[float], List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One SQLite connection per thread, so disk reads and writes need no lock of their own
+        self._disk_local = threading.local()
+        self._disk_writes = 0
+
+    def make_key(self, text: str, language: str, **kwargs) -> str:
+        """Build the cache key of an analyze call."""
+        payload = json.dumps(
+            [self.fingerprint, language, text, kwargs], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return the cached results for the key, or None if there are none."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            if not self.disk_path:
+                self.misses += 1
+                return None
+
+        # Other threads keep using the in-memory entries while the file is read
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value, now)
+        return value
+
+    def set(self, key: str, value: List[Dict]) -> None:
+        """Cache the serialized results of an analyze call."""
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+        if self.disk_path:
+            self._disk_set(key, value, now)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_path": self.disk_path,
+            }
+
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.ttl_seconds if self.ttl_seconds else None
+
+    def _store(self, key: str, value: List[Dict], now: float) -> None:
+        self._entries[key] = (self._expires_at(now), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _disk(self) -> sqlite3.Connection:
+        # Connections must not be shared with forked workers, reconnect per process
+        local = self._disk_local
+        if getattr(local, "connection", None) is None or local.pid != os.getpid():
+            connection = sqlite3.connect(self.disk_path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, created_at REAL, expires_at REAL, value TEXT)"
+            )
+            connection.commit()
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _disk_get(self, key: str, now: float) -> Optional[List[Dict]]:
+        row = self._disk().execute(
+            "SELECT expires_at, value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at, value = row
+        if expires_at is not None and expires_at <= now:
+            return None
+        return json.loads(value)
+
+    def _disk_set(self, key: str, value: List[Dict], now: float) -> None:
+        connection = self._disk()
+        connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (key, now, self._expires_at(now), json.dumps(value)),
+        )
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % self.DISK_PRUNE_INTERVAL == 0
+        if prune:
+            connection.execute(
+                "DELETE FROM results WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,),
+            )
+            connection.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY created_at DESC LIMIT ?)",
+                (self.disk_max_size,),
+            )
+        connection.commit()
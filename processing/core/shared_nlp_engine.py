@@ -0,0 +1,149 @@
+import logging
+from typing import Callable, Dict, List, Optional
+
+import spacy
+from spacy.language import Language
+from presidio_analyzer.nlp_engine import NerModelConfiguration, TransformersNlpEngine
+
+from core.model_registry import DEFAULT_PRECISION, ModelKey, default_device, model_registry
+from core.quantization import quantize_model
+
+try:
+    from spacy_huggingface_pipelines.token_classification import HFTokenPipe
+    from transformers import pipeline
+except ImportError:
+    HFTokenPipe = None
+
+logger = logging.getLogger("presidio-analyzer")
+
+SHARED_PIPE_FACTORY = "shared_hf_token_pipe"
+# The component keeps the name of Presidio's pipe, so everything looking for the NER model finds it
+HF_PIPE_NAME = "hf_token_pipe"
+
+
+def acquire_hf_pipeline(
+    model: str, aggregation_strategy: str, stride: Optional[int], quantize: Optional[str] = None
+):
+    """
+    Return the shared token classification pipeline of a transformers model, loading it on first use.
+
+    :param model: Name or path of the Hugging Face model.
+    :param aggregation_strategy: Aggregation strategy of the pipeline.
+    :param stride: Overlap of the chunks of texts longer than the model input.
+    :param quantize: Optional quantization mode of the model, see core.quantization.
+    """
+    device = default_device()
+
+    def load():
+        hf_pipeline = pipeline(
+            task="token-classification",
+            model=model,
+            aggregation_strategy=aggregation_strategy,
+            device=0 if device == "cuda" else -1,
+            stride=stride,
+        )
+        if quantize:
+            hf_pipeline.model = quantize_model(hf_pipeline.model, quantize)
+        return hf_pipeline
+
+    # The pipeline settings are part of the shared instance
+    model_id = f"{model} (aggregation {aggregation_strategy}, stride {stride})"
+    return model_registry.acquire(ModelKey(model_id, device, quantize or DEFAULT_PRECISION), load)
+
+
+def release_pipeline(nlp: Language) -> None:
+    """Release the shared transformers model of a spaCy pipeline."""
+    if HF_PIPE_NAME in nlp.pipe_names:
+        model_registry.release(nlp.get_pipe(HF_PIPE_NAME).hf_pipeline)
+
+
+@Language.factory(
+    SHARED_PIPE_FACTORY,
+    default_config={
+        "model": "",
+        "stride": 16,
+        "aggregation_strategy": "average",
+        "annotate": "spans",
+        "annotate_spans_key": None,
+        "alignment_mode": "strict",
+        "quantize": None,
+        "scorer": None,
+    },
+)
+def make_shared_hf_token_pipe(
+    nlp: Language,
+    name: str,
+    model: str,
+    stride: Optional[int],
+    aggregation_strategy: str,
+    annotate: str,
+    annotate_spans_key: Optional[str],
+    alignment_mode: str,
+    quantize: Optional[str],
+    scorer: Optional[Callable],
+):
+    """spaCy component annotating docs like hf_token_pipe, with a transformers model shared by all pipelines."""
+    return HFTokenPipe(
+        name=name,
+        hf_pipeline=acquire_hf_pipeline(model, aggregation_strategy, stride, quantize),
+        annotate=annotate,
+        annotate_spans_key=annotate_spans_key,
+        alignment_mode=alignment_mode,
+        scorer=scorer,
+    )
+
+
+class SharedTransformersNlpEngine(TransformersNlpEngine):
+    """
+    TransformersNlpEngine taking its transformers models from the process-wide model registry.
+
+    Languages configured with the same transformers model (e.g. a multilingual
+    one) share one instance of it, as do other engines of the process.
+
+    :param models: The models of the TransformersNlpEngine.
+    :param ner_model_configuration: Parameters for the NER model.
+    :param quantize: Optional quantization mode of the transformers models, see core.quantization.
+    """
+
+    pipe_factory = SHARED_PIPE_FACTORY
+
+    def __init__(
+        self,
+        models: Optional[List[Dict]] = None,
+        ner_model_configuration: Optional[NerModelConfiguration] = None,
+        quantize: Optional[str] = None,
+    ):
+        super().__init__(models=models, ner_model_configuration=ner_model_configuration)
+        self.quantize = quantize
+
+    def load(self) -> None:
+        """Load the spaCy models and add the shared transformers models."""
+        logger.debug(f"Loading SpaCy and shared transformers models: {self.models}")
+
+        self._enable_gpu()
+        self.nlp = {}
+
+        for model in self.models:
+            self._validate_model_params(model)
+            spacy_model = model["model_name"]["spacy"]
+            self._download_spacy_model_if_needed(spacy_model)
+
+            nlp = spacy.load(spacy_model, disable=["parser", "ner"])
+            nlp.add_pipe(
+                self.pipe_factory,
+                name=HF_PIPE_NAME,
+                config=self._pipe_config(model["model_name"]["transformers"]),
+            )
+            self.nlp[model["lang_code"]] = nlp
+
+    def _pipe_config(self, transformers_model: str) -> Dict:
+        """Return the configuration of the component running the transformers model."""
+        return {
+            "model": transformers_model,
+            "annotate": "spans",
+            "stride": self.ner_model_configuration.stride,
+            "alignment_mode": self.ner_model_configuration.alignment_mode,
+            "aggregation_strategy": self.ner_model_configuration.aggregation_strategy,
+            "annotate_spans_key": self.entity_key,
+            "quantize": self.quantize,
+        }
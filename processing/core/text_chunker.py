@@ -0,0 +1,105 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Callable, List, Optional, Tuple
+
+
+class SentenceWindowChunker:
+    """
+    Split long texts into overlapping, sentence-aligned windows.
+
+    Windows hold at most ``window_tokens`` tokens and end at a sentence
+    boundary whenever possible. Consecutive windows share up to
+    ``overlap_tokens`` tokens (whole sentences where possible), so entities
+    close to a window border are seen in full by at least one window. Only a
+    sentence longer than a whole window is cut in between two words.
+
+    Tokens are the whitespace separated words of the text, unless ``split``
+    gets a function counting the tokens of the NER model per word. German
+    compounds and numbers make up several subword tokens of a transformer
+    model, counting them keeps the windows within the input of the model.
+
+    :param window_tokens: Maximum number of tokens per window.
+    :param overlap_tokens: Maximum number of tokens shared by consecutive windows.
+
+    :example:
+    >chunker = SentenceWindowChunker(window_tokens=300, overlap_tokens=30)
+    >for start, end in chunker.split(text):
+    >    print(text[start:end])
+    """
+
+    TOKEN_PATTERN = re.compile(r"\S+")
+    # A sentence ends with punctuation followed by whitespace, or with an empty line
+    SENTENCE_END_PATTERN = re.compile(r"[.!?]\s+|\n\s*\n")
+
+    def __init__(self, window_tokens: int = 300, overlap_tokens: int = 30):
+        if window_tokens <= 0:
+            raise ValueError("window_tokens must be greater than 0")
+        if not 0 <= overlap_tokens < window_tokens:
+            raise ValueError("overlap_tokens must be between 0 and window_tokens")
+
+        self.window_tokens = window_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def split(
+        self, text: str, count_tokens: Optional[Callable[[List[str]], List[int]]] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Return the (start, end) character offsets of the windows covering the text.
+
+        Texts fitting into a single window are returned as one window spanning the whole text.
+
+        :param text: The text to split.
+        :param count_tokens: Optional function returning the number of tokens of each word,
+            e.g. of the tokenizer of the NER model. Each word counts as one token without it.
+        """
+        words = [(match.start(), match.end()) for match in self.TOKEN_PATTERN.finditer(text)]
+        if count_tokens and words:
+            counts = [max(1, count) for count in count_tokens([text[start:end] for start, end in words])]
+        else:
+            counts = [1] * len(words)
+        # Tokens before each word, and of the whole text at the end
+        positions = list(accumulate(counts, initial=0))
+        if positions[-1] <= self.window_tokens:
+            return [(0, len(text))]
+
+        sentence_ends = {match.end() for match in self.SENTENCE_END_PATTERN.finditer(text)}
+        # Word indices starting a new sentence
+        sentence_starts = {
+            index for index, (start, _) in enumerate(words)
+            if index > 0 and start in sentence_ends
+        }
+
+        windows = []
+        first = 0
+        while True:
+            # The words fitting into the window, at least one
+            last = max(first + 1, bisect_right(positions, positions[first] + self.window_tokens) - 1)
+            if last < len(words):
+                # End the window before the last sentence start it would cut
+                boundary = max(
+                    (index for index in range(first + 1, last + 1) if index in sentence_starts),
+                    default=None,
+                )
+                cut_sentence = boundary is None
+                if not cut_sentence:
+                    last = boundary
+
+            windows.append((words[first][0], words[last - 1][1]))
+            if last >= len(words):
+                break
+
+            overlap_start = max(first + 1, bisect_left(positions, positions[last] - self.overlap_tokens))
+            if cut_sentence:
+                first = overlap_start
+            else:
+                # Share whole sentences only, or nothing if the last sentence is too long
+                first = min(
+                    (index for index in range(overlap_start, last) if index in sentence_starts),
+                    default=last,
+                )
+
+        # The first and the last window reach to the borders of the text
+        windows[0] = (0, windows[0][1])
+        windows[-1] = (windows[-1][0], len(text))
+        return windows
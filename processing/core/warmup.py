@@ -0,0 +1,59 @@
+import time
+from logging import Logger
+from typing import Dict, Iterable, List, Optional
+
+# Representative texts per language, covering the entities of the pattern and model-based recognizers
+WARMUP_TEXTS: Dict[str, List[str]] = {
+    "de": [
+        "Sehr geehrte Frau Anna Huber, wir bestätigen Ihren Termin am 12.03.2024 in der Maria-Theresien-Straße 18, 6020 Innsbruck.",
+        "Herr Thomas Berger (thomas.berger@example.at, +43 512 508 1234) ist mit dem Fahrzeug I-123AB bei der Firma Swarovski angestellt.",
+        "Die Zahlung erfolgt auf das Konto AT61 1904 3002 3457 3201 des Landes Tirol.",
+    ],
+    "en": [
+        "Dear Ms. Jane Smith, we confirm your appointment on March 12, 2024 at 221B Baker Street, London.",
+        "Mr. John Miller (john.miller@example.com, +44 20 7946 0958) works for Microsoft in Seattle.",
+        "Please transfer the amount to the account GB82 WEST 1234 5698 7654 32.",
+    ],
+    "it": [
+        "Gentile Signora Giulia Rossi, confermiamo il suo appuntamento del 12/03/2024 in Via Roma 15, Bolzano.",
+        "Il signor Marco Bianchi (marco.bianchi@example.it, +39 0471 123456) lavora per la Ferrari a Maranello.",
+        "Il pagamento avviene sul conto IT60 X054 2811 1010 0000 0123 456.",
+    ],
+}
+
+# Texts of languages without their own warm-up texts
+DEFAULT_WARMUP_LANGUAGE = "en"
+
+
+def warm_up_engine(
+    engine, languages: Optional[Iterable[str]] = None, logger: Optional[Logger] = None
+) -> Dict[str, float]:
+    """
+    Run representative texts of each language through all recognizers of the engine.
+
+    The first inference of a model pays for lazy initialization (thread pools,
+    memory allocation, kernel selection), which would otherwise slow down the
+    first requests. Every language analyzes one text on its own and all texts as
+    a batch, so both request shapes are warmed up.
+
+    :param engine: The GuardAnalyzerEngine to warm up.
+    :param languages: The languages to warm up. Defaults to the loaded languages
+        of the engine's model manager, or all supported languages without one.
+    :param logger: Optional logger reporting the duration per language.
+    :return: The warm-up duration in seconds per language.
+    """
+    if languages is None:
+        model_manager = getattr(engine, "model_manager", None)
+        languages = (
+            model_manager.loaded_languages() if model_manager else engine.supported_languages
+        )
+
+    durations = {}
+    for language in languages:
+        texts = WARMUP_TEXTS.get(language, WARMUP_TEXTS[DEFAULT_WARMUP_LANGUAGE])
+        start = time.perf_counter()
+        engine.analyze_batch(texts[:1], language=language)
+        engine.analyze_batch(texts, language=language)
+        durations[language] = round(time.perf_counter() - start, 3)
+        if logger: logger.info("Warmed up '%s' in %.2fs", language, durations[language])
+    return durations
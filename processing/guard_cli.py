@@ -2,12 +2,22 @@ import os
 import sys
 import json
 import argparse
+import itertools
+import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing.util import Finalize
+from functools import partial
 from typing import List, Dict, Any
 from pathlib import Path
+import fitz
 import requests
+from utils.analyzer_client import (
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, AnalyzerClient, AsyncAnalyzerClient, async_available
+)
 from utils.file_handler import FileHandler
+from utils.page_queue import PageWorkQueue, default_workers
+from utils.timing_report import TimingReport
 from dotenv import load_dotenv
 
 DEFAULT_LANGUAGE="de"
@@ -18,6 +28,27 @@ presidio_api_endpoint = os.environ.get("PRESIDIO_API_ENDPOINT")
 presidio_api_analysis = presidio_api_endpoint + "/analyze"
 
 used_language = DEFAULT_LANGUAGE
+# Engine profile of the analyzer (e.g. fast, balanced, accurate), None for its default profile
+used_profile = None
+# Timing breakdown of every page, requested with --timing and aggregated per document
+timing_report = None
+# Pooled HTTP client of the analyzer, configured by main() from the command line
+analyzer_client = AnalyzerClient(presidio_api_analysis)
+
+TIMING_REPORT_FILE = "timing_report.json"
+# Threads extracting and redacting with PyMuPDF in the async mode, which holds the GIL anyway
+ASYNC_PDF_WORKERS = 2
+# Threads of a worker process (--processes) analyzing the pages of its document
+PROCESS_THREADS = 4
+# Documents queued per worker process, so the processes never wait for the paths
+PENDING_DOCUMENTS_PER_PROCESS = 2
+# Documents queued per thread with JSON input (--json-input), so only a few are open at the same time
+PENDING_DOCUMENTS_PER_THREAD = 2
+# Settings of a worker process and what it reuses for all its documents, set by init_worker_process
+worker_settings = None
+worker_page_queue = None
+worker_loop = None
+worker_async_client = None
 
 LANGUAGES_DISPLAY = {
     "de": "German",
@@ -28,10 +59,10 @@ LANGUAGES_DISPLAY = {
 #TODO: Verbose mode maybe?
 
 #check if presidio is available
-def check_api_available(api_endpoint: str):
-    """Checks if the refered Presidio-API endpoint is available."""
+def check_api_available(api_endpoint: str, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+    """Checks if the refered Presidio-API endpoint is available, waiting at most the (connect, read) timeout."""
     try:
-        response = requests.get(api_endpoint + "/health")
+        response = requests.get(api_endpoint + "/health", timeout=timeout)
         if response.status_code != 200:
             print(f"Presidio service not available! Received:", response.status_code)
             sys.exit(1)
@@ -78,9 +109,100 @@ def process_presidio_results(results, page, text, should_redact=True, verbose =
     if should_redact:
         page.apply_redactions()
 
+def build_analysis_request(text, generate_log=False):
+    """
+    Return the body of the analysis request of a page text.
+
+    Args:
+        text (str): Full text content of the page.
+        generate_log (bool): If True, the full results are requested for the JSON logs.
+    """
+    # Redacting only needs the offsets, the compact response skips the explanations and metadata
+    built_request = {
+        "text": text,
+        "language": used_language,
+        "compact": not generate_log
+    }
+    if used_profile:
+        built_request["profile"] = used_profile
+    if timing_report:
+        built_request["timing"] = True
+    return built_request
+
+def read_analysis_response(response, pdf_name, log, generate_log=False):
+    """
+    Read the response of a page analysis into its log.
+
+    Args:
+        response: The response of the analyzer client.
+        pdf_name (str): Name of the PDF, for messages and the timing report.
+        log (Dict): The log of the page, its "response" is set.
+        generate_log: If True, the full results are requested and the log also keeps the body of error responses.
+
+    Returns:
+        List: The recognized entities, or None if the analysis failed.
+    """
+    if response.status_code != 200:
+        if generate_log:
+            try:
+                log["response"] = response.json()
+            except ValueError:
+                log["response"] = response.text
+        with threading.Lock():
+            print(f"Presidio error for: {pdf_name} ")
+            print(response.text)
+        return None
+
+    response_json = response.json()
+    # Timed responses wrap the results, the logs keep the results only
+    if timing_report:
+        timing_report.add_page(pdf_name, log["page"], response_json["timing"])
+        response_json = response_json["results"]
+    log["response"] = response_json
+    return response_json
+
+def report_unreachable(pdf_name, error):
+    with threading.Lock():
+        print(f"Presidio error for: {pdf_name} ")
+        print(f"Could not reach presidio service: {error}")
+
+def analyze_page(text, pdf_name, page_number, generate_log=False):
+    """
+    Analyze the text of one PDF page using Presidio.
+
+    Args:
+        text (str): Full text content of the page.
+        pdf_name (str): Name of the PDF, for messages and the timing report.
+        page_number (int): Number of the page, starting at 0.
+        generate_log: If True, the full results are requested and the log also keeps the body of error responses.
+
+    Returns:
+        Tuple: (recognized entities, or None if the analysis failed,
+                {"page": page_number, "request": request body, "response": presidio response body})
+    """
+    built_request = build_analysis_request(text, generate_log)
+    log = {"page": page_number, "request": built_request, "response": None}
+    try:
+        response = analyzer_client.post(built_request)
+    except requests.exceptions.RequestException as e:
+        report_unreachable(pdf_name, e)
+        return None, log
+    return read_analysis_response(response, pdf_name, log, generate_log), log
+
+async def analyze_page_async(client, text, pdf_name, page_number, generate_log=False):
+    """Like analyze_page, sending the request with an AsyncAnalyzerClient."""
+    built_request = build_analysis_request(text, generate_log)
+    log = {"page": page_number, "request": built_request, "response": None}
+    try:
+        response = await client.post(built_request)
+    except requests.exceptions.RequestException as e:
+        report_unreachable(pdf_name, e)
+        return None, log
+    return read_analysis_response(response, pdf_name, log, generate_log), log
+
 def process_pdf(pdf, generate_log=False, verbose=False, should_redact=True) -> List[Dict[str, Any]]:
     """
-    Analyze and redact sensitive information in a single PDF file using Presidio.
+    Analyze and redact sensitive information in a single PDF file using Presidio, one page after the other.
 
     Args:
         pdf (fitz.Document): A PyMuPDF document object representing the input PDF.
@@ -93,32 +215,42 @@ def process_pdf(pdf, generate_log=False, verbose=False, should_redact=True) -> L
     """
 
     logs = []
-    count = 0
     pdf_name = Path(pdf.name).name
     with threading.Lock():
         print("Processing: " + pdf_name)
-    for page in pdf:
+    for page_number, page in enumerate(pdf):
         text = page.get_text()
-        built_request = {
-            "text": text,
-            "language": used_language
-        }
-        response = requests.post(presidio_api_analysis, json=built_request)
+        results, log = analyze_page(text, pdf_name, page_number, generate_log)
         if generate_log:
-            logs.append({"page": count, "request": built_request, "response": response.json()})
-
-
-        if response.status_code != 200:
-            with threading.Lock():
-                print(f"Presidio error for: {pdf_name} ")
-                print(response.text)
+            logs.append(log)
+        if results is None:
             continue
-
-        results = response.json()
         process_presidio_results(results=results, page=page, text=text, should_redact=should_redact)
-        count += 1
     return logs
 
+def finish_document(pdf, analyses, output_dir, log_to_json=False, should_redact=True, close=False):
+    """
+    Redact the pages of an analyzed PDF in page order and save it, with its logs.
+
+    Args:
+        pdf (fitz.Document): The analyzed PyMuPDF document object.
+        analyses (List[Tuple]): The return values of analyze_page for every page, in page order.
+        output_dir (Path): The output directory where redacted files will be stored.
+        log_to_json (bool): If True, save Presidio input/output logs. Defaults to False.
+        should_redact (bool): If True, redact. If False, highlight. Defaults to True.
+        close (bool): If True, the document is closed once it is saved. Defaults to False.
+    """
+    try:
+        for page, (results, log) in zip(pdf, analyses):
+            if results is not None:
+                process_presidio_results(results=results, page=page, text=log["request"]["text"], should_redact=should_redact)
+        save_pdf(pdf=pdf, output_dir=output_dir, has_been_highlighted=(not should_redact))
+        if log_to_json:
+            save_logs_for_pdf(pdf=pdf, output_dir=output_dir, log_dict=[log for _, log in analyses])
+    finally:
+        if close:
+            pdf.close()
+
 def process_pdf_with_json(pdf, json_dir, verbose=False, should_redact=True) -> None:
     """
     Redact sensitive information in a single PDF file using a JSON input file instead of Presidio API.
@@ -265,40 +397,346 @@ def process_single_document(pdf, output_dir, log_to_json=False, should_redact=Tr
             save_logs_for_pdf(pdf=pdf, output_dir=output_dir, log_dict=log_dict)
 
 
-def process_document_list(document_list, output_dir, log_to_json=False, should_redact=True, json_input_dir=None, max_workers=None):
+def open_document(source):
+    """
+    Return the PyMuPDF document of a source, opening it if the source is a path.
+
+    Args:
+        source (Union[fitz.Document, Path, str]): An open document, or the path of a PDF.
+
+    Returns:
+        fitz.Document: The document, or None if the PDF could not be opened.
+    """
+    if not isinstance(source, (str, Path)):
+        return source
+    try:
+        return fitz.open(str(source))
+    except Exception as e:
+        with threading.Lock():
+            print(f"[ERROR] Failed to open {source}: {e}")
+        return None
+
+def close_document(pdf, source):
+    """Close a document opened by open_document, documents passed in open are left open."""
+    if pdf is not source:
+        pdf.close()
+
+def close_unfinished_document(pdf, source, *_):
+    """Close a document opened by open_document if it failed before finish_document closed it."""
+    if not pdf.is_closed:
+        close_document(pdf, source)
+
+def process_source(source, output_dir, log_to_json=False, should_redact=True, json_input_dir=None):
+    """Open a document source, process it with process_single_document and close it again."""
+    pdf = open_document(source)
+    if pdf is None:
+        return
+    try:
+        process_single_document(pdf=pdf, output_dir=output_dir, log_to_json=log_to_json,
+                                should_redact=should_redact, json_input_dir=json_input_dir)
+    finally:
+        close_document(pdf, source)
+
+def process_document_list(document_list, output_dir, log_to_json=False, should_redact=True, json_input_dir=None, max_workers=None, page_queue=None):
     """
     Process a list of PDFs in parallel, redacting sensitive content and saving results.
 
+    The pages of all documents are analyzed by the worker threads in one bounded work queue, so a
+    long document does not hold up a single thread. Each document is redacted in page order and saved
+    as soon as its last page is analyzed.
+
+    The list may be a generator of paths: a PDF is only opened when the queue has room for its pages,
+    and closed right after it is saved.
+
     Args:
-        document_list (List[fitz.Document]): A list of PyMuPDF PDF document objects.
+        document_list (Iterable[Union[fitz.Document, Path]]): PyMuPDF PDF document objects or paths of PDFs.
         output_dir (Path): The output directory where redacted files will be stored.
         log_to_json (bool): If True, save Presidio input/output logs. Defaults to False.
         should_redact (bool): If True, redact. If False, highlight. Defaults to True.
         json_input_dir (Path): Path to directory containing JSON files with redaction information. If provided,
                               uses these files instead of calling Presidio API. Defaults to None.
         max_workers (int, optional): Maximum number of worker threads. If None, uses default based on system.
+        page_queue (PageWorkQueue, optional): Queue to analyze the pages in, kept running afterwards.
+                                              If None, a queue of max_workers threads is used for this call.
+
+    Returns:
+        int: The number of documents processed.
+    """
+    document_count = 0
+    # Only the futures of unfinished documents are kept, a run may cover millions of documents
+    pending = set()
+    lock = threading.Lock()
+    errors = []
+
+    def collect_error(future):
+        with lock:
+            pending.discard(future)
+        if future.exception() is not None:
+            errors.append(future.exception())
+
+    if not json_input_dir:
+        own_queue = page_queue is None
+        if own_queue:
+            page_queue = PageWorkQueue(max_workers=max_workers)
+        try:
+            for source in document_list:
+                pdf = open_document(source)
+                if pdf is None:
+                    continue
+                document_count += 1
+                pdf_name = Path(pdf.name).name
+                with threading.Lock():
+                    print("Processing: " + pdf_name)
+                # The text of a page is extracted when the queue has room for it
+                pages = (
+                    partial(analyze_page, page.get_text(), pdf_name, page_number, log_to_json)
+                    for page_number, page in enumerate(pdf)
+                )
+                future = page_queue.submit_document(pages, partial(
+                    finish_document,
+                    pdf,
+                    output_dir=output_dir,
+                    log_to_json=log_to_json,
+                    should_redact=should_redact,
+                    close=pdf is not source
+                ))
+                with lock:
+                    pending.add(future)
+                # finish_document is skipped if a page failed, the document must still be closed
+                future.add_done_callback(partial(close_unfinished_document, pdf, source))
+                future.add_done_callback(collect_error)
+        finally:
+            with lock:
+                unfinished = list(pending)
+            wait(unfinished)
+            if own_queue:
+                page_queue.shutdown()
+    else:
+        # JSON input needs no analysis, the documents are processed in parallel
+        workers = max_workers or default_workers()
+        slots = threading.BoundedSemaphore(workers * PENDING_DOCUMENTS_PER_THREAD)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for source in document_list:
+                slots.acquire()
+                document_count += 1
+                future = executor.submit(
+                    process_source,
+                    source=source,
+                    output_dir=output_dir,
+                    log_to_json=log_to_json,
+                    should_redact=should_redact,
+                    json_input_dir=json_input_dir
+                )
+                future.add_done_callback(lambda future: slots.release())
+                future.add_done_callback(collect_error)
+
+    if errors:
+        raise errors[0]
+    return document_count
+
+
+async def process_document_list_async(document_list, client, output_dir, log_to_json=False, should_redact=True, max_inflight=64, max_workers=None):
+    """
+    Process a list of PDFs with asyncio, redacting sensitive content and saving results.
+
+    Up to max_inflight pages of all documents are analyzed at the same time, by one thread. Text extraction
+    and redaction (PyMuPDF) run in a small thread pool, one call per document. Each document is redacted in page order and saved as
+    soon as its last page is analyzed. At most max_inflight documents are open at the same time.
+
+    Args:
+        document_list (Iterable[Union[fitz.Document, Path]]): PyMuPDF PDF document objects or paths of PDFs.
+        client (AsyncAnalyzerClient): The client sending the analysis requests, not entered yet.
+        output_dir (Path): The output directory where redacted files will be stored.
+        log_to_json (bool): If True, save Presidio input/output logs. Defaults to False.
+        should_redact (bool): If True, redact. If False, highlight. Defaults to True.
+        max_inflight (int): Maximum number of pages analyzed at the same time.
+        max_workers (int, optional): Number of threads running PyMuPDF. Defaults to ASYNC_PDF_WORKERS.
+
+    Returns:
+        int: The number of documents processed.
+    """
+    loop = asyncio.get_running_loop()
+    inflight = asyncio.Semaphore(max_inflight)
+    open_documents = asyncio.Semaphore(max_inflight)
+    document_count = 0
+    # Only the running tasks are kept, a run may cover millions of documents
+    tasks = set()
+    errors = []
+
+    def task_done(task):
+        tasks.discard(task)
+        if task.exception() is not None:
+            errors.append(task.exception())
+
+    async with client:
+        with ThreadPoolExecutor(max_workers=max_workers or ASYNC_PDF_WORKERS) as executor:
+            async def analyze(text, pdf_name, page_number):
+                async with inflight:
+                    return await analyze_page_async(client, text, pdf_name, page_number, log_to_json)
+
+            async def process(source):
+                nonlocal document_count
+                try:
+                    pdf = await loop.run_in_executor(executor, open_document, source)
+                    if pdf is None:
+                        return
+                    document_count += 1
+                    pdf_name = Path(pdf.name).name
+                    with threading.Lock():
+                        print("Processing: " + pdf_name)
+                    try:
+                        # PyMuPDF is not thread-safe, all pages of a document are extracted by one call
+                        texts = await loop.run_in_executor(executor, lambda: [page.get_text() for page in pdf])
+                        analyses = await asyncio.gather(*(
+                            analyze(text, pdf_name, page_number) for page_number, text in enumerate(texts)
+                        ))
+                        await loop.run_in_executor(executor, partial(
+                            finish_document,
+                            pdf,
+                            analyses,
+                            output_dir=output_dir,
+                            log_to_json=log_to_json,
+                            should_redact=should_redact,
+                            close=pdf is not source
+                        ))
+                    finally:
+                        close_unfinished_document(pdf, source)
+                finally:
+                    open_documents.release()
+
+            for source in document_list:
+                await open_documents.acquire()
+                task = asyncio.ensure_future(process(source))
+                tasks.add(task)
+                task.add_done_callback(task_done)
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    if errors:
+        raise errors[0]
+    return document_count
+
+
+def init_worker_process(settings):
+    """
+    Configure a worker process of process_document_list_in_processes like main() configures this one.
+
+    The page queue, or the event loop with its open async client, is created once and reused for all
+    documents of the worker, so their threads and keep-alive connections are pooled across documents.
+    """
+    global used_language, used_profile, timing_report, analyzer_client, worker_settings
+    global worker_page_queue, worker_loop, worker_async_client
+
+    worker_settings = settings
+    used_language = settings["language"]
+    used_profile = settings["profile"]
+    timing_report = TimingReport() if settings["timing"] else None
+    analyzer_client = AnalyzerClient(presidio_api_analysis, pool_size=settings["threads"], **settings["client_options"])
+    if settings["async_mode"]:
+        worker_loop = asyncio.new_event_loop()
+        worker_async_client = AsyncAnalyzerClient(
+            presidio_api_analysis, max_inflight=settings["max_inflight"], **settings["client_options"]
+        )
+        worker_loop.run_until_complete(worker_async_client.__aenter__())
+    else:
+        worker_page_queue = PageWorkQueue(max_workers=settings["threads"])
+    # Run when the worker process exits, atexit handlers are not run in worker processes
+    Finalize(None, close_worker_process, exitpriority=10)
+
+
+def close_worker_process():
+    """Close the async client and event loop, or stop the page queue, of a worker process."""
+    if worker_async_client is not None:
+        worker_loop.run_until_complete(worker_async_client.__aexit__(None, None, None))
+        worker_loop.close()
+    if worker_page_queue is not None:
+        worker_page_queue.shutdown()
+
+
+def process_source_in_worker(source, output_dir, log_to_json=False, should_redact=True, json_input_dir=None):
+    """
+    Open, analyze, redact and save one document in a worker process, and report its status.
+
+    Returns:
+        Dict: {"document": source, "documents": number processed, "error": message or None,
+               "latency": latency samples of the pages, "timing": timing report summaries of the document}
+    """
+    status = {"document": str(source), "documents": 0, "error": None}
+    client = analyzer_client
+    try:
+        if worker_async_client is not None and not json_input_dir:
+            client = worker_async_client
+            status["documents"] = worker_loop.run_until_complete(process_document_list_async(
+                [source], client, output_dir, log_to_json=log_to_json, should_redact=should_redact,
+                max_inflight=worker_settings["max_inflight"]
+            ))
+        else:
+            status["documents"] = process_document_list(
+                [source], output_dir, log_to_json=log_to_json, should_redact=should_redact,
+                json_input_dir=json_input_dir, max_workers=worker_settings["threads"],
+                page_queue=worker_page_queue
+            )
+    except Exception as e:
+        status["error"] = f"{type(e).__name__}: {e}"
+    status["latency"] = client.take_samples()
+    status["timing"] = timing_report.pop_documents() if timing_report else {}
+    return status
+
+
+def process_document_list_in_processes(document_list, processes, settings, output_dir, log_to_json=False, should_redact=True, json_input_dir=None):
     """
-    # Create a thread-safe lock for file operations
-    file_lock = threading.Lock()
+    Process a list of PDFs in worker processes, using all CPU cores for the PyMuPDF work.
 
-    # Create a thread pool executor
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit each document for processing
-        futures = []
-        for pdf in document_list:
+    Every worker process opens the documents it picks up by path, analyzes their pages (threaded or async),
+    redacts and saves them, and only reports their status back. The latency samples and timing summaries of
+    the workers are merged into analyzer_client and timing_report of this process.
+
+    Args:
+        document_list (Iterable[Path]): Paths of the PDFs.
+        processes (int): Number of worker processes.
+        settings (Dict): Settings of the worker processes, see init_worker_process.
+        output_dir (Path): The output directory where redacted files will be stored.
+        log_to_json (bool): If True, save Presidio input/output logs. Defaults to False.
+        should_redact (bool): If True, redact. If False, highlight. Defaults to True.
+        json_input_dir (Path): Path to directory containing JSON files with redaction information. If provided,
+                              uses these files instead of calling Presidio API. Defaults to None.
+
+    Returns:
+        int: The number of documents processed.
+    """
+    document_count = 0
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(processes * PENDING_DOCUMENTS_PER_PROCESS)
+
+    def collect_status(future):
+        nonlocal document_count
+        slots.release()
+        if future.exception() is not None:
+            with threading.Lock():
+                print(f"[ERROR] Worker process failed: {future.exception()}")
+            return
+        status = future.result()
+        with lock:
+            document_count += status["documents"]
+        if status["error"]:
+            with threading.Lock():
+                print(f"[ERROR] Failed to process {status['document']}: {status['error']}")
+        analyzer_client.add_samples(status["latency"])
+        if timing_report:
+            timing_report.add_documents(status["timing"])
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker_process, initargs=(settings,)) as executor:
+        for source in document_list:
+            slots.acquire()
             future = executor.submit(
-                process_single_document,
-                pdf=pdf,
-                output_dir=output_dir,
+                process_source_in_worker,
+                source,
+                output_dir,
                 log_to_json=log_to_json,
                 should_redact=should_redact,
                 json_input_dir=json_input_dir
             )
-            futures.append(future)
-
-        # Wait for all tasks to complete
-        for future in futures:
-            future.result()
+            future.add_done_callback(collect_status)
+    return document_count
 
 
 def is_supported_language(lang_code: str) -> bool:
@@ -311,10 +749,26 @@ def format_supported_languages() -> str:
     return ",\n ".join(f"{name} ({code})" for code, name in LANGUAGES_DISPLAY.items())
 
 def main(args):
+    global used_language, used_profile, timing_report, analyzer_client
 
-    document_list = []
+    # Path generators, the documents are opened when they are processed
+    document_sources = []
 
     used_language = args.language or DEFAULT_LANGUAGE
+    used_profile = args.profile
+    timing_report = TimingReport() if args.timing else None
+    client_options = {
+        "connect_timeout": args.connect_timeout,
+        "read_timeout": args.read_timeout,
+        "retries": args.retries,
+        "hedge": args.hedge,
+        "hedge_delay": args.hedge_delay
+    }
+    analyzer_client = AnalyzerClient(
+        presidio_api_analysis,
+        pool_size=args.threads or default_workers(),
+        **client_options
+    )
 
     log_results_into_json = args.json_log or args.highlight
     highlight_mode = args.highlight
@@ -340,9 +794,7 @@ def main(args):
             sys.exit(1)
         else:
             print(f"Processing file: {args.file}")
-            file_handler = FileHandler(args.file, "file")
-            document = file_handler.get_document_list()
-            document_list.extend(document)
+            document_sources.append(FileHandler(args.file, "file").iter_paths())
 
     if args.directory:
         if not args.directory.is_dir():
@@ -350,13 +802,21 @@ def main(args):
             sys.exit(1)
         else:
             print(f"Processing directory: {args.directory}")
-            file_handler = FileHandler(args.directory, "dir")
-            documents = file_handler.get_document_list()
-            document_list.extend(documents)
+            document_sources.append(
+                FileHandler(args.directory, "dir", recursive=args.recursive, patterns=args.glob).iter_paths()
+            )
 
-    if not args.file and not args.directory:
-        print("Error: You must provide either a file (-f) or a directory (-d).")
+    if args.file_list:
+        if str(args.file_list) != "-" and not args.file_list.is_file():
+            print(f"Error: {args.file_list} is not a valid file.")
+            sys.exit(1)
+        print(f"Processing files listed in: {'stdin' if str(args.file_list) == '-' else args.file_list}")
+        document_sources.append(FileHandler(args.file_list, "list").iter_paths())
+
+    if not args.file and not args.directory and not args.file_list:
+        print("Error: You must provide a file (-f), a directory (-d) or a file list (--file-list).")
         sys.exit(1)
+    document_list = itertools.chain.from_iterable(document_sources)
 
     if json_input_dir:
         if not json_input_dir.is_dir():
@@ -364,18 +824,67 @@ def main(args):
             sys.exit(1)
         print(f"Using JSON input from: {json_input_dir}")
 
-    process_document_list(
-        document_list=document_list,
-        output_dir=output_dir,
-        log_to_json=log_results_into_json,
-        should_redact=(not highlight_mode),
-        json_input_dir=json_input_dir,
-        max_workers=args.threads
-    )
+    used_client = analyzer_client
+    async_mode = args.async_mode and not json_input_dir
+    if async_mode and not async_available():
+        print("Error: The async mode requires aiohttp: pip install aiohttp")
+        sys.exit(1)
 
-    print(f"Documents parsed to text: {len(document_list)}")
+    if args.processes:
+        # The latency stats of the worker processes are merged into the client of this process
+        document_count = process_document_list_in_processes(
+            document_list=document_list,
+            processes=args.processes,
+            settings={
+                "language": used_language,
+                "profile": used_profile,
+                "timing": args.timing,
+                "threads": args.threads or PROCESS_THREADS,
+                "async_mode": async_mode,
+                "max_inflight": args.max_inflight,
+                "client_options": client_options
+            },
+            output_dir=output_dir,
+            log_to_json=log_results_into_json,
+            should_redact=(not highlight_mode),
+            json_input_dir=json_input_dir
+        )
+    elif async_mode:
+        used_client = AsyncAnalyzerClient(presidio_api_analysis, max_inflight=args.max_inflight, **client_options)
+        document_count = asyncio.run(process_document_list_async(
+            document_list=document_list,
+            client=used_client,
+            output_dir=output_dir,
+            log_to_json=log_results_into_json,
+            should_redact=(not highlight_mode),
+            max_inflight=args.max_inflight,
+            max_workers=args.threads
+        ))
+    else:
+        document_count = process_document_list(
+            document_list=document_list,
+            output_dir=output_dir,
+            log_to_json=log_results_into_json,
+            should_redact=(not highlight_mode),
+            json_input_dir=json_input_dir,
+            max_workers=args.threads
+        )
+
+    if not document_count:
+        print("No PDF files found.")
+    print(f"Documents parsed to text: {document_count}")
     print(f"Redacted files saved to: {output_dir}")
 
+    if not json_input_dir:
+        print(f"Latency per page: {used_client.format_stats()}")
+    analyzer_client.close()
+
+    if timing_report:
+        print("Timing per document:")
+        print(timing_report.format())
+        timing_report.save(output_dir / TIMING_REPORT_FILE)
+        print(f"Timing report saved to: {output_dir / TIMING_REPORT_FILE}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process and redact PDF files.")
 
@@ -400,22 +909,54 @@ Note: PDF filenames must match the JSON folder names exactly.
     parser.add_argument("-f", "--file", type=Path, help="Path to a PDF file")
     parser.add_argument("-d", "--directory", type=Path,
                         help="Path to a directory containing one or multiple PDF files to redact.")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="Process the PDF files in all subdirectories of the directory (-d) as well.")
+    parser.add_argument("-g", "--glob", action="append",
+                        help="Glob pattern the file names in the directory (-d) must match, can be repeated. Defaults to '*.pdf'.")
+    parser.add_argument("--file-list", type=Path,
+                        help="Text file listing the paths of the PDF files to process, one per line. '-' reads the paths from stdin.")
     parser.add_argument("-o", "--output", type=Path,
                         help="Directory where the redacted files will be saved. Defaults to './redacted'.")
     parser.add_argument("-l", "--language", type=str,
                         help=f"Language for Presidio analysis. We currently support: {format_supported_languages()}\n Defaults to 'de'.")
+    parser.add_argument("-p", "--profile", type=str,
+                        help="Engine profile of the analyzer, trading accuracy for speed (e.g. fast, balanced, accurate). "
+                             "Defaults to the default profile of the analyzer, GET /profiles lists them.")
+    parser.add_argument("--timing", action="store_true",
+                        help="Request the timing breakdown of every page (stages, recognizers, tokens) and report it per document. "
+                             f"Also saved as {TIMING_REPORT_FILE} in the output folder.")
+    parser.add_argument("--processes", type=int,
+                        help="Number of worker processes opening, analyzing, redacting and saving the documents, to use all CPU cores "
+                             f"for PyMuPDF. Each process analyzes the pages of its document with --threads threads (defaults to {PROCESS_THREADS}), "
+                             "or with asyncio with --async.")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="Send the analysis requests with asyncio from a single thread instead of one thread per request. "
+                             "PyMuPDF runs in a small thread pool (--threads, defaults to 2). Requires aiohttp.")
+    parser.add_argument("--max-inflight", type=int, default=64,
+                        help="With --async, number of pages analyzed at the same time. Defaults to 64.")
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT,
+                        help="Seconds to wait for a connection to the analyzer. Defaults to 5.")
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_READ_TIMEOUT,
+                        help="Seconds to wait for the analysis of a page. Defaults to 120.")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries of a page after a connection error, a timeout or a 5xx response, with exponential backoff. Defaults to 3.")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a second request for a page not answered within the 95th percentile of the page latencies so far, "
+                             "and take the first answer. Cuts the tail latency caused by a slow analyzer pod.")
+    parser.add_argument("--hedge-delay", type=float,
+                        help="With --hedge, fixed seconds after which a page is hedged instead of the 95th percentile.")
     parser.add_argument("-j", "--json-log", action="store_true",
                         help="Enable JSON logging. Saves Presidio input/output logs per page in the specified output folder.")
     parser.add_argument("--highlight", action="store_true",
                         help="Disables redaction of documents, and highlights the detected sections instead redacting them.")
     parser.add_argument("-t", "--threads", type=int,
-                        help="Number of worker threads to use for parallel processing. Defaults to the number of CPU cores.")
+                        help="Number of worker threads analyzing the pages of all documents in parallel. Defaults to the number of CPU cores + 4 (at most 32).")
 
     # We only need to parse the json-input argument here, the full parsing happens in main()
     args, _ = parser.parse_known_args()
 
     # Only check API availability if we're not using JSON input
     if not args.json_input:
-        check_api_available(presidio_api_endpoint)
+        check_api_available(presidio_api_endpoint, timeout=(args.connect_timeout, args.read_timeout))
 
     main(args)
@@ -0,0 +1,96 @@
+"""
+Gunicorn configuration for serving the analyzer in production.
+
+The app (and with it the analyzer engine and all models) is loaded once in the
+master process. The workers are forked afterwards and share the model weights
+copy-on-write, so adding a worker costs far less memory than adding a pod.
+
+The models are warmed up in each worker after the fork, before it accepts
+requests: running them in the master would start the torch thread pool, which
+does not survive fork().
+
+Usage: gunicorn --config gunicorn.conf.py
+
+Environment variables:
+    PORT: Port to bind to. Defaults to 3000.
+    GUARD_WORKERS: Number of worker processes. Defaults to 2.
+    GUARD_WORKER_THREADS: Request threads per worker. Defaults to 4.
+    GUARD_TORCH_THREADS: Torch intra-op threads per worker. Defaults to the
+        number of CPU cores divided by the number of workers. Also sets the
+        threads of the ONNX Runtime sessions (ner_backend: onnx), which are
+        created before forking, so it has to be set in the environment.
+    GUARD_WORKER_TIMEOUT: Seconds before a silent worker is restarted. Defaults to 300.
+    GUARD_WARMUP: Set to "false" to skip the warm-up. Defaults to "true".
+    PROMETHEUS_MULTIPROC_DIR: Directory where the workers write their metrics,
+        so /metrics reports all workers. Cleared at start. Defaults to /tmp/guard-metrics.
+"""
+import gc
+import os
+import shutil
+
+DEFAULT_PORT = "3000"
+DEFAULT_WORKERS = "2"
+DEFAULT_WORKER_THREADS = "4"
+DEFAULT_WORKER_TIMEOUT = "300"
+DEFAULT_METRICS_DIR = "/tmp/guard-metrics"
+
+# Tokenizers must not start their thread pool in the master before forking
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+# The app must not warm up the models in the master, see post_worker_init
+os.environ["GUARD_DEFER_WARMUP"] = "true"
+# Metrics must be shared through files before prometheus_client is imported by the app
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", DEFAULT_METRICS_DIR)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+wsgi_app = "app:create_app()"
+bind = f"0.0.0.0:{os.environ.get('PORT', DEFAULT_PORT)}"
+
+# Load the engine once in the master, workers inherit it through fork()
+preload_app = True
+
+workers = int(os.environ.get("GUARD_WORKERS", DEFAULT_WORKERS))
+# Threaded workers, so concurrent requests can be micro-batched within a worker
+worker_class = "gthread"
+threads = int(os.environ.get("GUARD_WORKER_THREADS", DEFAULT_WORKER_THREADS))
+timeout = int(os.environ.get("GUARD_WORKER_TIMEOUT", DEFAULT_WORKER_TIMEOUT))
+
+torch_threads = int(
+    os.environ.get("GUARD_TORCH_THREADS", max(1, (os.cpu_count() or 1) // workers))
+)
+
+
+def when_ready(server):
+    """Freeze the preloaded objects, so the garbage collector never touches (and copies) their pages."""
+    gc.freeze()
+    server.log.info(
+        "Analyzer preloaded, forking %s worker(s) with %s torch thread(s) each",
+        workers,
+        torch_threads,
+    )
+
+
+def post_fork(server, worker):
+    """Limit the torch thread pool of each worker, so the workers do not oversubscribe the CPU."""
+    import torch
+
+    torch.set_num_threads(torch_threads)
+
+
+def post_worker_init(worker):
+    """Warm up the models before the worker accepts requests, so no request hits a cold worker."""
+    from app import SERVER_EXTENSION
+
+    server = worker.wsgi.extensions[SERVER_EXTENSION]
+    # Already ready if the warm-up is disabled
+    if not server.ready.is_set():
+        server.warm_up()
+
+
+def child_exit(server, worker):
+    """Drop the live metrics of an exited worker, its counters stay part of the totals."""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,6 @@
 import pytest
 import json
+import os
 from unittest.mock import patch, MagicMock
 
 @pytest.fixture
@@ -7,7 +8,9 @@ def client():
     """Create a test client for the Flask app with a mocked analyzer engine."""
     from app import create_app
 
-    with patch('app.create_analyzer_engine') as mock_create_engine:
+    # The warm-up is tested on its own, it would add calls to the mocked engine
+    with patch('app.create_analyzer_engine') as mock_create_engine, \
+            patch.dict(os.environ, {"GUARD_WARMUP": "false"}):
         mock_engine = MagicMock()
         mock_create_engine.return_value = mock_engine
 
@@ -26,6 +29,12 @@ def client():
             )
         ]
 
+        # Every text of a batch gets one result carrying its language as entity type
+        mock_engine.analyze_batch.side_effect = lambda texts, language, **kwargs: [
+            [{"entity_type": language, "start": 0, "end": len(text), "score": 0.85}]
+            for text in texts
+        ]
+
         person_recognizer = MagicMock(name="PersonRecognizer")
         person_recognizer.name = "PersonRecognizer"
         
@@ -61,6 +70,55 @@ class TestAnalyzerApp:
         
         assert response.status_code == 200
         assert response.data.decode('utf-8') == "Presidio Analyzer service is up"
+
+    def test_ready_endpoint_waits_for_warmup(self, client, monkeypatch):
+        """Test that /ready only reports ready once the engine is warmed up."""
+        from app import SERVER_EXTENSION, create_app
+
+        _, mock_engine = client
+        monkeypatch.setenv("GUARD_WARMUP", "true")
+        monkeypatch.setenv("GUARD_DEFER_WARMUP", "true")
+        mock_engine.model_manager = None
+        mock_engine.supported_languages = ["de"]
+
+        with patch('app.create_analyzer_engine', return_value=mock_engine), \
+                patch('app.analyzer_profiles', return_value=("accurate", ["accurate"])):
+            app = create_app()
+
+        with app.test_client() as test_client:
+            before = test_client.get('/ready')
+            app.extensions[SERVER_EXTENSION].warm_up()
+            after = test_client.get('/ready')
+            health = test_client.get('/health')
+
+        assert before.status_code == 503
+        assert json.loads(before.data)["ready"] is False
+        assert after.status_code == 200
+        assert list(json.loads(after.data)["warmup"]["accurate"]) == ["de"]
+        assert mock_engine.analyze_batch.call_count == 2
+        assert mock_engine.reset_throughput.called
+        assert health.status_code == 200
+
+    def test_ready_endpoint_failed_warmup(self, client, monkeypatch):
+        """Test that a failing warm-up keeps the server unready."""
+        from app import SERVER_EXTENSION, create_app
+
+        _, mock_engine = client
+        monkeypatch.setenv("GUARD_WARMUP", "true")
+        monkeypatch.setenv("GUARD_DEFER_WARMUP", "true")
+        mock_engine.model_manager = None
+        mock_engine.supported_languages = ["de"]
+        mock_engine.analyze_batch.side_effect = RuntimeError("model missing")
+
+        with patch('app.create_analyzer_engine', return_value=mock_engine):
+            app = create_app()
+
+        with app.test_client() as test_client:
+            app.extensions[SERVER_EXTENSION].warm_up()
+            response = test_client.get('/ready')
+
+        assert response.status_code == 503
+        assert "model missing" in json.loads(response.data)["error"]
     
     def test_analyze_endpoint_success(self, client):
         """Test that analyze endpoint returns correct results with valid input."""
@@ -124,6 +182,379 @@ class TestAnalyzerApp:
         assert "error" in response_data
         assert "No language provided" in response_data["error"]
     
+    def test_analyze_batch_endpoint_success(self, client):
+        """Test that the batch endpoint groups items by language and keeps their order."""
+        test_client, mock_engine = client
+
+        test_input = {
+            "items": [
+                {"text": "Max Mustermann wohnt in Innsbruck.", "language": "de"},
+                {"text": "John Smith lives in Vienna.", "language": "en"},
+                {"text": "Kontakt: max@example.at", "language": "de"},
+            ]
+        }
+
+        response = test_client.post(
+            '/analyze/batch',
+            data=json.dumps(test_input),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        assert mock_engine.analyze_batch.call_count == 2
+
+        response_data = json.loads(response.data)
+        assert [item[0]['entity_type'] for item in response_data] == ["de", "en", "de"]
+        assert [item[0]['end'] for item in response_data] == [
+            len(item["text"]) for item in test_input["items"]
+        ]
+
+    def test_analyze_endpoint_passes_options(self, client):
+        """Test that the requested entities and threshold are passed on to the engine."""
+        test_client, mock_engine = client
+
+        test_input = {
+            "text": "Kontakt: max@example.at",
+            "language": "de",
+            "entities": ["EMAIL_ADDRESS", "AUT_LICENSE_PLATE"],
+            "score_threshold": 0.6,
+        }
+
+        response = test_client.post(
+            '/analyze',
+            data=json.dumps(test_input),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        mock_engine.analyze.assert_called_once_with(
+            text=test_input["text"],
+            language="de",
+            entities=["EMAIL_ADDRESS", "AUT_LICENSE_PLATE"],
+            score_threshold=0.6,
+        )
+
+    def test_analyze_batch_endpoint_passes_options(self, client):
+        """Test that the options of a batch request apply to all of its items."""
+        test_client, mock_engine = client
+
+        test_input = {
+            "items": [{"text": "Kontakt: max@example.at", "language": "de"}],
+            "entities": ["EMAIL_ADDRESS"],
+        }
+
+        response = test_client.post(
+            '/analyze/batch',
+            data=json.dumps(test_input),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        mock_engine.analyze_batch.assert_called_once_with(
+            texts=["Kontakt: max@example.at"], language="de", entities=["EMAIL_ADDRESS"]
+        )
+
+    def test_analyze_batch_endpoint_missing_items(self, client):
+        """Test that the batch endpoint rejects requests without items."""
+        test_client, _ = client
+
+        response = test_client.post(
+            '/analyze/batch',
+            data=json.dumps({"items": []}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 400
+        assert "No items provided" in json.loads(response.data)["error"]
+
+    def test_analyze_batch_endpoint_missing_language(self, client):
+        """Test that the batch endpoint reports the item missing its language."""
+        test_client, _ = client
+
+        test_input = {
+            "items": [
+                {"text": "John Smith lives in Vienna.", "language": "en"},
+                {"text": "Max Mustermann wohnt in Innsbruck."},
+            ]
+        }
+
+        response = test_client.post(
+            '/analyze/batch',
+            data=json.dumps(test_input),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 400
+        assert "No language provided for item 1" in json.loads(response.data)["error"]
+
+    def test_analyze_endpoint_micro_batching(self, client, monkeypatch):
+        """Test that /analyze runs through analyze_batch when micro-batching is enabled."""
+        from app import create_app
+
+        _, mock_engine = client
+        monkeypatch.setenv("MICRO_BATCH_MAX_WAIT_MS", "1")
+
+        with patch('app.create_analyzer_engine', return_value=mock_engine):
+            app = create_app()
+
+        test_input = {
+            "text": "John Smith lives in Vienna.",
+            "language": "en"
+        }
+
+        with app.test_client() as test_client:
+            response = test_client.post(
+                '/analyze',
+                data=json.dumps(test_input),
+                content_type='application/json'
+            )
+
+        assert response.status_code == 200
+        assert mock_engine.analyze_batch.called
+        assert json.loads(response.data)[0]['entity_type'] == 'en'
+
+    def test_analyze_endpoint_cache(self, client, monkeypatch):
+        """Test that repeated /analyze requests are answered from the analysis cache."""
+        from app import create_app
+
+        _, mock_engine = client
+        monkeypatch.setenv("ANALYSIS_CACHE_SIZE", "10")
+
+        with patch('app.create_analyzer_engine', return_value=mock_engine):
+            app = create_app()
+
+        test_input = {
+            "text": "John Smith lives in Vienna.",
+            "language": "en"
+        }
+
+        with app.test_client() as test_client:
+            responses = [
+                test_client.post(
+                    '/analyze',
+                    data=json.dumps(test_input),
+                    content_type='application/json'
+                )
+                for _ in range(2)
+            ]
+            stats = json.loads(test_client.get('/cache/stats').data)
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert json.loads(responses[0].data) == json.loads(responses[1].data)
+        assert mock_engine.analyze.call_count == 1
+        assert stats["enabled"] is True
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_analyze_endpoint_cache_respects_options(self, client, monkeypatch):
+        """Test that requests for different entities do not share cached results."""
+        from app import create_app
+
+        _, mock_engine = client
+        monkeypatch.setenv("ANALYSIS_CACHE_SIZE", "10")
+
+        with patch('app.create_analyzer_engine', return_value=mock_engine):
+            app = create_app()
+
+        test_inputs = [
+            {"text": "John Smith lives in Vienna.", "language": "en"},
+            {"text": "John Smith lives in Vienna.", "language": "en", "entities": ["LOCATION"]},
+        ]
+
+        with app.test_client() as test_client:
+            for test_input in test_inputs:
+                test_client.post(
+                    '/analyze',
+                    data=json.dumps(test_input),
+                    content_type='application/json'
+                )
+
+        assert mock_engine.analyze.call_count == 2
+
+    def test_models_endpoint(self, client):
+        """Test that the models endpoint reports the shared models and the process memory."""
+        test_client, mock_engine = client
+        mock_engine.model_manager = None
+
+        response = test_client.get('/models')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data["languages"] is None
+        assert isinstance(data["models"], list)
+        assert data["resident_memory_mb"] >= 0
+
+    def test_models_endpoint_reports_every_profile(self):
+        """Test that the models endpoint reports the languages of every profile, once per shared model manager."""
+        from app import create_app
+
+        shared_manager, own_manager = MagicMock(), MagicMock()
+        shared_manager.stats.return_value = {"memory_budget_mb": None, "preload": ["de"], "loaded": {"de": {}}}
+        own_manager.stats.return_value = {"memory_budget_mb": 2000, "preload": [], "loaded": {"en": {}}}
+        engines = {"accurate": MagicMock(), "balanced": MagicMock(), "fast": MagicMock()}
+        engines["accurate"].model_manager = engines["balanced"].model_manager = shared_manager
+        engines["fast"].model_manager = own_manager
+
+        with patch('app.analyzer_profiles', return_value=("accurate", list(engines))), \
+                patch('app.create_analyzer_engine', side_effect=lambda profile, **kwargs: engines[profile]), \
+                patch.dict(os.environ, {"GUARD_WARMUP": "false", "GUARD_METRICS": "false"}):
+            app = create_app()
+
+        with app.test_client() as test_client:
+            data = json.loads(test_client.get('/models').data)
+
+        assert data["languages"] == [
+            {"profiles": ["accurate", "balanced"], "memory_budget_mb": None, "preload": ["de"], "loaded": {"de": {}}},
+            {"profiles": ["fast"], "memory_budget_mb": 2000, "preload": [], "loaded": {"en": {}}},
+        ]
+        assert shared_manager.stats.call_count == 1
+
+    def test_analyze_endpoint_compact_response(self, client):
+        """Test that compact responses only hold the entity type, offsets and score, and explanations on request."""
+        from presidio_analyzer import AnalysisExplanation, RecognizerResult
+
+        test_client, mock_engine = client
+        mock_engine.analyze.return_value = [
+            RecognizerResult(
+                "PERSON", 0, 10, 0.85,
+                analysis_explanation=AnalysisExplanation("FlairRecognizer", 0.85),
+                recognition_metadata={"recognizer_name": "FlairRecognizer"},
+            )
+        ]
+
+        responses = [
+            json.loads(test_client.post(
+                '/analyze',
+                data=json.dumps({"text": "John Smith", "language": "en", "compact": True, **options}),
+                content_type='application/json'
+            ).data)
+            for options in ({}, {"return_decision_process": True})
+        ]
+
+        assert responses[0] == [{"entity_type": "PERSON", "start": 0, "end": 10, "score": 0.85}]
+        assert responses[1][0]["analysis_explanation"]["recognizer"] == "FlairRecognizer"
+        assert "recognition_metadata" not in responses[1][0]
+
+    def test_analyze_batch_endpoint_compact_response(self, client, monkeypatch):
+        """Test that COMPACT_RESPONSES makes compact responses the default, also for cached batch results."""
+        from app import create_app
+
+        _, mock_engine = client
+        monkeypatch.setenv("COMPACT_RESPONSES", "true")
+        monkeypatch.setenv("ANALYSIS_CACHE_SIZE", "10")
+
+        with patch('app.create_analyzer_engine', return_value=mock_engine):
+            app = create_app()
+
+        test_input = {"items": [{"text": "Max", "language": "de"}, {"text": "John", "language": "en"}]}
+        with app.test_client() as test_client:
+            responses = [
+                json.loads(test_client.post(
+                    '/analyze/batch',
+                    data=json.dumps(test_input),
+                    content_type='application/json'
+                ).data)
+                for _ in range(2)
+            ]
+
+        assert responses[0] == responses[1] == [
+            [{"entity_type": "de", "start": 0, "end": 3, "score": 0.85}],
+            [{"entity_type": "en", "start": 0, "end": 4, "score": 0.85}],
+        ]
+
+    def test_analyze_endpoint_timing(self, client):
+        """Test that a timed request returns its results with the timing breakdown of the analysis."""
+        from contextlib import contextmanager
+
+        test_client, mock_engine = client
+
+        @contextmanager
+        def collect_timings():
+            yield {
+                "stages": {"nlp_artifacts": 0.2},
+                "recognizers": {"EmailRecognizer": 0.001},
+                "counts": {"texts": 1, "tokens": 3},
+            }
+
+        mock_engine.collect_timings = collect_timings
+
+        response = test_client.post(
+            '/analyze',
+            data=json.dumps({"text": "John Smith", "language": "en", "timing": True, "compact": True}),
+            content_type='application/json'
+        )
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data["results"] == [{"entity_type": "PERSON", "start": 0, "end": 9, "score": 0.85}]
+        assert data["timing"]["stages_ms"] == {"nlp_artifacts": 200.0}
+        assert data["timing"]["recognizers_ms"] == {"EmailRecognizer": 1.0}
+        assert data["timing"]["counts"]["tokens"] == 3
+        assert data["timing"]["total_ms"] >= data["timing"]["serialization_ms"] >= 0
+
+    def test_analyze_endpoint_selects_profile(self, client):
+        """Test that the profile of a request selects its engine, and the default profile is used without one."""
+        from app import create_app
+
+        engines = {"accurate": MagicMock(), "fast": MagicMock()}
+        for profile, engine in engines.items():
+            engine.analyze.return_value = [{"entity_type": profile, "start": 0, "end": 4, "score": 0.85}]
+
+        with patch('app.analyzer_profiles', return_value=("accurate", ["accurate", "fast"])), \
+                patch('app.create_analyzer_engine', side_effect=lambda profile, **kwargs: engines[profile]):
+            app = create_app()
+
+        with app.test_client() as test_client:
+            responses = [
+                test_client.post(
+                    '/analyze',
+                    data=json.dumps({"text": "John", "language": "en", **profile}),
+                    content_type='application/json'
+                )
+                for profile in ({"profile": "fast"}, {})
+            ]
+            unknown = test_client.post(
+                '/analyze',
+                data=json.dumps({"text": "John", "language": "en", "profile": "fastest"}),
+                content_type='application/json'
+            )
+
+        assert [json.loads(response.data)[0]["entity_type"] for response in responses] == ["fast", "accurate"]
+        assert unknown.status_code == 400
+        assert "Unknown profile" in json.loads(unknown.data)["error"]
+
+    def test_profiles_endpoint(self, client):
+        """Test that the profiles endpoint lists the profiles with their throughput."""
+        test_client, mock_engine = client
+        mock_engine.throughput.return_value = {"texts": 2, "texts_per_second": 4.0}
+
+        response = test_client.get('/profiles')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        assert data["default"] == "accurate"
+        assert data["profiles"]["fast"]["throughput"]["texts_per_second"] == 4.0
+
+    def test_metrics_endpoint(self, client):
+        """Test that the metrics endpoint exposes the request metrics, and the engines report to it."""
+        pytest.importorskip("prometheus_client")
+        test_client, mock_engine = client
+        mock_engine.model_manager = None
+
+        test_client.post(
+            '/analyze',
+            data=json.dumps({"text": "John Smith", "language": "en"}),
+            content_type='application/json'
+        )
+        response = test_client.get('/metrics')
+        text = response.data.decode("utf-8")
+
+        assert response.status_code == 200
+        assert 'guard_requests_total{endpoint="/analyze",status="200"} 1.0' in text
+        assert 'guard_request_latency_seconds_count{endpoint="/analyze"} 1.0' in text
+        assert "guard_resident_memory_bytes" in text
+        assert mock_engine.metrics is not None
+
     def test_recognizers_endpoint(self, client):
         """Test that recognizers endpoint returns correct list of recognizers."""
         test_client, mock_engine = client
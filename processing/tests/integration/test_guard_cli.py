@@ -1,10 +1,22 @@
 import pytest
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
 import fitz
+import requests
 import tempfile
 from pathlib import Path
 from unittest.mock import patch
-from processing.guard_cli import save_pdf, save_logs_for_pdf, process_pdf, process_document_list
+from processing import guard_cli
+from processing.guard_cli import (
+    save_pdf, save_logs_for_pdf, process_pdf, process_document_list, process_document_list_async,
+    process_document_list_in_processes
+)
 from processing.tests.test_utils import create_test_pdf, create_mock_response
+from processing.utils.analyzer_client import AnalyzerClient
+from processing.utils.timing_report import TimingReport
 
 # Constants
 SAMPLE_PDF_NAME = "sample"
@@ -69,7 +81,7 @@ def test_integration_process_pdf_redact(sample_pdf, output_dir, mock_presidio_re
     pdf_path, _ = sample_pdf
     _, output_dir = output_dir
     
-    with patch('requests.post') as mock_post:
+    with patch('requests.Session.post') as mock_post:
         mock_post.return_value = create_mock_response(200, mock_presidio_response)
         
         with fitz.open(str(pdf_path)) as pdf:
@@ -86,7 +98,7 @@ def test_integration_process_pdf_highlight(sample_pdf, output_dir, mock_presidio
     pdf_path, _ = sample_pdf
     _, output_dir = output_dir
     
-    with patch('requests.post') as mock_post:
+    with patch('requests.Session.post') as mock_post:
         mock_post.return_value = create_mock_response(200, mock_presidio_response)
         
         with fitz.open(str(pdf_path)) as pdf:
@@ -101,6 +113,54 @@ def test_integration_process_pdf_highlight(sample_pdf, output_dir, mock_presidio
             assert expected_log_output.exists()
             assert mock_post.call_count == len(pdf)
 
+@pytest.mark.integration
+def test_integration_process_pdf_sends_profile(sample_pdf, mock_presidio_response):
+    """Integration test for requesting the analysis with the selected engine profile."""
+    pdf_path, _ = sample_pdf
+
+    with patch('requests.Session.post') as mock_post, patch('processing.guard_cli.used_profile', "fast"):
+        mock_post.return_value = create_mock_response(200, mock_presidio_response)
+
+        with fitz.open(str(pdf_path)) as pdf:
+            process_pdf(pdf)
+
+    assert mock_post.call_args.kwargs["json"]["profile"] == "fast"
+
+@pytest.mark.integration
+def test_integration_process_pdf_requests_full_results_for_logs(sample_pdf, mock_presidio_response):
+    """Integration test for requesting compact results, except for the JSON logs."""
+    pdf_path, _ = sample_pdf
+
+    with patch('requests.Session.post') as mock_post:
+        mock_post.return_value = create_mock_response(200, mock_presidio_response)
+
+        with fitz.open(str(pdf_path)) as pdf:
+            process_pdf(pdf)
+            assert mock_post.call_args.kwargs["json"]["compact"] is True
+            process_pdf(pdf, generate_log=True)
+
+    assert mock_post.call_args.kwargs["json"]["compact"] is False
+
+@pytest.mark.integration
+def test_integration_process_pdf_collects_timing(sample_pdf, mock_presidio_response):
+    """Integration test for aggregating the timing breakdown of the pages per document."""
+    pdf_path, _ = sample_pdf
+    report = TimingReport()
+    timing = {"total_ms": 120.0, "stages_ms": {"nlp_artifacts": 80.0}, "recognizers_ms": {}, "counts": {"tokens": 30}}
+
+    with patch('requests.Session.post') as mock_post, patch('processing.guard_cli.timing_report', report):
+        mock_post.return_value = create_mock_response(200, {"results": mock_presidio_response, "timing": timing})
+
+        with fitz.open(str(pdf_path)) as pdf:
+            logs = process_pdf(pdf, generate_log=True)
+
+    assert mock_post.call_args.kwargs["json"]["timing"] is True
+    assert logs[0]["response"] == mock_presidio_response
+    summary = report.documents()[pdf_path.name]
+    assert summary["pages"] == 1
+    assert summary["stages_ms"] == {"nlp_artifacts": 80.0}
+    assert summary["counts"] == {"tokens": 30}
+
 @pytest.mark.integration
 def test_integration_process_document_list(sample_pdf, output_dir, mock_presidio_response):
     """Integration test for processing a list of PDF documents."""
@@ -111,7 +171,7 @@ def test_integration_process_document_list(sample_pdf, output_dir, mock_presidio
     second_pdf_path = temp_dir / f"{SAMPLE_PDF_2_NAME}.pdf"
     create_test_pdf(second_pdf_path, SAMPLE_TEXT_2)
     
-    with patch('requests.post') as mock_post:
+    with patch('requests.Session.post') as mock_post:
         mock_post.return_value = create_mock_response(200, mock_presidio_response)
         
         with fitz.open(str(pdf_path)) as pdf1, fitz.open(str(second_pdf_path)) as pdf2:
@@ -134,7 +194,7 @@ def test_integration_process_document_list_presidio_returns_500(sample_pdf, outp
     pdf_path, _ = sample_pdf
     _, output_dir = output_dir
     
-    with patch('requests.post') as mock_post:
+    with patch('requests.Session.post') as mock_post:
         mock_post.return_value = create_mock_response(500, None)
         
         with fitz.open(str(pdf_path)) as pdf:
@@ -147,4 +207,188 @@ def test_integration_process_document_list_presidio_returns_500(sample_pdf, outp
             
             assert "Presidio error for:" in captured.out
             assert f"{pdf_name}" in captured.out
-            assert expected_output.exists()
\ No newline at end of file
+            assert expected_output.exists()
+
+
+@pytest.mark.integration
+def test_integration_process_pdf_unreachable_analyzer(sample_pdf, capsys):
+    """Integration test for skipping pages when the analyzer cannot be reached after the retries."""
+    pdf_path, _ = sample_pdf
+
+    with patch('requests.Session.post', side_effect=requests.exceptions.ConnectionError("Connection failed")):
+        with fitz.open(str(pdf_path)) as pdf:
+            logs = process_pdf(pdf, generate_log=True)
+
+    assert "Presidio error for:" in capsys.readouterr().out
+    assert logs[0]["response"] is None
+
+@pytest.mark.integration
+def test_integration_process_document_list_analyzes_pages_concurrently(output_dir, mock_presidio_response):
+    """Integration test for analyzing the pages of a long document on all worker threads, logged in page order."""
+    temp_dir, output_dir = output_dir
+    pdf_path = temp_dir / "long.pdf"
+    with fitz.open() as doc:
+        for number in range(8):
+            doc.new_page().insert_text((50, 50), f"Page {number}: {SAMPLE_TEXT}")
+        doc.save(str(pdf_path))
+    threads = set()
+
+    def analyze(url, json, timeout):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return create_mock_response(200, mock_presidio_response)
+
+    with patch('requests.Session.post', side_effect=analyze):
+        with fitz.open(str(pdf_path)) as pdf:
+            process_document_list([pdf], output_dir, log_to_json=True, max_workers=4)
+
+    assert len(threads) > 1
+    assert (output_dir / f"{REDACTED_PREFIX}long.pdf").exists()
+    for number in range(8):
+        log = json.loads((output_dir / f"long{LOGS_SUFFIX}" / f"page_{number}.json").read_text(encoding="utf-8"))
+        assert log["request"]["text"].startswith(f"Page {number}:")
+
+@pytest.mark.integration
+def test_integration_process_document_list_async(sample_pdf, output_dir, mock_presidio_response):
+    """Integration test for the async mode, with bounded pages in flight."""
+    pdf_path, temp_dir = sample_pdf
+    _, output_dir = output_dir
+    second_pdf_path = temp_dir / f"{SAMPLE_PDF_2_NAME}.pdf"
+    create_test_pdf(second_pdf_path, SAMPLE_TEXT_2)
+
+    class FakeAsyncClient:
+        inflight = 0
+        max_inflight = 0
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        async def post(self, payload):
+            FakeAsyncClient.inflight += 1
+            FakeAsyncClient.max_inflight = max(FakeAsyncClient.max_inflight, FakeAsyncClient.inflight)
+            await asyncio.sleep(0.01)
+            FakeAsyncClient.inflight -= 1
+            return create_mock_response(200, mock_presidio_response)
+
+    with fitz.open(str(pdf_path)) as pdf1, fitz.open(str(second_pdf_path)) as pdf2:
+        asyncio.run(process_document_list_async(
+            [pdf1, pdf2], FakeAsyncClient(), output_dir, log_to_json=True, max_inflight=1
+        ))
+
+    assert FakeAsyncClient.max_inflight == 1
+    assert (output_dir / f"{REDACTED_PREFIX}{pdf_path.name}").exists()
+    assert (output_dir / f"{REDACTED_PREFIX}{second_pdf_path.name}").exists()
+    assert (output_dir / f"{SAMPLE_PDF_2_NAME}{LOGS_SUFFIX}" / "page_0.json").exists()
+
+@pytest.mark.integration
+def test_integration_process_document_list_opens_paths_lazily(sample_pdf, output_dir, mock_presidio_response):
+    """Integration test for processing a generator of paths, closing every document once it is saved."""
+    pdf_path, temp_dir = sample_pdf
+    _, output_dir = output_dir
+    second_pdf_path = temp_dir / f"{SAMPLE_PDF_2_NAME}.pdf"
+    create_test_pdf(second_pdf_path, SAMPLE_TEXT_2)
+    opened = []
+
+    def open_pdf(path):
+        document = fitz.Document(path)
+        opened.append(document)
+        return document
+
+    with patch('requests.Session.post') as mock_post, patch('processing.guard_cli.fitz.open', side_effect=open_pdf):
+        mock_post.return_value = create_mock_response(200, mock_presidio_response)
+        paths = (path for path in [pdf_path, temp_dir / "missing.pdf", second_pdf_path])
+        document_count = process_document_list(paths, output_dir)
+
+    assert document_count == 2
+    assert all(document.is_closed for document in opened)
+    assert (output_dir / f"{REDACTED_PREFIX}{pdf_path.name}").exists()
+    assert (output_dir / f"{REDACTED_PREFIX}{second_pdf_path.name}").exists()
+
+@pytest.mark.integration
+def test_integration_failed_documents_are_closed(sample_pdf, output_dir):
+    """Integration test for closing the documents opened from paths when the analysis of a page fails."""
+    pdf_path, _ = sample_pdf
+    _, output_dir = output_dir
+    opened = []
+
+    def open_pdf(path):
+        document = fitz.Document(path)
+        opened.append(document)
+        return document
+
+    class FailingAsyncClient:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        async def post(self, payload):
+            raise ValueError("Broken analyzer response")
+
+    with patch('requests.Session.post', side_effect=ValueError("Broken analyzer response")), \
+            patch('processing.guard_cli.fitz.open', side_effect=open_pdf):
+        with pytest.raises(ValueError):
+            process_document_list(iter([pdf_path]), output_dir)
+        with pytest.raises(ValueError):
+            asyncio.run(process_document_list_async(iter([pdf_path]), FailingAsyncClient(), output_dir))
+
+    assert len(opened) == 2
+    assert all(document.is_closed for document in opened)
+
+@pytest.mark.integration
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="The mocked analyzer is only inherited by forked workers")
+def test_integration_process_document_list_in_processes(sample_pdf, output_dir, mock_presidio_response):
+    """Integration test for redacting in worker processes, which report their latency samples back."""
+    pdf_path, temp_dir = sample_pdf
+    _, output_dir = output_dir
+    second_pdf_path = temp_dir / f"{SAMPLE_PDF_2_NAME}.pdf"
+    create_test_pdf(second_pdf_path, SAMPLE_TEXT_2)
+    settings = {
+        "language": "de", "profile": None, "timing": False, "threads": 2,
+        "async_mode": False, "max_inflight": 4, "client_options": {}
+    }
+    client = AnalyzerClient("http://localhost:5000/analyze")
+
+    with patch('requests.Session.post') as mock_post, patch('processing.guard_cli.analyzer_client', client):
+        mock_post.return_value = create_mock_response(200, mock_presidio_response)
+        document_count = process_document_list_in_processes(
+            iter([pdf_path, temp_dir / "missing.pdf", second_pdf_path]), 2, settings, output_dir, log_to_json=True
+        )
+
+    assert document_count == 2
+    assert client.stats()["pages"] == 2
+    assert (output_dir / f"{REDACTED_PREFIX}{pdf_path.name}").exists()
+    assert (output_dir / f"{REDACTED_PREFIX}{second_pdf_path.name}").exists()
+    assert (output_dir / f"{SAMPLE_PDF_NAME}{LOGS_SUFFIX}" / "page_0.json").exists()
+
+@pytest.mark.integration
+def test_integration_worker_process_reuses_its_page_queue(sample_pdf, output_dir, mock_presidio_response):
+    """Integration test for analyzing all documents of a worker process in the page queue created with it."""
+    pdf_path, temp_dir = sample_pdf
+    _, output_dir = output_dir
+    second_pdf_path = temp_dir / f"{SAMPLE_PDF_2_NAME}.pdf"
+    create_test_pdf(second_pdf_path, SAMPLE_TEXT_2)
+    settings = {
+        "language": "de", "profile": None, "timing": False, "threads": 2,
+        "async_mode": False, "max_inflight": 4, "client_options": {}
+    }
+
+    with patch('requests.Session.post') as mock_post, \
+            patch('processing.guard_cli.PageWorkQueue', wraps=guard_cli.PageWorkQueue) as page_queue_class, \
+            patch('processing.guard_cli.Finalize'), \
+            patch.multiple('processing.guard_cli', used_language="de", used_profile=None, timing_report=None,
+                           analyzer_client=None, worker_settings=None, worker_page_queue=None):
+        mock_post.return_value = create_mock_response(200, mock_presidio_response)
+        guard_cli.init_worker_process(settings)
+        statuses = [
+            guard_cli.process_source_in_worker(path, output_dir) for path in [pdf_path, second_pdf_path]
+        ]
+        guard_cli.close_worker_process()
+
+    assert [status["documents"] for status in statuses] == [1, 1]
+    assert page_queue_class.call_count == 1
+    assert (output_dir / f"{REDACTED_PREFIX}{second_pdf_path.name}").exists()
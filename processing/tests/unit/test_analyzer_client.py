@@ -0,0 +1,241 @@
+import asyncio
+import importlib.util
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils.analyzer_client import (
+    HEDGE_MIN_SAMPLES, HEDGE_RECOMPUTE_SAMPLES, HEDGE_WINDOW, AnalyzerClient, AsyncAnalyzerClient, percentile
+)
+
+requires_aiohttp = pytest.mark.skipif(importlib.util.find_spec("aiohttp") is None, reason="aiohttp is not installed")
+
+
+@pytest.fixture
+def analyzer_server():
+    """A local analyzer answering the statuses of ``statuses`` in turn (then 200), after ``delays`` seconds."""
+    server_state = {"statuses": [], "delays": [], "requests": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            server_state["requests"] += 1
+            delay = server_state["delays"].pop(0) if server_state["delays"] else 0
+            time.sleep(delay)
+            status = server_state["statuses"].pop(0) if server_state["statuses"] else 200
+            body = json.dumps([{"start": 0, "end": 4, "delay": delay}]).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/analyze", server_state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.unit
+def test_server_errors_are_retried(analyzer_server):
+    """Test that 5xx responses are retried until the analyzer answers."""
+    url, server_state = analyzer_server
+    server_state["statuses"] = [503, 502]
+    client = AnalyzerClient(url, retries=3, backoff_factor=0)
+
+    response = client.post({"text": "Anna", "language": "en"})
+
+    assert response.status_code == 200
+    assert server_state["requests"] == 3
+    assert client.stats()["pages"] == 1
+
+
+@pytest.mark.unit
+def test_last_error_response_is_returned_after_the_retries(analyzer_server):
+    """Test that the error response is returned once the retries are used up."""
+    url, server_state = analyzer_server
+    server_state["statuses"] = [500, 500, 500]
+    client = AnalyzerClient(url, retries=2, backoff_factor=0)
+
+    response = client.post({"text": "Anna", "language": "en"})
+
+    assert response.status_code == 500
+    assert server_state["requests"] == 3
+
+
+@pytest.mark.unit
+def test_read_timeout_raises_after_the_retries(analyzer_server):
+    """Test that a stuck analyzer fails the request instead of blocking the thread forever."""
+    url, server_state = analyzer_server
+    server_state["delays"] = [1.0, 1.0]
+    client = AnalyzerClient(url, read_timeout=0.2, retries=1, backoff_factor=0)
+
+    with pytest.raises(requests.exceptions.RequestException):
+        client.post({"text": "Anna", "language": "en"})
+
+    assert client.stats()["failed"] == 1
+
+
+@pytest.mark.unit
+def test_slow_request_is_hedged(analyzer_server):
+    """Test that a request exceeding the hedging delay is sent again and the first answer is taken."""
+    url, server_state = analyzer_server
+    server_state["delays"] = [2.0]
+    client = AnalyzerClient(url, hedge=True, hedge_delay=0.1)
+
+    started = time.perf_counter()
+    response = client.post({"text": "Anna", "language": "en"})
+
+    assert time.perf_counter() - started < 1.5
+    assert response.json()[0]["delay"] == 0
+    assert client.stats()["hedged"] == 1
+    assert client.stats()["hedges_won"] == 1
+
+
+@pytest.mark.unit
+def test_hedging_delay_follows_the_observed_latencies(mocker):
+    """Test that without a fixed delay, requests are hedged after the 95th percentile once enough pages were seen."""
+    client = AnalyzerClient("http://localhost:5000/analyze", hedge=True)
+    mocker.patch.object(client, "_post")
+    mocker.patch.object(client, "_hedged_post")
+
+    client.post({"text": "Anna"})
+    assert client.current_hedge_delay() is None
+    for seconds in [0.1] * (HEDGE_MIN_SAMPLES - 2) + [2.0]:
+        client._add_latency(seconds)
+
+    assert client.current_hedge_delay() == 0.1
+    assert AnalyzerClient("http://localhost:5000/analyze").current_hedge_delay() is None
+
+
+@pytest.mark.unit
+def test_latency_stats():
+    """Test the latency percentiles of the pages in milliseconds."""
+    client = AnalyzerClient("http://localhost:5000/analyze")
+    client._latencies = [i / 100 for i in range(1, 101)]
+
+    latency = client.stats()["latency_ms"]
+
+    assert latency["p50"] == 500.0
+    assert latency["p95"] == 950.0
+    assert latency["max"] == 1000.0
+    assert "100 page(s) analyzed" in client.format_stats()
+    assert percentile([], 0.95) == 0.0
+
+
+@pytest.mark.unit
+@requires_aiohttp
+def test_async_client_retries_server_errors(analyzer_server):
+    """Test that the async client retries 5xx responses and reads the answer."""
+    url, server_state = analyzer_server
+    server_state["statuses"] = [503]
+
+    async def post():
+        async with AsyncAnalyzerClient(url, retries=2, backoff_factor=0) as client:
+            return client, await client.post({"text": "Anna", "language": "en"})
+
+    client, response = asyncio.run(post())
+
+    assert response.status_code == 200
+    assert response.json()[0]["start"] == 0
+    assert server_state["requests"] == 2
+    assert client.stats()["pages"] == 1
+
+
+@pytest.mark.unit
+@requires_aiohttp
+def test_async_client_hedges_and_cancels_the_slow_request(analyzer_server):
+    """Test that the async client answers a slow request with its hedge."""
+    url, server_state = analyzer_server
+    server_state["delays"] = [2.0]
+
+    async def post():
+        async with AsyncAnalyzerClient(url, hedge=True, hedge_delay=0.1) as client:
+            return client, await client.post({"text": "Anna", "language": "en"})
+
+    started = time.perf_counter()
+    client, response = asyncio.run(post())
+
+    assert time.perf_counter() - started < 1.5
+    assert response.json()[0]["delay"] == 0
+    assert client.stats()["hedges_won"] == 1
+
+
+@pytest.mark.unit
+@requires_aiohttp
+def test_async_client_keeps_its_session_across_nested_contexts(analyzer_server):
+    """Test that a client entered once keeps its session through nested contexts and later runs of the loop."""
+    url, _ = analyzer_server
+    client = AsyncAnalyzerClient(url)
+
+    async def post():
+        async with client:
+            return await client.post({"text": "Anna", "language": "en"})
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(client.__aenter__())
+        session = client._session
+        for _ in range(2):
+            assert loop.run_until_complete(post()).status_code == 200
+        assert client._session is session and not session.closed
+        loop.run_until_complete(client.__aexit__(None, None, None))
+    finally:
+        loop.close()
+
+    assert session.closed
+
+
+@pytest.mark.unit
+@requires_aiohttp
+def test_async_client_raises_connection_error():
+    """Test that an unreachable analyzer raises a requests ConnectionError after the retries."""
+    async def post():
+        async with AsyncAnalyzerClient("http://127.0.0.1:9/analyze", retries=1, backoff_factor=0) as client:
+            await client.post({"text": "Anna", "language": "en"})
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        asyncio.run(post())
+
+
+@pytest.mark.unit
+def test_samples_are_taken_once_and_merged():
+    """Test that the samples of a worker's client are only taken once and add up in another client."""
+    worker = AnalyzerClient("http://localhost:5000/analyze")
+    parent = AnalyzerClient("http://localhost:5000/analyze")
+    worker._latencies = [0.1, 0.2]
+    worker._failed = 1
+
+    parent.add_samples(worker.take_samples())
+    worker._latencies.append(0.3)
+    parent.add_samples(worker.take_samples())
+
+    assert parent.stats()["pages"] == 3
+    assert parent.stats()["failed"] == 1
+    assert worker.take_samples() == {"failed": 0, "hedged": 0, "hedges_won": 0, "latencies": []}
+
+
+@pytest.mark.unit
+def test_hedging_delay_follows_a_window_of_the_latest_pages():
+    """Test that the hedging delay is cached between recomputations and only considers the latest pages."""
+    client = AnalyzerClient("http://localhost:5000/analyze", hedge=True)
+    for _ in range(HEDGE_WINDOW):
+        client._add_latency(5.0)
+    assert client.current_hedge_delay() == 5.0
+
+    for _ in range(HEDGE_RECOMPUTE_SAMPLES - 1):
+        client._add_latency(0.1)
+    assert client.current_hedge_delay() == 5.0
+    for _ in range(HEDGE_WINDOW):
+        client._add_latency(0.1)
+
+    assert client.current_hedge_delay() == 0.1
+    assert client.stats()["pages"] == 2 * HEDGE_WINDOW + HEDGE_RECOMPUTE_SAMPLES - 1
@@ -0,0 +1,69 @@
+import pytest
+import yaml
+
+from utils.engine_factory import (
+    GuardAnalyzerEngineProvider,
+    analyzer_profiles,
+    merge_configuration,
+)
+
+configuration = {
+    "supported_languages": ["de"],
+    "default_score_threshold": 0.4,
+    "guard": {
+        "flair": {"mini_batch_size": 32},
+        "profiles": {
+            "default": "balanced",
+            "accurate": {},
+            "balanced": {
+                "default_score_threshold": 0.5,
+                "guard": {"flair": {"enabled": False}},
+            },
+        },
+    },
+}
+
+
+@pytest.fixture
+def conf_file(tmp_path, monkeypatch):
+    conf_file = tmp_path / "analyzer.yaml"
+    conf_file.write_text(yaml.safe_dump(configuration))
+    monkeypatch.setenv("PROJECT_ROOT", str(tmp_path))
+    monkeypatch.setenv("ANALYZER_CONF_FILE", conf_file.name)
+    return conf_file
+
+
+@pytest.mark.unit
+def test_merge_configuration_merges_mappings_and_replaces_values():
+    """Test that a profile overlay merges nested mappings and replaces lists and scalars."""
+    merged = merge_configuration(
+        {"a": {"b": 1, "c": [1, 2]}, "d": 1},
+        {"a": {"c": [3]}, "e": 2},
+    )
+
+    assert merged == {"a": {"b": 1, "c": [3]}, "d": 1, "e": 2}
+
+
+@pytest.mark.unit
+def test_provider_applies_the_profile(conf_file):
+    """Test that the settings of a profile override the configuration it is applied to."""
+    provider = GuardAnalyzerEngineProvider(analyzer_engine_conf_file=str(conf_file), profile="balanced")
+
+    assert provider.configuration["default_score_threshold"] == 0.5
+    assert provider.guard_configuration["flair"] == {"mini_batch_size": 32, "enabled": False}
+
+
+@pytest.mark.unit
+def test_provider_rejects_unknown_profiles(conf_file):
+    """Test that an unknown profile fails with the available profiles."""
+    with pytest.raises(ValueError, match="accurate"):
+        GuardAnalyzerEngineProvider(analyzer_engine_conf_file=str(conf_file), profile="fastest")
+
+
+@pytest.mark.unit
+def test_analyzer_profiles(conf_file):
+    """Test that the profiles and the default profile are read from the configuration."""
+    assert analyzer_profiles() == ("balanced", ["accurate", "balanced"])
+
+    conf_file.write_text(yaml.safe_dump({"supported_languages": ["de"]}))
+    assert analyzer_profiles() == (None, [])
@@ -0,0 +1,54 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from utils.file_handler import FileHandler
+
+
+@pytest.fixture
+def pdf_tree(tmp_path):
+    """A directory with PDFs at the top, in a subdirectory and other files."""
+    for name in ("b.pdf", "a.pdf", "notes.txt", "sub/c.pdf", "sub/scan_d.pdf", "sub/deeper/e.pdf"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return tmp_path
+
+
+@pytest.mark.unit
+def test_directory_yields_the_pdfs_of_its_top_level(pdf_tree):
+    """Test that a directory yields its PDF paths in name order, without subdirectories."""
+    paths = FileHandler(pdf_tree, "dir").iter_paths()
+
+    assert [path.relative_to(pdf_tree) for path in paths] == [Path("a.pdf"), Path("b.pdf")]
+
+
+@pytest.mark.unit
+def test_recursive_directory_with_glob_filters(pdf_tree):
+    """Test that a recursive walk yields the files of all subdirectories matching any of the patterns."""
+    paths = FileHandler(pdf_tree, "dir", recursive=True, patterns=["a.*", "scan_*.pdf", "e.pdf"]).iter_paths()
+
+    assert [path.relative_to(pdf_tree) for path in paths] == [
+        Path("a.pdf"), Path("sub/scan_d.pdf"), Path("sub/deeper/e.pdf")
+    ]
+
+
+@pytest.mark.unit
+def test_file_list_and_stdin(tmp_path, monkeypatch):
+    """Test that a file list yields one path per non-empty line, '-' reading them from stdin."""
+    file_list = tmp_path / "files.txt"
+    file_list.write_text("/data/one.pdf\n\n  /data/two.pdf  \n", encoding="utf-8")
+    monkeypatch.setattr("sys.stdin", io.StringIO("/data/three.pdf\n"))
+
+    assert list(FileHandler(file_list, "list").iter_paths()) == [Path("/data/one.pdf"), Path("/data/two.pdf")]
+    assert list(FileHandler("-", "list").iter_paths()) == [Path("/data/three.pdf")]
+
+
+@pytest.mark.unit
+def test_paths_are_read_lazily(pdf_tree):
+    """Test that nothing is listed before the first path is consumed."""
+    paths = FileHandler(pdf_tree, "dir").iter_paths()
+    (pdf_tree / "0_added_later.pdf").write_bytes(b"")
+
+    assert next(paths).name == "0_added_later.pdf"
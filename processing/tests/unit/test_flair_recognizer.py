@@ -0,0 +1,179 @@
+import pytest
+
+from core.flair_recognizer import FlairRecognizer
+from core.model_registry import ModelRegistry
+
+TEXT = "Franz Müller wohnt in Innsbruck.\n\nSeine Schwester arbeitet in Wien. Franz kommt oft zu Besuch."
+TAGGED_WORDS = {"Franz": "PER", "Müller": "PER", "Innsbruck": "LOC", "Wien": "LOC"}
+
+
+class StubTagger:
+    """Tag model tagging each word listed in TAGGED_WORDS as its own entity, counting the sentences it sees."""
+
+    def __init__(self):
+        self.predicted_batches = []
+
+    def predict(self, sentences, mini_batch_size=32, **kwargs):
+        self.predicted_batches.append(len(sentences))
+        for sentence in sentences:
+            for token in sentence.tokens:
+                if token.text in TAGGED_WORDS:
+                    sentence[token.idx - 1:token.idx].add_label("ner", TAGGED_WORDS[token.text], 0.9)
+
+
+@pytest.fixture
+def flair_recognizer():
+    return FlairRecognizer(supported_language="de", model=StubTagger())
+
+
+@pytest.mark.unit
+def test_sentences_are_predicted_as_one_batch(flair_recognizer):
+    """Test that the text is split into sentences which are predicted in a single call."""
+    flair_recognizer.analyze(TEXT, entities=[])
+
+    assert flair_recognizer.model.predicted_batches == [3]
+
+
+@pytest.mark.unit
+def test_offsets_refer_to_the_original_text(flair_recognizer):
+    """Test that spans found in later sentences are mapped back to the offsets of the text."""
+    results = flair_recognizer.analyze(TEXT, entities=[])
+
+    found = sorted((TEXT[r.start:r.end], r.entity_type) for r in results)
+    assert found == [
+        ("Franz", "PERSON"), ("Franz", "PERSON"), ("Innsbruck", "LOCATION"),
+        ("Müller", "PERSON"), ("Wien", "LOCATION"),
+    ]
+
+
+@pytest.mark.unit
+def test_prefetch_predicts_all_texts_at_once(flair_recognizer, mocker):
+    """Test that prefetched predictions are reused by analyze without running the model again."""
+    texts = [TEXT, "Wir treffen uns in Wien."]
+    nlp_artifacts_list = [mocker.Mock(tokens=None, spec=["tokens"]) for _ in texts]
+
+    flair_recognizer.prefetch(texts, nlp_artifacts_list)
+    results = flair_recognizer.analyze(texts[1], entities=["LOCATION"], nlp_artifacts=nlp_artifacts_list[1])
+
+    assert flair_recognizer.model.predicted_batches == [4]
+    assert [texts[1][r.start:r.end] for r in results] == ["Wien"]
+
+
+@pytest.mark.unit
+def test_only_requested_entities_are_returned(flair_recognizer):
+    """Test that spans of entities which were not requested are skipped."""
+    results = flair_recognizer.analyze(TEXT, entities=["LOCATION", "EMAIL_ADDRESS"])
+
+    assert sorted(TEXT[r.start:r.end] for r in results) == ["Innsbruck", "Wien"]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("return_decision_process", [True, False])
+def test_explanations_follow_the_decision_process_flag(flair_recognizer, mocker, return_decision_process):
+    """Test that explanations are only built if the engine returns the decision process."""
+    nlp_artifacts = mocker.Mock(
+        spec=["tokens", "return_decision_process"],
+        tokens=None,
+        return_decision_process=return_decision_process,
+    )
+
+    results = flair_recognizer.analyze(TEXT, entities=[], nlp_artifacts=nlp_artifacts)
+
+    assert results
+    assert all((r.analysis_explanation is not None) == return_decision_process for r in results)
+
+
+@pytest.mark.unit
+def test_spacy_tokens_are_reused(flair_recognizer, mocker):
+    """Test that sentences are built from the spaCy tokens, keeping their offsets."""
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("de")
+    nlp.add_pipe("sentencizer")
+    doc = nlp(TEXT)
+    nlp_artifacts = mocker.Mock(spec=["tokens"], tokens=doc)
+
+    sentences = flair_recognizer._build_sentences(TEXT, nlp_artifacts)
+    results = flair_recognizer.analyze(TEXT, entities=[], nlp_artifacts=nlp_artifacts)
+
+    flair_tokens = [
+        (sentence.start_position + token.start_position, token.text)
+        for sentence in sentences
+        for token in sentence.tokens
+    ]
+    assert flair_tokens == [(token.idx, token.text) for token in doc if not token.is_space]
+    assert [sentence.to_original_text() for sentence in sentences] == [
+        sentence.text.strip() for sentence in doc.sents
+    ]
+    assert sorted(TEXT[r.start:r.end] for r in results) == [
+        "Franz", "Franz", "Innsbruck", "Müller", "Wien",
+    ]
+
+
+@pytest.mark.unit
+def test_predictions_can_be_attached_later(flair_recognizer, mocker):
+    """Test that predictions made without nlp artifacts are picked up once attached."""
+    texts = [TEXT, "Wir treffen uns in Wien."]
+    predictions = flair_recognizer.predict_batch(texts)
+    nlp_artifacts_list = [mocker.Mock(tokens=None, spec=["tokens"]) for _ in texts]
+
+    flair_recognizer.attach_predictions(nlp_artifacts_list, predictions)
+    results = flair_recognizer.analyze(texts[1], entities=[], nlp_artifacts=nlp_artifacts_list[1])
+
+    assert flair_recognizer.model.predicted_batches == [4]
+    assert [texts[1][r.start:r.end] for r in results] == ["Wien"]
+
+
+@pytest.mark.unit
+def test_model_provider_is_called_on_use(mocker):
+    """Test that a recognizer with a model provider loads no model until it predicts."""
+    load_model = mocker.patch.object(FlairRecognizer, "load_model")
+    provider = mocker.Mock(return_value=StubTagger())
+    recognizer = FlairRecognizer(supported_language="de", model_provider=provider)
+
+    provider.assert_not_called()
+    load_model.assert_not_called()
+    recognizer.analyze("Max Mustermann wohnt in Berlin.", entities=["PERSON"])
+    provider.assert_called()
+
+
+@pytest.mark.unit
+def test_recognizers_share_the_model_of_a_language(mocker):
+    """Test that recognizers of the same language load their model once."""
+    load_model = mocker.patch.object(FlairRecognizer, "load_model", return_value=StubTagger())
+    registry = mocker.patch("core.flair_recognizer.model_registry", ModelRegistry())
+
+    first = FlairRecognizer(supported_language="de")
+    second = FlairRecognizer(supported_language="de")
+
+    assert first.model is second.model
+    load_model.assert_called_once_with("de", model_path=None)
+    assert registry.report()["models"][0]["references"] == 2
+
+
+@pytest.mark.unit
+def test_parallel_and_sequential_analysis_agree(tmp_path):
+    """Test that predictions made in parallel, without the spaCy tokens, find the same entities as sequential ones."""
+    spacy = pytest.importorskip("spacy")
+    from presidio_analyzer import RecognizerRegistry
+    from presidio_analyzer.nlp_engine import SpacyNlpEngine
+    from core.guard_analyzer_engine import GuardAnalyzerEngine
+
+    nlp = spacy.blank("de")
+    nlp.add_pipe("sentencizer")
+    nlp.to_disk(tmp_path / "de")
+    nlp_engine = SpacyNlpEngine(models=[{"lang_code": "de", "model_name": str(tmp_path / "de")}])
+    nlp_engine.load()
+    text = TEXT + " Frau Müller, geboren in Wien, zieht nach Innsbruck!"
+
+    found = []
+    for parallel_workers in (0, 2):
+        registry = RecognizerRegistry(supported_languages=["de"])
+        registry.add_recognizer(FlairRecognizer(supported_language="de", model=StubTagger()))
+        engine = GuardAnalyzerEngine(
+            nlp_engine=nlp_engine, registry=registry, supported_languages=["de"], parallel_workers=parallel_workers
+        )
+        results = engine.analyze(text, language="de")
+        found.append(sorted((r.start, r.end, r.entity_type) for r in results))
+
+    assert found[0] == found[1]
+    assert [text[start:end] for start, end, _ in found[0]].count("Müller") == 2
@@ -0,0 +1,187 @@
+import time
+
+import pytest
+import spacy
+from presidio_analyzer import RecognizerRegistry
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+from presidio_analyzer.predefined_recognizers import EmailRecognizer, IpRecognizer, TransformersRecognizer
+
+from core.guard_analyzer_engine import GuardAnalyzerEngine
+from core.shared_nlp_engine import HF_PIPE_NAME
+from core.text_chunker import SentenceWindowChunker
+from processing.tests.test_utils import strip_scores
+
+test_texts_de = [
+    "Franz Müller wohnt in der Musterstraße 12, 1010 Wien.",
+    "Seine Telefonnummer ist +43 660 1234567.",
+    "Bitte senden Sie die Unterlagen an anna.mueller@firma.de.",
+    "Das Fahrzeug mit dem Kennzeichen I-12345A wurde in Innsbruck abgestellt.",
+]
+
+
+@pytest.mark.unit
+def test_analyze_batch_matches_single_analyze(setup_engine):
+    """Test that batched analysis finds the same entities as analyzing each text on its own."""
+    batch_results = setup_engine.analyze_batch(test_texts_de, language="de")
+
+    assert len(batch_results) == len(test_texts_de)
+    for text, results in zip(test_texts_de, batch_results):
+        single_results = setup_engine.analyze(text, language="de")
+        assert sorted(strip_scores(results), key=str) == sorted(strip_scores(single_results), key=str), \
+            f"Batch and single analysis differ for: {text}"
+
+
+@pytest.mark.unit
+def test_analyze_batch_empty(setup_engine):
+    """Test that an empty batch returns no results."""
+    assert setup_engine.analyze_batch([], language="de") == []
+
+
+@pytest.mark.unit
+def test_long_text_is_analyzed_in_windows(setup_engine):
+    """Test that entities of a text longer than one window are found at their original offsets."""
+    text = " ".join(f"Bitte antworten Sie an kontakt{i}@firma.de bis Freitag." for i in range(100))
+
+    results = setup_engine.analyze(text, language="de", entities=["EMAIL_ADDRESS"])
+
+    assert len(setup_engine.text_chunker.split(text)) > 1
+    assert sorted(text[r.start:r.end] for r in results) == sorted(f"kontakt{i}@firma.de" for i in range(100))
+
+
+@pytest.mark.unit
+def test_regex_entities_skip_the_ner_models(setup_engine, mocker):
+    """Test that a request for regex-based entities runs neither the NER model nor Flair."""
+    plan = setup_engine.get_execution_plan("de", ["EMAIL_ADDRESS", "AUT_LICENSE_PLATE"])
+    process_batch = mocker.spy(setup_engine.nlp_engine, "process_batch")
+
+    results = setup_engine.analyze(test_texts_de[2], language="de", entities=["EMAIL_ADDRESS", "AUT_LICENSE_PLATE"])
+
+    assert not plan.needs_ner_model
+    assert not any(hasattr(r, "prefetch") for r in plan.recognizers)
+    assert not process_batch.called
+    assert [test_texts_de[2][r.start:r.end] for r in results] == ["anna.mueller@firma.de"]
+
+
+@pytest.mark.unit
+def test_execution_plan_is_reused(setup_engine):
+    """Test that the plan of a language and entity set is computed once."""
+    plan = setup_engine.get_execution_plan("de", ["PERSON", "LOCATION"])
+
+    assert setup_engine.get_execution_plan("de", ["LOCATION", "PERSON"]) is plan
+    assert plan.needs_ner_model
+
+
+@pytest.fixture
+def blank_engine(tmp_path):
+    """An engine with a blank spaCy pipeline and the email and IP recognizers, no models needed."""
+    spacy.blank("en").to_disk(tmp_path / "en")
+    nlp_engine = SpacyNlpEngine(models=[{"lang_code": "en", "model_name": str(tmp_path / "en")}])
+    nlp_engine.load()
+    registry = RecognizerRegistry(supported_languages=["en"])
+    registry.add_recognizer(EmailRecognizer())
+    registry.add_recognizer(IpRecognizer())
+    return GuardAnalyzerEngine(nlp_engine=nlp_engine, registry=registry, supported_languages=["en"])
+
+
+@pytest.mark.unit
+def test_execution_plans_ignore_unknown_entities_and_are_bounded(blank_engine, mocker):
+    """Test that requested entities without a recognizer share a plan and only the latest plans are kept."""
+    mocker.patch.object(GuardAnalyzerEngine, "MAX_EXECUTION_PLANS", 2)
+
+    plan = blank_engine.get_execution_plan("en", ["EMAIL_ADDRESS", "UNKNOWN_1"])
+    for i in range(2, 10):
+        assert blank_engine.get_execution_plan("en", ["EMAIL_ADDRESS", f"UNKNOWN_{i}"]) is plan
+    blank_engine.get_execution_plan("en", ["IP_ADDRESS"])
+    blank_engine.get_execution_plan("en")
+
+    assert len(blank_engine._execution_plans) == 2
+    assert blank_engine.get_execution_plan("en", ["EMAIL_ADDRESS"]) is not plan
+
+
+@pytest.mark.unit
+def test_ner_model_is_skipped_for_entities_of_pattern_recognizers(blank_engine):
+    """Test that the NER model is left out if all requested entities it maps are found by pattern recognizers."""
+    # Entities of the transformer model in the shipped configuration
+    ner_recognizer = TransformersRecognizer(
+        supported_entities=["EMAIL_ADDRESS", "LOCATION", "PERSON", "PHONE_NUMBER"]
+    )
+    blank_engine.registry.add_recognizer(ner_recognizer)
+
+    regex_plan = blank_engine.get_execution_plan("en", ["EMAIL_ADDRESS", "IP_ADDRESS"])
+    person_plan = blank_engine.get_execution_plan("en", ["EMAIL_ADDRESS", "PERSON"])
+
+    assert ner_recognizer not in regex_plan.recognizers
+    assert not regex_plan.needs_ner_model
+    assert ner_recognizer in person_plan.recognizers
+    assert person_plan.needs_ner_model
+    assert blank_engine.get_execution_plan("en").needs_ner_model
+
+
+@pytest.mark.unit
+def test_windows_are_counted_with_the_tokenizer_of_the_ner_model(blank_engine, mocker):
+    """Test that long texts are split by the number of tokens of the transformer model."""
+    tokenizer = mocker.Mock(side_effect=lambda words, add_special_tokens: {"input_ids": [[0] * len(word) for word in words]})
+    pipeline = mocker.Mock(pipe_names=[HF_PIPE_NAME])
+    pipeline.get_pipe.return_value.hf_pipeline.tokenizer = tokenizer
+    blank_engine.nlp_engine = mocker.Mock(nlp={"en": pipeline})
+    blank_engine.text_chunker = SentenceWindowChunker(window_tokens=20, overlap_tokens=0)
+
+    count_tokens = blank_engine._model_token_counter("en")
+    windows = blank_engine._split("Kontakt: max.mustermann@beispiel.at", count_tokens)
+
+    assert count_tokens(["Wien", "1010"]) == [4, 4]
+    assert len(windows) == 2
+    assert blank_engine._model_token_counter("de") is None
+
+
+@pytest.fixture
+def parallel_engine(setup_engine):
+    setup_engine.parallel_workers = 2
+    yield setup_engine
+    setup_engine.parallel_workers = 0
+    setup_engine.recognizer_timeouts = {}
+
+
+@pytest.mark.unit
+def test_parallel_recognizers_match_sequential(parallel_engine):
+    """Test that running the model-based recognizers in parallel finds the same entities."""
+    parallel_results = parallel_engine.analyze_batch(test_texts_de, language="de")
+
+    parallel_engine.parallel_workers = 0
+    sequential_results = parallel_engine.analyze_batch(test_texts_de, language="de")
+
+    for text, parallel, sequential in zip(test_texts_de, parallel_results, sequential_results):
+        assert sorted(strip_scores(parallel), key=str) == sorted(strip_scores(sequential), key=str), \
+            f"Parallel and sequential analysis differ for: {text}"
+
+
+@pytest.mark.unit
+def test_recognizer_exceeding_its_budget_is_skipped(parallel_engine, mocker):
+    """Test that a recognizer running out of time is skipped while the others still report."""
+    flair_recognizer = next(
+        r for r in parallel_engine.registry.get_recognizers(language="de", all_fields=True)
+        if hasattr(r, "predict_batch")
+    )
+    mocker.patch.object(flair_recognizer, "predict_batch", side_effect=lambda texts: time.sleep(1))
+    parallel_engine.recognizer_timeouts = {flair_recognizer.name: 0.01}
+
+    results = parallel_engine.analyze(test_texts_de[2], language="de", return_decision_process=True)
+
+    assert "EMAIL_ADDRESS" in {r.entity_type for r in results}
+    assert all(r.analysis_explanation.recognizer != "FlairRecognizer" for r in results)
+
+
+@pytest.mark.unit
+def test_throughput_counts_analyzed_texts(setup_engine):
+    """Test that the engine measures the texts and characters it analyzed."""
+    setup_engine.reset_throughput()
+
+    setup_engine.analyze_batch(test_texts_de, language="de")
+    throughput = setup_engine.throughput()
+
+    assert throughput["texts"] == len(test_texts_de)
+    assert throughput["characters"] == sum(len(text) for text in test_texts_de)
+    assert throughput["texts_per_second"] > 0
+
+    setup_engine.reset_throughput()
+    assert setup_engine.throughput()["texts_per_second"] is None
@@ -71,4 +71,12 @@ class TestAPIConnectivity:
         with patch("processing.guard_cli.requests.get",
                   side_effect=requests.exceptions.ConnectionError("Connection failed")):
             with pytest.raises(SystemExit):
-                check_api_available(API_ENDPOINT)
\ No newline at end of file
+                check_api_available(API_ENDPOINT)
+
+    @pytest.mark.unit
+    def test_check_api_available_uses_timeout(self):
+        """Test API check does not wait forever for a stuck server."""
+        with patch("processing.guard_cli.requests.get") as mock_get:
+            mock_get.return_value = create_mock_response(200)
+            check_api_available(API_ENDPOINT, timeout=(1.0, 2.0))
+            assert mock_get.call_args.kwargs["timeout"] == (1.0, 2.0)
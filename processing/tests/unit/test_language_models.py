@@ -0,0 +1,109 @@
+import pytest
+
+from core.language_models import LanguageModelManager, LazyModelMapping
+
+
+@pytest.fixture
+def memory(mocker):
+    """Fake resident memory, grown by 100 MB by every model load."""
+    current = {"mb": 1000.0}
+    mocker.patch("core.language_models.resident_memory_mb", side_effect=lambda: current["mb"])
+    return current
+
+
+def loader(memory, calls, language):
+    def load():
+        calls.append(language)
+        memory["mb"] += 100
+        return f"model-{language}"
+
+    return load
+
+
+@pytest.mark.unit
+def test_models_are_loaded_on_first_use(memory):
+    """Test that a model is loaded once, when it is first requested."""
+    calls = []
+    manager = LanguageModelManager()
+    manager.register("de", "nlp", loader(memory, calls, "de"))
+
+    assert calls == []
+    assert manager.get("de", "nlp") == "model-de"
+    assert manager.get("de", "nlp") == "model-de"
+    assert calls == ["de"]
+    assert manager.stats()["loaded"]["de"]["memory_mb"] == 100
+
+
+@pytest.mark.unit
+def test_least_recently_used_language_is_evicted(memory):
+    """Test that the least recently used language is unloaded beyond the memory budget."""
+    calls = []
+    manager = LanguageModelManager(memory_budget_mb=250)
+    for language in ("de", "en", "it"):
+        manager.register(language, "nlp", loader(memory, calls, language))
+
+    manager.get("de", "nlp")
+    manager.get("en", "nlp")
+    manager.get("de", "nlp")
+    manager.get("it", "nlp")
+
+    assert manager.loaded_languages() == ["de", "it"]
+    manager.get("en", "nlp")
+    assert calls == ["de", "en", "it", "en"]
+
+
+@pytest.mark.unit
+def test_preloaded_languages_are_never_evicted(memory):
+    """Test that preloaded languages stay loaded even when they exceed the budget."""
+    calls = []
+    manager = LanguageModelManager(memory_budget_mb=150, preload=["de"])
+    for language in ("de", "en", "it"):
+        manager.register(language, "nlp", loader(memory, calls, language))
+
+    manager.preload()
+    manager.get("en", "nlp")
+    manager.get("it", "nlp")
+
+    assert calls == ["de", "en", "it"]
+    assert manager.loaded_languages() == ["de", "it"]
+
+
+@pytest.mark.unit
+def test_unknown_model_is_rejected():
+    """Test that requesting an unregistered model raises a KeyError."""
+    with pytest.raises(KeyError, match="flair"):
+        LanguageModelManager().get("de", "flair")
+
+
+@pytest.mark.unit
+def test_mapping_loads_only_accessed_languages(memory):
+    """Test that listing the languages of the mapping does not load their models."""
+    calls = []
+    manager = LanguageModelManager()
+    for language in ("de", "en"):
+        manager.register(language, "nlp", loader(memory, calls, language))
+    mapping = LazyModelMapping(manager, "nlp", ["de", "en"])
+
+    assert list(mapping) == ["de", "en"]
+    assert len(mapping) == 2 and "en" in mapping and "it" not in mapping
+    assert calls == []
+    assert mapping["en"] == "model-en"
+    assert calls == ["en"]
+    with pytest.raises(KeyError):
+        mapping["it"]
+
+
+@pytest.mark.unit
+def test_evicted_models_are_unloaded(memory, mocker):
+    """Test that the models of an evicted language are handed to their unloader."""
+    calls = []
+    unloader = mocker.Mock()
+    manager = LanguageModelManager(memory_budget_mb=150)
+    for language in ("de", "en"):
+        manager.register(language, "nlp", loader(memory, calls, language), unloader=unloader)
+
+    manager.get("de", "nlp")
+    unloader.assert_not_called()
+    manager.get("en", "nlp")
+
+    unloader.assert_called_once_with("model-de")
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+import spacy
+from presidio_analyzer import RecognizerRegistry
+from presidio_analyzer.nlp_engine import SpacyNlpEngine
+from presidio_analyzer.predefined_recognizers import EmailRecognizer
+
+from core.guard_analyzer_engine import GuardAnalyzerEngine
+from core.metrics import AnalyzerMetrics, STAGE_DEDUPLICATION, STAGE_NLP_ARTIFACTS, STAGE_RECOGNIZERS
+from core.model_registry import ModelKey, ModelRegistry
+
+pytest.importorskip("prometheus_client")
+
+
+@pytest.fixture
+def regex_engine(tmp_path):
+    """An engine with a blank spaCy pipeline and the email recognizer, no models needed."""
+    spacy.blank("en").to_disk(tmp_path / "en")
+    nlp_engine = SpacyNlpEngine(models=[{"lang_code": "en", "model_name": str(tmp_path / "en")}])
+    nlp_engine.load()
+    registry = RecognizerRegistry(supported_languages=["en"])
+    registry.add_recognizer(EmailRecognizer())
+    return GuardAnalyzerEngine(nlp_engine=nlp_engine, registry=registry, supported_languages=["en"])
+
+
+@pytest.mark.unit
+def test_engine_reports_stage_and_recognizer_durations(regex_engine, mocker):
+    """Test that every analysis reports the time of its stages and recognizers."""
+    regex_engine.metrics = mocker.Mock()
+
+    results = regex_engine.analyze("Mail me at max@example.com", language="en")
+
+    assert [result.entity_type for result in results] == ["EMAIL_ADDRESS"]
+    language, stages, recognizers = regex_engine.metrics.observe_analysis.call_args.args
+    assert language == "en"
+    assert {STAGE_NLP_ARTIFACTS, STAGE_RECOGNIZERS} <= set(stages)
+    assert list(recognizers) == ["EmailRecognizer"]
+    assert all(seconds >= 0 for seconds in [*stages.values(), *recognizers.values()])
+
+
+@pytest.mark.unit
+def test_engine_collects_timings_of_a_request(regex_engine):
+    """Test that the timings of all analyses within the context are collected, with the analyzed counts."""
+    texts = ["Mail me at max@example.com", "Or anna@example.com"]
+
+    with regex_engine.collect_timings() as timings:
+        regex_engine.analyze(texts[0], language="en")
+        regex_engine.analyze(texts[1], language="en")
+    regex_engine.analyze(texts[0], language="en")
+
+    assert timings["counts"] == {
+        "texts": 2, "windows": 2, "characters": sum(len(text) for text in texts), "tokens": 6
+    }
+    assert {STAGE_NLP_ARTIFACTS, STAGE_RECOGNIZERS, STAGE_DEDUPLICATION} <= set(timings["stages"])
+    assert list(timings["recognizers"]) == ["EmailRecognizer"]
+
+
+@pytest.mark.unit
+def test_recognizers_are_wrapped_once_by_concurrent_requests(regex_engine, mocker):
+    """Test that requests instrumenting the same recognizer at once wrap it only once."""
+    recognizer = regex_engine.registry.recognizers[0]
+    wrap_analyze = mocker.spy(regex_engine, "_wrap_analyze")
+    barrier = threading.Barrier(8)
+
+    def instrument():
+        barrier.wait()
+        regex_engine._instrument(recognizer)
+
+    threads = [threading.Thread(target=instrument) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert wrap_analyze.call_count == 1
+
+
+@pytest.mark.unit
+def test_metrics_exposition(mocker):
+    """Test that requests, analysis durations and model memory are exposed in the Prometheus format."""
+    model_registry = ModelRegistry()
+    model_registry.acquire(ModelKey("flair/ner-german", "cpu"), lambda: object())
+    model_manager = mocker.Mock()
+    model_manager.stats.return_value = {"loaded": {"de": {"memory_mb": 10.0}}}
+    metrics = AnalyzerMetrics(model_registry, model_managers=lambda: [model_manager])
+
+    metrics.observe_request("/analyze", 200, payload_bytes=2048, seconds=0.3)
+    metrics.observe_analysis("de", {STAGE_NLP_ARTIFACTS: 0.2}, {"Flair Analytics": 0.1})
+    data, content_type = metrics.exposition()
+    text = data.decode("utf-8")
+
+    assert content_type.startswith("text/plain")
+    assert 'guard_requests_total{endpoint="/analyze",status="200"} 1.0' in text
+    assert 'guard_request_payload_bytes_sum{endpoint="/analyze"} 2048.0' in text
+    assert 'guard_stage_latency_seconds_count{language="de",stage="nlp_artifacts"} 1.0' in text
+    assert 'guard_recognizer_latency_seconds_bucket{language="de",le="0.25",recognizer="Flair Analytics"} 1.0' in text
+    assert 'guard_model_references{device="cpu",model_id="flair/ner-german",precision="fp32"} 1.0' in text
+    assert 'guard_language_memory_bytes{language="de"} 1.048576e+07' in text
@@ -0,0 +1,133 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.micro_batcher import MicroBatcher
+
+TEXTS = ["Max Mustermann", "Anna Müller", "John Smith", "Maria Rossi"]
+LANGUAGES = ["de", "de", "en", "it"]
+
+
+def create_mock_engine():
+    """Create an engine mock returning the text and language of every analyzed text."""
+    engine = MagicMock()
+    engine.analyze_batch.side_effect = lambda texts, language, **kwargs: [
+        [(text, language)] for text in texts
+    ]
+    return engine
+
+
+def analyze_concurrently(batcher, texts, languages, **kwargs):
+    """Submit all texts at the same time and collect the results per text."""
+    results = [None] * len(texts)
+
+    def worker(index):
+        results[index] = batcher.analyze(text=texts[index], language=languages[index], **kwargs)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+@pytest.mark.unit
+def test_concurrent_requests_are_batched_per_language():
+    """Test that concurrent calls are grouped by language and get their own results back."""
+    engine = create_mock_engine()
+    batcher = MicroBatcher(engine, max_wait_ms=200, max_batch_size=len(TEXTS))
+
+    results = analyze_concurrently(batcher, TEXTS, LANGUAGES)
+
+    assert results == [[(text, language)] for text, language in zip(TEXTS, LANGUAGES)]
+    batched_languages = sorted(call.kwargs["language"] for call in engine.analyze_batch.call_args_list)
+    assert batched_languages == ["de", "en", "it"]
+
+
+@pytest.mark.unit
+def test_batches_respect_max_batch_size():
+    """Test that no batch handed to the engine exceeds the configured size."""
+    engine = create_mock_engine()
+    batcher = MicroBatcher(engine, max_wait_ms=50, max_batch_size=2)
+
+    analyze_concurrently(batcher, TEXTS, ["de"] * len(TEXTS))
+
+    assert all(len(call.kwargs["texts"]) <= 2 for call in engine.analyze_batch.call_args_list)
+
+
+@pytest.mark.unit
+def test_parameters_are_passed_to_the_engine():
+    """Test that analyze parameters are forwarded with the batch."""
+    engine = create_mock_engine()
+    batcher = MicroBatcher(engine, max_wait_ms=1)
+
+    batcher.analyze(text=TEXTS[0], language="de", entities=["PERSON"])
+
+    assert engine.analyze_batch.call_args.kwargs["entities"] == ["PERSON"]
+
+
+@pytest.mark.unit
+def test_engine_errors_are_raised_to_the_caller():
+    """Test that a failing batch raises the engine error in the waiting request."""
+    engine = MagicMock()
+    engine.analyze_batch.side_effect = ValueError("Test error")
+    batcher = MicroBatcher(engine, max_wait_ms=1)
+
+    with pytest.raises(ValueError):
+        batcher.analyze(text=TEXTS[0], language="de")
+
+
+@pytest.mark.unit
+def test_unusable_batches_fail_the_waiting_requests():
+    """Test that a short result list fails the request instead of hanging it."""
+    engine = MagicMock()
+    engine.analyze_batch.return_value = []
+    batcher = MicroBatcher(engine, max_wait_ms=1, timeout_seconds=5)
+
+    with pytest.raises(ValueError, match="0 result lists for 1 texts"):
+        batcher.analyze(text=TEXTS[0], language="de")
+
+
+class Unhashable:
+    __hash__ = None
+
+
+@pytest.mark.unit
+def test_nested_and_unhashable_parameters_are_analyzed():
+    """Test that nested list and dict parameters are batched by value and unhashable ones run on their own."""
+    engine = create_mock_engine()
+    batcher = MicroBatcher(engine, max_wait_ms=200, max_batch_size=3)
+    parameters = [
+        {"context": [["Kontakt"], ["Telefon"]], "allow_list": ["Wien"]},
+        {"context": [["Kontakt"], ["Telefon"]], "allow_list": ["Wien"]},
+        {"ad_hoc_recognizers": [{"name": "Unhashable", "option": Unhashable()}]},
+    ]
+    results = [None] * len(parameters)
+
+    def worker(index):
+        results[index] = batcher.analyze(text=TEXTS[index], language="de", **parameters[index])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(parameters))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == [[(text, "de")] for text in TEXTS[:3]]
+    assert sorted(len(call.kwargs["texts"]) for call in engine.analyze_batch.call_args_list) == [1, 2]
+
+
+@pytest.mark.unit
+def test_requests_wait_at_most_the_time_budget():
+    """Test that a request stops waiting for a stuck batch after its time budget."""
+    engine = MagicMock()
+    release = threading.Event()
+    engine.analyze_batch.side_effect = lambda texts, language, **kwargs: release.wait(5) and [[]]
+    batcher = MicroBatcher(engine, max_wait_ms=1, timeout_seconds=0.1)
+
+    with pytest.raises(FutureTimeoutError):
+        batcher.analyze(text=TEXTS[0], language="de")
+    release.set()
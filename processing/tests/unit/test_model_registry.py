@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+import torch
+
+from core.model_registry import ModelKey, ModelRegistry
+
+KEY = ModelKey("flair/ner-german", "cpu")
+
+
+@pytest.mark.unit
+def test_models_are_shared_and_counted(mocker):
+    """Test that a key is loaded once and handed out to every caller."""
+    registry = ModelRegistry()
+    loader = mocker.Mock(side_effect=lambda: object())
+
+    first = registry.acquire(KEY, loader)
+    second = registry.acquire(KEY, loader)
+    other = registry.acquire(KEY._replace(precision="int8"), loader)
+
+    assert first is second and first is not other
+    assert loader.call_count == 2
+    report = registry.report()
+    assert [model["references"] for model in report["models"]] == [2, 1]
+    assert report["models"][1]["precision"] == "int8"
+
+
+@pytest.mark.unit
+def test_model_is_unloaded_with_the_last_reference(mocker):
+    """Test that a model stays loaded until all references are released."""
+    registry = ModelRegistry()
+    loader = mocker.Mock(side_effect=lambda: object())
+    model = registry.acquire(KEY, loader)
+    registry.acquire(KEY, loader)
+
+    registry.release(model)
+    assert len(registry.report()["models"]) == 1
+    registry.release(model)
+    assert registry.report()["models"] == []
+
+    assert registry.acquire(KEY, loader) is not model
+    assert loader.call_count == 2
+
+
+@pytest.mark.unit
+def test_concurrent_acquires_load_once():
+    """Test that threads acquiring the same key wait for a single load."""
+    registry = ModelRegistry()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return object()
+
+    models = []
+    threads = [
+        threading.Thread(target=lambda: models.append(registry.acquire(KEY, loader)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+
+
+@pytest.mark.unit
+def test_torch_models_are_read_only():
+    """Test that shared torch models are in evaluation mode without gradients."""
+    model = ModelRegistry().acquire(KEY, lambda: torch.nn.Linear(2, 2))
+
+    assert not model.training
+    assert not any(parameter.requires_grad for parameter in model.parameters())
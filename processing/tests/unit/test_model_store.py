@@ -0,0 +1,109 @@
+import json
+
+import pytest
+import spacy
+import torch
+from transformers import DistilBertConfig, DistilBertForTokenClassification, DistilBertTokenizerFast
+
+from utils.model_store import MANIFEST_FILE, ModelStore, main
+
+VOCABULARY = "[PAD] [UNK] [CLS] [SEP] [MASK] max mustermann wohnt in innsbruck .".split()
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    """A blank spaCy pipeline and a tiny token classification model, standing in for the hub models."""
+    path = tmp_path_factory.mktemp("models")
+    spacy.blank("de").to_disk(path / "spacy")
+
+    transformers_path = path / "transformers"
+    transformers_path.mkdir()
+    (transformers_path / "vocab.txt").write_text("\n".join(VOCABULARY))
+    config = DistilBertConfig(vocab_size=len(VOCABULARY), dim=32, hidden_dim=64, n_layers=1, n_heads=2)
+    torch.manual_seed(0)
+    DistilBertForTokenClassification(config).save_pretrained(transformers_path)
+    DistilBertTokenizerFast(str(transformers_path / "vocab.txt")).save_pretrained(transformers_path)
+
+    return [
+        {
+            "lang_code": "de",
+            "model_name": {"spacy": str(path / "spacy"), "transformers": str(transformers_path)},
+        }
+    ]
+
+
+@pytest.fixture
+def flair_load(mocker):
+    tagger = mocker.Mock()
+    tagger.save.side_effect = lambda path: path.write_text("tagger")
+    return mocker.patch("flair.models.SequenceTagger.load", return_value=tagger)
+
+
+@pytest.mark.unit
+def test_models_are_materialized_once(models, flair_load, tmp_path):
+    """Test that all models are stored (transformers as safetensors) and stored models are skipped."""
+    store = ModelStore(tmp_path / "store")
+
+    manifest = store.materialize(models, flair_models=["flair/ner-german"])
+    store.materialize(models, flair_models=["flair/ner-german"])
+
+    assert flair_load.call_count == 1
+    assert (store.transformers_path(models[0]["model_name"]["transformers"]) / "model.safetensors").exists()
+    assert store.flair_path("flair/ner-german").read_text() == "tagger"
+    assert manifest["flair"] == {"flair/ner-german": "flair/flair__ner-german"}
+    assert store.load_manifest() == manifest
+
+
+@pytest.mark.unit
+def test_model_names_are_resolved_to_the_store(models, flair_load, tmp_path):
+    """Test that the NLP engine configuration is rewritten to load from the store."""
+    store = ModelStore(tmp_path / "store")
+    store.materialize(models)
+
+    resolved = store.resolve_nlp_models(models)[0]["model_name"]
+
+    assert resolved["spacy"].startswith(str(store.root))
+    assert resolved["transformers"].startswith(str(store.root))
+    assert spacy.load(resolved["spacy"]).lang == "de"
+
+
+@pytest.mark.unit
+def test_missing_models_fail_instead_of_downloading(tmp_path):
+    """Test that a model missing in the store raises an error naming the model."""
+    store = ModelStore(tmp_path)
+
+    with pytest.raises(FileNotFoundError, match="de_core_news_lg"):
+        store.resolve_nlp_models([{"lang_code": "de", "model_name": "de_core_news_lg"}])
+    with pytest.raises(FileNotFoundError, match="flair/ner-german"):
+        store.flair_path("flair/ner-german")
+
+
+@pytest.mark.unit
+def test_cli_materializes_the_configured_models(models, flair_load, tmp_path, capsys):
+    """Test that the command line stores the models of the configuration and all Flair taggers."""
+    conf_file = tmp_path / "analyzer.yaml"
+    conf_file.write_text(json.dumps({"nlp_configuration": {"models": models}}))
+
+    main(["--config", str(conf_file), "--store", str(tmp_path / "store")])
+
+    manifest = json.loads((tmp_path / "store" / MANIFEST_FILE).read_text())
+    assert sorted(manifest["flair"]) == ["flair/ner-english-fast", "flair/ner-german"]
+    assert "Model store ready" in capsys.readouterr().out
+
+
+@pytest.mark.unit
+def test_cli_materializes_the_models_of_all_profiles(models, flair_load, tmp_path):
+    """Test that the command line also stores the models only used by a profile."""
+    conf_file = tmp_path / "analyzer.yaml"
+    conf_file.write_text(json.dumps({
+        "nlp_configuration": {"models": models},
+        "guard": {
+            "flair": {"enabled": False},
+            "profiles": {"accurate": {"guard": {"flair": {"enabled": True, "models": {"de": "flair/ner-german-large"}}}}},
+        },
+    }))
+
+    main(["--config", str(conf_file), "--store", str(tmp_path / "store")])
+
+    manifest = json.loads((tmp_path / "store" / MANIFEST_FILE).read_text())
+    assert sorted(manifest["flair"]) == ["flair/ner-english-fast", "flair/ner-german-large"]
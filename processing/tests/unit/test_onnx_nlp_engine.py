@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip("optimum.onnxruntime")
+
+import spacy
+import torch
+from presidio_analyzer.nlp_engine import NerModelConfiguration, TransformersNlpEngine
+from transformers import DistilBertConfig, DistilBertForTokenClassification, DistilBertTokenizerFast
+
+from core.onnx_nlp_engine import ONNX_MODEL_FILE, OnnxTransformersNlpEngine, export_onnx_model
+
+TEXT = "Max Mustermann wohnt in Innsbruck. Er arbeitet in Wien."
+VOCABULARY = "[PAD] [UNK] [CLS] [SEP] [MASK] max mustermann wohnt in innsbruck . er arbeitet wien".split()
+LABELS = ["O", "B-GIVENNAME1", "I-GIVENNAME1", "B-CITY"]
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    """A tiny, randomly initialized token classification model."""
+    path = tmp_path_factory.mktemp("model")
+    (path / "vocab.txt").write_text("\n".join(VOCABULARY))
+    config = DistilBertConfig(
+        vocab_size=len(VOCABULARY), dim=32, hidden_dim=64, n_layers=2, n_heads=2,
+        id2label=dict(enumerate(LABELS)), label2id={label: i for i, label in enumerate(LABELS)},
+    )
+    torch.manual_seed(0)
+    DistilBertForTokenClassification(config).save_pretrained(path)
+    DistilBertTokenizerFast(str(path / "vocab.txt")).save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture
+def blank_spacy(mocker):
+    mocker.patch("spacy.load", side_effect=lambda name, **kwargs: spacy.blank("de"))
+    mocker.patch.object(TransformersNlpEngine, "_download_spacy_model_if_needed")
+
+
+def create_engine(engine_class, model_path, **kwargs):
+    engine = engine_class(
+        models=[{"lang_code": "de", "model_name": {"spacy": "blank", "transformers": model_path}}],
+        ner_model_configuration=NerModelConfiguration(
+            aggregation_strategy="simple",
+            alignment_mode="expand",
+            stride=4,
+            model_to_presidio_entity_mapping={"GIVENNAME1": "PERSON", "CITY": "LOCATION"},
+        ),
+        **kwargs,
+    )
+    engine.load()
+    return engine
+
+
+@pytest.mark.unit
+def test_model_is_exported_once(model_path, tmp_path, mocker):
+    """Test that the export is cached and reused on the next start."""
+    model_dir = export_onnx_model(model_path, tmp_path)
+    export = mocker.patch("core.onnx_nlp_engine.ORTModelForTokenClassification.from_pretrained")
+
+    assert (model_dir / ONNX_MODEL_FILE).exists()
+    assert export_onnx_model(model_path, tmp_path) == model_dir
+    assert not export.called
+
+
+@pytest.mark.unit
+def test_onnx_engine_matches_transformers_engine(model_path, tmp_path, blank_spacy):
+    """Test that the ONNX engine finds the same entities, with the same mapping and scores."""
+    onnx_engine = create_engine(OnnxTransformersNlpEngine, model_path, cache_dir=tmp_path)
+    transformers_engine = create_engine(TransformersNlpEngine, model_path)
+
+    onnx_artifacts = onnx_engine.process_text(TEXT, "de")
+    transformers_artifacts = transformers_engine.process_text(TEXT, "de")
+
+    def entities(artifacts):
+        return [(entity.start_char, entity.end_char, entity.label_) for entity in artifacts.entities]
+
+    assert entities(onnx_artifacts)
+    assert entities(onnx_artifacts) == entities(transformers_artifacts)
+    assert onnx_artifacts.scores == pytest.approx(transformers_artifacts.scores, abs=1e-4)
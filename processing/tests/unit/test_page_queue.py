@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from utils.page_queue import PageWorkQueue
+
+
+def slow_page(document, page):
+    time.sleep(random.uniform(0, 0.01))
+    return f"{document}-{page}"
+
+
+@pytest.mark.unit
+def test_results_are_completed_in_page_order():
+    """Test that every document gets the results of its pages in page order, whatever order they finish in."""
+    completed = {}
+
+    with PageWorkQueue(max_workers=8) as queue:
+        futures = [
+            queue.submit_document(
+                (partial(slow_page, document, page) for page in range(pages)),
+                lambda results, document=document: completed.setdefault(document, results),
+            )
+            for document, pages in (("long", 40), ("short", 2), ("empty", 0))
+        ]
+        for future in futures:
+            future.result()
+
+    assert completed == {
+        "long": [f"long-{page}" for page in range(40)],
+        "short": ["short-0", "short-1"],
+        "empty": [],
+    }
+
+
+@pytest.mark.unit
+def test_pages_of_one_document_run_concurrently_and_bounded():
+    """Test that the pages of a single document are spread over the workers, with a bounded number pending."""
+    running = {"now": 0, "max": 0, "finished": 0}
+    lock = threading.Lock()
+
+    def page():
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+            running["finished"] += 1
+
+    def pages():
+        for index in range(20):
+            # Pages are only read while fewer than max_pending are pending
+            assert index - running["finished"] <= 4
+            yield page
+
+    with PageWorkQueue(max_workers=4, max_pending=4) as queue:
+        future = queue.submit_document(pages(), len)
+        assert future.result() == 20
+
+    assert running["max"] == 4
+
+
+@pytest.mark.unit
+def test_failing_page_fails_its_document_only():
+    """Test that an exception of a page is raised by its document, without calling its completion."""
+    completed = []
+
+    def failing():
+        raise ValueError("broken page")
+
+    with PageWorkQueue(max_workers=2) as queue:
+        failed = queue.submit_document([failing, lambda: 1], completed.append)
+        succeeded = queue.submit_document([lambda: 2], completed.append)
+
+        with pytest.raises(ValueError, match="broken page"):
+            failed.result()
+        succeeded.result()
+
+    assert completed == [[2]]
@@ -0,0 +1,36 @@
+import pytest
+import torch
+
+from core.quantization import quantize_model
+
+
+class TaggerModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.rnn = torch.nn.LSTM(8, 8, batch_first=True)
+        self.linear = torch.nn.Linear(8, 3)
+
+    def forward(self, x):
+        return self.linear(self.rnn(x)[0])
+
+
+@pytest.mark.unit
+def test_linear_and_lstm_layers_are_quantized():
+    """Test that the linear and LSTM layers are replaced by int8 layers giving close outputs."""
+    torch.manual_seed(0)
+    model = TaggerModel().eval()
+    inputs = torch.randn(2, 5, 8)
+
+    quantized = quantize_model(model, "int8")
+
+    assert isinstance(quantized.rnn, torch.ao.nn.quantized.dynamic.LSTM)
+    assert isinstance(quantized.linear, torch.ao.nn.quantized.dynamic.Linear)
+    assert torch.allclose(model(inputs), quantized(inputs), atol=0.1)
+
+
+@pytest.mark.unit
+def test_unknown_mode_is_rejected():
+    """Test that an unsupported quantization mode raises a ValueError."""
+    with pytest.raises(ValueError, match="int4"):
+        quantize_model(TaggerModel(), "int4")
+
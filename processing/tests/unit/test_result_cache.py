@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from core.result_cache import AnalysisCache
+
+TEXT = "Franz Müller wohnt in der Musterstraße 12, 1010 Wien."
+RESULTS = [{"entity_type": "PERSON", "start": 0, "end": 12, "score": 0.85}]
+
+
+@pytest.mark.unit
+def test_cache_hit_and_miss_counters():
+    """Test that lookups are counted as hits and misses."""
+    cache = AnalysisCache(max_size=10)
+    key = cache.make_key(text=TEXT, language="de")
+
+    assert cache.get(key) is None
+    cache.set(key, RESULTS)
+    assert cache.get(key) == RESULTS
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+@pytest.mark.unit
+def test_cache_key_depends_on_request_and_configuration():
+    """Test that language, parameters and configuration fingerprint are part of the key."""
+    cache = AnalysisCache(fingerprint="config-a")
+    key = cache.make_key(text=TEXT, language="de")
+
+    assert key == cache.make_key(text=TEXT, language="de")
+    assert key != cache.make_key(text=TEXT, language="en")
+    assert key != cache.make_key(text=TEXT, language="de", entities=["PERSON"])
+    assert key != AnalysisCache(fingerprint="config-b").make_key(text=TEXT, language="de")
+
+
+@pytest.mark.unit
+def test_cache_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted once the cache is full."""
+    cache = AnalysisCache(max_size=2)
+    cache.set("a", RESULTS)
+    cache.set("b", RESULTS)
+    cache.get("a")
+    cache.set("c", RESULTS)
+
+    assert cache.get("a") == RESULTS
+    assert cache.get("b") is None
+    assert cache.get("c") == RESULTS
+
+
+@pytest.mark.unit
+def test_cache_entries_expire(mocker):
+    """Test that entries are no longer served after their TTL."""
+    mock_time = mocker.patch("core.result_cache.time.time", return_value=1000.0)
+    cache = AnalysisCache(ttl_seconds=60)
+    cache.set("a", RESULTS)
+
+    mock_time.return_value = 1059.0
+    assert cache.get("a") == RESULTS
+
+    mock_time.return_value = 1061.0
+    assert cache.get("a") is None
+
+
+@pytest.mark.unit
+def test_disk_cache_is_shared(tmp_path):
+    """Test that a second cache instance finds entries through the shared SQLite file."""
+    disk_path = str(tmp_path / "analysis_cache.sqlite")
+    first = AnalysisCache(disk_path=disk_path)
+    second = AnalysisCache(disk_path=disk_path)
+
+    first.set("a", RESULTS)
+
+    assert second.get("a") == RESULTS
+    assert second.stats()["disk_hits"] == 1
+
+
+@pytest.mark.unit
+def test_disk_lookup_does_not_block_memory_hits(tmp_path, mocker):
+    """Test that entries in memory are served while another thread reads the SQLite file."""
+    cache = AnalysisCache(disk_path=str(tmp_path / "analysis_cache.sqlite"))
+    cache.set("a", RESULTS)
+    reading, release = threading.Event(), threading.Event()
+
+    def slow_disk_get(key, now):
+        reading.set()
+        release.wait(5)
+        return None
+
+    mocker.patch.object(cache, "_disk_get", side_effect=slow_disk_get)
+    lookup = threading.Thread(target=cache.get, args=("b",))
+    lookup.start()
+    reading.wait(5)
+    hits = []
+    memory_lookup = threading.Thread(target=lambda: hits.append(cache.get("a")))
+    memory_lookup.start()
+    memory_lookup.join(1)
+
+    assert hits == [RESULTS]
+    release.set()
+    lookup.join()
+    assert cache.stats()["misses"] == 1
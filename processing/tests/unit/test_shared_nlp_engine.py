@@ -0,0 +1,97 @@
+import pytest
+import spacy
+import torch
+from presidio_analyzer.nlp_engine import NerModelConfiguration, TransformersNlpEngine
+from transformers import DistilBertConfig, DistilBertForTokenClassification, DistilBertTokenizerFast
+
+from core.model_registry import ModelRegistry
+from core.shared_nlp_engine import HF_PIPE_NAME, SharedTransformersNlpEngine, release_pipeline
+
+TEXT = "Max Mustermann wohnt in Innsbruck."
+VOCABULARY = "[PAD] [UNK] [CLS] [SEP] [MASK] max mustermann wohnt in innsbruck .".split()
+LABELS = ["O", "B-GIVENNAME1", "B-CITY"]
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    """A tiny, randomly initialized token classification model."""
+    path = tmp_path_factory.mktemp("model")
+    (path / "vocab.txt").write_text("\n".join(VOCABULARY))
+    config = DistilBertConfig(
+        vocab_size=len(VOCABULARY), dim=32, hidden_dim=64, n_layers=1, n_heads=2,
+        id2label=dict(enumerate(LABELS)), label2id={label: i for i, label in enumerate(LABELS)},
+    )
+    torch.manual_seed(0)
+    DistilBertForTokenClassification(config).save_pretrained(path)
+    DistilBertTokenizerFast(str(path / "vocab.txt")).save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture
+def registry(mocker):
+    mocker.patch("spacy.load", side_effect=lambda name, **kwargs: spacy.blank(name))
+    mocker.patch.object(TransformersNlpEngine, "_download_spacy_model_if_needed")
+    return mocker.patch("core.shared_nlp_engine.model_registry", ModelRegistry())
+
+
+def create_engine(engine_class, model_path, languages=("de",), **kwargs):
+    engine = engine_class(
+        models=[
+            {"lang_code": language, "model_name": {"spacy": language, "transformers": model_path}}
+            for language in languages
+        ],
+        ner_model_configuration=NerModelConfiguration(
+            aggregation_strategy="simple",
+            alignment_mode="expand",
+            stride=4,
+            model_to_presidio_entity_mapping={"GIVENNAME1": "PERSON", "CITY": "LOCATION"},
+        ),
+        **kwargs,
+    )
+    engine.load()
+    return engine
+
+
+@pytest.mark.unit
+def test_languages_and_engines_share_the_model(model_path, registry):
+    """Test that pipelines with the same transformers model share one instance of it."""
+    engine = create_engine(SharedTransformersNlpEngine, model_path, languages=("de", "en"))
+    other_engine = create_engine(SharedTransformersNlpEngine, model_path)
+
+    hf_pipelines = [
+        nlp.get_pipe(HF_PIPE_NAME).hf_pipeline
+        for nlp in (engine.nlp["de"], engine.nlp["en"], other_engine.nlp["de"])
+    ]
+    assert hf_pipelines[0] is hf_pipelines[1] is hf_pipelines[2]
+    assert registry.report()["models"][0]["references"] == 3
+
+    for nlp in (engine.nlp["de"], engine.nlp["en"], other_engine.nlp["de"]):
+        release_pipeline(nlp)
+    assert registry.report()["models"] == []
+
+
+@pytest.mark.unit
+def test_shared_engine_matches_transformers_engine(model_path, registry):
+    """Test that the shared engine finds the same entities as Presidio's engine."""
+    shared_engine = create_engine(SharedTransformersNlpEngine, model_path)
+    transformers_engine = create_engine(TransformersNlpEngine, model_path)
+
+    shared = shared_engine.process_text(TEXT, "de")
+    expected = transformers_engine.process_text(TEXT, "de")
+
+    assert [(e.text, e.label_) for e in shared.entities] == [(e.text, e.label_) for e in expected.entities]
+    assert shared.scores == pytest.approx(expected.scores)
+
+
+@pytest.mark.unit
+def test_quantized_model_is_shared_separately(model_path, registry):
+    """Test that the quantized model is a separate instance with quantized layers."""
+    engine = create_engine(SharedTransformersNlpEngine, model_path)
+    quantized_engine = create_engine(SharedTransformersNlpEngine, model_path, quantize="int8")
+
+    model = engine.nlp["de"].get_pipe(HF_PIPE_NAME).hf_pipeline.model
+    quantized_model = quantized_engine.nlp["de"].get_pipe(HF_PIPE_NAME).hf_pipeline.model
+
+    assert model is not quantized_model
+    assert isinstance(quantized_model.classifier, torch.ao.nn.quantized.dynamic.Linear)
+    assert [model["precision"] for model in registry.report()["models"]] == ["fp32", "int8"]
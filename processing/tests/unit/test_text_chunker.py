@@ -0,0 +1,83 @@
+import pytest
+
+from core.text_chunker import SentenceWindowChunker
+
+SENTENCE = "Franz Müller wohnt in der Musterstraße 12 in Wien."  # 9 tokens
+
+
+def window_texts(text, windows):
+    return [text[start:end] for start, end in windows]
+
+
+@pytest.mark.unit
+def test_short_text_is_a_single_window():
+    """Test that a text fitting into one window is not split."""
+    chunker = SentenceWindowChunker(window_tokens=20, overlap_tokens=5)
+
+    assert chunker.split(SENTENCE) == [(0, len(SENTENCE))]
+
+
+@pytest.mark.unit
+def test_windows_end_at_sentence_boundaries():
+    """Test that windows hold whole sentences and cover the complete text."""
+    text = " ".join([SENTENCE] * 5)
+    chunker = SentenceWindowChunker(window_tokens=20, overlap_tokens=0)
+
+    windows = chunker.split(text)
+
+    assert window_texts(text, windows) == [f"{SENTENCE} {SENTENCE}", f"{SENTENCE} {SENTENCE}", SENTENCE]
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(text)
+
+
+@pytest.mark.unit
+def test_windows_share_whole_sentences():
+    """Test that consecutive windows overlap by whole sentences."""
+    text = " ".join([SENTENCE] * 4)
+    chunker = SentenceWindowChunker(window_tokens=20, overlap_tokens=10)
+
+    windows = chunker.split(text)
+
+    assert len(windows) == 3
+    for previous, current in zip(windows, windows[1:]):
+        assert current[0] < previous[1]
+        assert text[current[0]:previous[1]] == SENTENCE
+
+
+@pytest.mark.unit
+def test_long_sentence_is_cut_with_overlap():
+    """Test that a sentence longer than a window is cut between tokens with overlapping windows."""
+    text = " ".join(f"w{i}" for i in range(25))
+    chunker = SentenceWindowChunker(window_tokens=10, overlap_tokens=3)
+
+    windows = chunker.split(text)
+    texts = window_texts(text, windows)
+
+    assert all(len(window.split()) <= 10 for window in texts)
+    assert texts[0].split()[-3:] == texts[1].split()[:3]
+    assert texts[-1].endswith("w24")
+
+
+@pytest.mark.unit
+def test_windows_are_measured_in_model_tokens():
+    """Test that words making up several model tokens fill the windows faster."""
+    text = " ".join(f"w{i}" for i in range(25))
+    chunker = SentenceWindowChunker(window_tokens=10, overlap_tokens=3)
+
+    def count_tokens(words):
+        # Numbers are split into several subword tokens by the tokenizers of the NER models
+        return [3 if word.endswith("5") else 1 for word in words]
+
+    windows = chunker.split(text, count_tokens)
+
+    assert all(sum(count_tokens(window.split())) <= 10 for window in window_texts(text, windows))
+    assert any(sum(count_tokens(window.split())) > 10 for window in window_texts(text, chunker.split(text)))
+    assert chunker.split(SENTENCE, count_tokens) == [(0, len(SENTENCE))]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("window_tokens, overlap_tokens", [(0, 0), (10, 10), (10, -1)])
+def test_invalid_configuration(window_tokens, overlap_tokens):
+    """Test that invalid window settings are rejected."""
+    with pytest.raises(ValueError):
+        SentenceWindowChunker(window_tokens=window_tokens, overlap_tokens=overlap_tokens)
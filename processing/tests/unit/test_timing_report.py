@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from utils.timing_report import TimingReport
+
+
+def page_timing(total_ms, nlp_ms, flair_ms, tokens):
+    return {
+        "total_ms": total_ms,
+        "stages_ms": {"nlp_artifacts": nlp_ms, "recognizers": flair_ms},
+        "recognizers_ms": {"Flair Analytics": flair_ms},
+        "serialization_ms": 0.5,
+        "counts": {"texts": 1, "tokens": tokens},
+    }
+
+
+@pytest.mark.unit
+def test_pages_are_summed_per_document(tmp_path):
+    """Test that the stages, recognizers and counts of the pages add up per document, keeping the slowest page."""
+    report = TimingReport()
+    report.add_page("a.pdf", 0, page_timing(100.0, 60.0, 30.0, 200))
+    report.add_page("a.pdf", 1, page_timing(8000.0, 7000.0, 900.0, 900))
+    report.add_page("b.pdf", 0, page_timing(50.0, 20.0, 20.0, 100))
+
+    summary = report.documents()["a.pdf"]
+
+    assert summary["pages"] == 2
+    assert summary["total_ms"] == 8100.0
+    assert summary["slowest_page"] == 1
+    assert summary["stages_ms"] == {"nlp_artifacts": 7060.0, "recognizers": 930.0}
+    assert summary["recognizers_ms"] == {"Flair Analytics": 930.0}
+    assert summary["counts"] == {"texts": 2, "tokens": 1100}
+    assert report.documents()["b.pdf"]["pages"] == 1
+
+    formatted = report.format()
+    assert "a.pdf: 2 page(s), 8.10s" in formatted
+    assert "nlp_artifacts" in formatted and "Flair Analytics" in formatted
+
+    report.save(tmp_path / "timing_report.json")
+    assert json.loads((tmp_path / "timing_report.json").read_text()) == report.documents()
+
+
+@pytest.mark.unit
+def test_documents_are_merged_from_another_report():
+    """Test that the summaries popped from a worker's report add up in the report of the parent."""
+    worker, parent = TimingReport(), TimingReport()
+    parent.add_page("a.pdf", 0, page_timing(100.0, 60.0, 30.0, 200))
+    worker.add_page("a.pdf", 1, page_timing(300.0, 200.0, 90.0, 400))
+    worker.add_page("b.pdf", 0, page_timing(50.0, 20.0, 20.0, 100))
+
+    parent.add_documents(worker.pop_documents())
+
+    assert worker.documents() == {}
+    summary = parent.documents()["a.pdf"]
+    assert summary["pages"] == 2
+    assert summary["slowest_page"] == 1
+    assert summary["stages_ms"] == {"nlp_artifacts": 260.0, "recognizers": 120.0}
+    assert parent.documents()["b.pdf"]["counts"] == {"texts": 1, "tokens": 100}
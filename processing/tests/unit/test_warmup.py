@@ -0,0 +1,26 @@
+import pytest
+
+from core.warmup import WARMUP_TEXTS, warm_up_engine
+
+
+@pytest.mark.unit
+def test_loaded_languages_are_warmed_up(mocker):
+    """Test that only the languages loaded by the model manager are warmed up."""
+    engine = mocker.Mock(supported_languages=["de", "en", "it"])
+    engine.model_manager.loaded_languages.return_value = ["de"]
+
+    durations = warm_up_engine(engine)
+
+    assert list(durations) == ["de"]
+    engine.analyze_batch.assert_any_call(WARMUP_TEXTS["de"][:1], language="de")
+    engine.analyze_batch.assert_any_call(WARMUP_TEXTS["de"], language="de")
+
+
+@pytest.mark.unit
+def test_languages_without_texts_use_the_default_texts(mocker):
+    """Test that a language without warm-up texts is warmed up with the English texts."""
+    engine = mocker.Mock()
+
+    warm_up_engine(engine, languages=["fr"])
+
+    engine.analyze_batch.assert_called_with(WARMUP_TEXTS["en"], language="fr")
@@ -0,0 +1,387 @@
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Server errors retried with backoff, e.g. a pod restarting behind the Kubernetes service
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+# Observed pages needed before the hedging delay follows their 95th percentile
+HEDGE_MIN_SAMPLES = 20
+# The hedging delay is the 95th percentile of the latest pages, recomputed every few pages
+HEDGE_WINDOW = 1000
+HEDGE_RECOMPUTE_SAMPLES = 50
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 120.0
+
+
+def async_available() -> bool:
+    """Return whether aiohttp, needed by AsyncAnalyzerClient, is installed."""
+    return aiohttp is not None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the percentile of the values (nearest rank), 0.0 without values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class AnalyzerResponse:
+    """Response of the async analyzer client, read completely, with the interface of requests.Response used by the CLI."""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class AnalyzerConnectionError(requests.exceptions.ConnectionError):
+    """The analyzer could not be reached by the async client, after the retries."""
+
+
+class LatencyRecorder:
+    """
+    Page latencies and hedging counts of an analyzer client, with the hedging delay following them.
+
+    All latencies are kept for the stats at the end of the run. The hedging delay
+    is the 95th percentile of the latest HEDGE_WINDOW pages, recomputed every
+    HEDGE_RECOMPUTE_SAMPLES pages, so a page costs no sorting.
+
+    :param hedge: Whether slow requests are hedged.
+    :param hedge_delay: Fixed seconds after which a request is hedged, None follows the 95th percentile.
+    """
+
+    def __init__(self, hedge: bool = False, hedge_delay: Optional[float] = None):
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self._latencies: List[float] = []
+        self._window: deque = deque(maxlen=HEDGE_WINDOW)
+        self._window_p95: Optional[float] = None
+        self._since_p95 = 0
+        self._hedged = 0
+        self._hedges_won = 0
+        self._failed = 0
+        # What take_samples returned so far
+        self._taken: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def current_hedge_delay(self) -> Optional[float]:
+        """Return the seconds after which a request is hedged, None while requests are not hedged."""
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            if len(self._window) < HEDGE_MIN_SAMPLES:
+                return None
+            if self._window_p95 is None or self._since_p95 >= HEDGE_RECOMPUTE_SAMPLES:
+                self._window_p95 = percentile(list(self._window), 0.95)
+                self._since_p95 = 0
+            return self._window_p95
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of pages, their latency percentiles in milliseconds and the hedging counts."""
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {"pages": len(latencies), "failed": self._failed}
+            if self.hedge:
+                stats.update(hedged=self._hedged, hedges_won=self._hedges_won)
+        stats["latency_ms"] = {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.5) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(max(latencies, default=0.0) * 1000, 1),
+        }
+        return stats
+
+    def format_stats(self) -> str:
+        """Return the page latency stats as one readable line."""
+        stats = self.stats()
+        latency = ", ".join(f"{name} {milliseconds:.0f}ms" for name, milliseconds in stats["latency_ms"].items())
+        line = f"{stats['pages']} page(s) analyzed ({latency}), {stats['failed']} failed"
+        if self.hedge:
+            line += f", {stats['hedged']} hedged ({stats['hedges_won']} answered by the hedge)"
+        return line
+
+    def take_samples(self) -> Dict[str, Any]:
+        """Return the latencies and counts recorded since the last call, to merge them into another recorder."""
+        with self._lock:
+            counts = {"failed": self._failed, "hedged": self._hedged, "hedges_won": self._hedges_won}
+            samples = {name: value - self._taken.get(name, 0) for name, value in counts.items()}
+            samples["latencies"] = self._latencies[self._taken.get("latencies", 0):]
+            self._taken = {**counts, "latencies": len(self._latencies)}
+        return samples
+
+    def add_samples(self, samples: Dict[str, Any]) -> None:
+        """Add the samples taken from another recorder, e.g. of a worker process."""
+        with self._lock:
+            self._latencies.extend(samples["latencies"])
+            self._failed += samples["failed"]
+            self._hedged += samples["hedged"]
+            self._hedges_won += samples["hedges_won"]
+
+    def _record_latency(self, started: float) -> None:
+        self._add_latency(time.perf_counter() - started)
+
+    def _add_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self._window.append(seconds)
+            self._since_p95 += 1
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failed += 1
+
+    def _record_hedge(self, won: bool = False) -> None:
+        with self._lock:
+            if won:
+                self._hedges_won += 1
+            else:
+                self._hedged += 1
+
+
+class AnalyzerClient(LatencyRecorder):
+    """
+    HTTP client of the analyzer API, shared by all worker threads of the CLI.
+
+    Requests go through one keep-alive session, with a connection pool sized to
+    the number of worker threads. Every request has a connect and a read
+    timeout, connection errors, timeouts and 5xx responses are retried with
+    exponential backoff.
+
+    With hedging, a page not answered within the 95th percentile of the page
+    latencies observed so far (or a fixed delay) is sent a second time, and the
+    first answer is taken. This cuts the tail latency caused by a slow pod.
+    The latency of every page (retries and hedges included) is recorded for
+    the report at the end of the run.
+
+    :param url: URL of the analyze endpoint.
+    :param pool_size: Number of threads sending requests at the same time.
+    :param connect_timeout: Seconds to wait for a connection.
+    :param read_timeout: Seconds to wait for the response of a connection.
+    :param retries: Number of retries of a failed request.
+    :param backoff_factor: Backoff between retries, doubled with every retry.
+    :param hedge: Whether slow requests are hedged.
+    :param hedge_delay: Fixed seconds after which a request is hedged, None follows the 95th percentile.
+
+    :example:
+    >client = AnalyzerClient("http://localhost:5000/analyze", pool_size=8, hedge=True)
+    >response = client.post({"text": text, "language": "de"})
+    >print(client.format_stats())
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 10,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        hedge: bool = False,
+        hedge_delay: Optional[float] = None,
+    ):
+        super().__init__(hedge=hedge, hedge_delay=hedge_delay)
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Hedged requests need a second connection per worker thread
+        connections = pool_size * 2 if hedge else pool_size
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            # The analysis has no side effects, so POST is safe to retry
+            allowed_methods=None,
+            # The last response is returned after the retries, like any error response
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._hedge_executor = ThreadPoolExecutor(max_workers=connections) if hedge else None
+
+    def post(self, payload: Dict[str, Any]) -> requests.Response:
+        """
+        Send a request to the analyzer and record its latency.
+
+        :param payload: The JSON body of the request.
+        :return: The response, or the last error response after the retries.
+        :raises requests.exceptions.RequestException: If the analyzer could not be reached.
+        """
+        started = time.perf_counter()
+        try:
+            delay = self.current_hedge_delay()
+            response = self._hedged_post(payload, delay) if delay is not None else self._post(payload)
+        except requests.exceptions.RequestException:
+            self._record_failure()
+            raise
+        self._record_latency(started)
+        return response
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        if self._hedge_executor:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+    def _post(self, payload: Dict[str, Any]) -> requests.Response:
+        return self.session.post(self.url, json=payload, timeout=self.timeout)
+
+    def _hedged_post(self, payload: Dict[str, Any], delay: float) -> requests.Response:
+        first = self._hedge_executor.submit(self._post, payload)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        hedge = self._hedge_executor.submit(self._post, payload)
+        self._record_hedge()
+        pending = {first, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    # The other request may still answer
+                    error = future.exception()
+                    continue
+                if future is hedge:
+                    self._record_hedge(won=True)
+                # The slower request finishes in the background, its answer is dropped
+                return future.result()
+        raise error
+
+
+class AsyncAnalyzerClient(LatencyRecorder):
+    """
+    asyncio HTTP client of the analyzer API, for the async mode of the CLI.
+
+    Like AnalyzerClient, with aiohttp: keep-alive connections (as many as
+    requests in flight), connect and read timeouts, retries with exponential
+    backoff on connection errors, timeouts and 5xx responses, and optional
+    hedging. A hedged request losing the race is cancelled. Use it as an
+    async context manager, nested contexts share the session of the outermost
+    one, so a client can be kept open across runs of the same event loop.
+
+    :param url: URL of the analyze endpoint.
+    :param max_inflight: Number of requests sent at the same time.
+    :param connect_timeout: Seconds to wait for a connection.
+    :param read_timeout: Seconds to wait for the response of a connection.
+    :param retries: Number of retries of a failed request.
+    :param backoff_factor: Backoff between retries, doubled with every retry.
+    :param hedge: Whether slow requests are hedged.
+    :param hedge_delay: Fixed seconds after which a request is hedged, None follows the 95th percentile.
+
+    :example:
+    >async with AsyncAnalyzerClient("http://localhost:5000/analyze", max_inflight=64) as client:
+    >    response = await client.post({"text": text, "language": "de"})
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_inflight: int = 64,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        hedge: bool = False,
+        hedge_delay: Optional[float] = None,
+    ):
+        if aiohttp is None:
+            raise ImportError("The async mode requires aiohttp: pip install aiohttp")
+        super().__init__(hedge=hedge, hedge_delay=hedge_delay)
+        self.url = url
+        self.connections = max_inflight * 2 if hedge else max_inflight
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+        self._entered = 0
+
+    async def __aenter__(self) -> "AsyncAnalyzerClient":
+        if not self._entered:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections), timeout=self.timeout
+            )
+        self._entered += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._entered -= 1
+        if not self._entered:
+            await self._session.close()
+
+    async def post(self, payload: Dict[str, Any]) -> AnalyzerResponse:
+        """
+        Send a request to the analyzer and record its latency.
+
+        :param payload: The JSON body of the request.
+        :return: The response, or the last error response after the retries.
+        :raises AnalyzerConnectionError: If the analyzer could not be reached.
+        """
+        started = time.perf_counter()
+        try:
+            delay = self.current_hedge_delay()
+            response = await (self._hedged_post(payload, delay) if delay is not None else self._post(payload))
+        except AnalyzerConnectionError:
+            self._record_failure()
+            raise
+        self._record_latency(started)
+        return response
+
+    async def _post(self, payload: Dict[str, Any]) -> AnalyzerResponse:
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._session.post(self.url, json=payload) as response:
+                    result = AnalyzerResponse(response.status, await response.text())
+                if result.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise AnalyzerConnectionError(f"{type(e).__name__}: {e}") from e
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def _hedged_post(self, payload: Dict[str, Any], delay: float) -> AnalyzerResponse:
+        first = asyncio.ensure_future(self._post(payload))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        hedge = asyncio.ensure_future(self._post(payload))
+        self._record_hedge()
+        pending = {first, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    # The other request may still answer
+                    error = task.exception()
+                    continue
+                if task is hedge:
+                    self._record_hedge(won=True)
+                for other in pending:
+                    other.cancel()
+                return task.result()
+        raise error
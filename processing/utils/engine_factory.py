@@ -1,13 +1,295 @@
+from functools import partial
 from logging import Logger
 import os
 from pathlib import Path
-from presidio_analyzer import AnalyzerEngine, AnalyzerEngineProvider, LemmaContextAwareEnhancer
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from presidio_analyzer import AnalyzerEngineProvider, LemmaContextAwareEnhancer
+from presidio_analyzer.nlp_engine import (
+    NerModelConfiguration,
+    NlpEngine,
+    NlpEngineProvider,
+    TransformersNlpEngine,
+)
 import spacy
+from spacy.language import Language
 import torch
+import yaml
 from core.flair_recognizer import FlairRecognizer
+from core.guard_analyzer_engine import GuardAnalyzerEngine
+from core.language_models import LanguageModelManager, LazyModelMapping
+from core.model_registry import model_registry
+from core.onnx_nlp_engine import OnnxTransformersNlpEngine
+from core.shared_nlp_engine import SharedTransformersNlpEngine, release_pipeline
+from core.text_chunker import SentenceWindowChunker
+from utils.model_store import ModelStore, resolve_store_dir
 
+try:
+    from presidio_analyzer.input_validation import ConfigurationValidator
+except ImportError:
+    # Older Presidio versions do not validate the configuration
+    ConfigurationValidator = None
 
-def create_analyzer_engine(logger: Logger=None) -> AnalyzerEngine:
+# Section of the analyzer configuration holding the GUARD specific settings
+GUARD_CONFIGURATION_KEY = "guard"
+
+# Named overlays of the configuration (guard.profiles), and the key naming the default one
+PROFILES_KEY = "profiles"
+DEFAULT_PROFILE_KEY = "default"
+
+# Settings of the guard section shaping the NLP engine, profiles with equal settings share it
+NLP_ENGINE_SETTINGS = ("ner_backend", "quantize", "models", "onnx_cache_dir")
+
+# Backends running the transformer NER model, selected by guard.ner_backend
+NER_BACKEND_TRANSFORMERS = "transformers"
+NER_BACKEND_ONNX = "onnx"
+# Directory of the exported ONNX models, relative to the configuration file
+DEFAULT_ONNX_CACHE_DIR = "onnx_models"
+
+# Names of the models of a language in the LanguageModelManager
+NLP_MODEL_NAME = "nlp"
+FLAIR_MODEL_NAME = "flair"
+
+
+class GuardAnalyzerEngineProvider(AnalyzerEngineProvider):
+    """
+    AnalyzerEngineProvider building a GuardAnalyzerEngine from the yaml configuration.
+
+    The ``guard`` section of the configuration is unknown to Presidio, it is set
+    aside as ``guard_configuration`` before Presidio validates the rest.
+
+    With ``guard.ner_backend: onnx`` the transformer NER model is served by the
+    OnnxTransformersNlpEngine instead of Presidio's TransformersNlpEngine.
+
+    The spaCy pipelines of the NLP engine are loaded per language on first
+    use by the engine's LanguageModelManager, configured by ``guard.models``.
+    With a model store (``guard.models.store_dir`` or GUARD_MODEL_STORE), all
+    models are loaded from the store only, a missing model fails the start.
+    The transformers models are taken from the process-wide model registry,
+    so engines and languages using the same model share it.
+
+    A profile of ``guard.profiles`` is merged into the configuration before it
+    is read, e.g. to run without the Flair recognizers or with spaCy's NER
+    model only. Engines of profiles with the same NLP settings share their NLP
+    engine through ``nlp_engines``.
+
+    :param logger: Optional logger for model loads.
+    :param profile: Optional name of the profile to apply.
+    :param nlp_engines: Optional cache of the NLP engines (with their model managers)
+        by NLP settings, shared by the providers of all profiles.
+    :param kwargs: Parameters of the Presidio AnalyzerEngineProvider.
+    """
+
+    def __init__(
+        self,
+        logger: Optional[Logger] = None,
+        profile: Optional[str] = None,
+        nlp_engines: Optional[Dict[str, Tuple[NlpEngine, LanguageModelManager]]] = None,
+        **kwargs,
+    ):
+        self.logger = logger
+        self.profile = profile
+        self.nlp_engines = nlp_engines if nlp_engines is not None else {}
+        super().__init__(**kwargs)
+
+    def get_configuration(self, conf_file) -> Dict[str, Any]:
+        self.conf_file = Path(conf_file)
+        with open(conf_file) as file:
+            configuration = yaml.safe_load(file)
+
+        if self.profile:
+            profiles = (configuration.get(GUARD_CONFIGURATION_KEY) or {}).get(PROFILES_KEY) or {}
+            if self.profile not in profile_names(profiles):
+                raise ValueError(
+                    f"Unknown profile '{self.profile}'. Available: {profile_names(profiles)}"
+                )
+            configuration = merge_configuration(configuration, profiles[self.profile] or {})
+
+        self.guard_configuration = configuration.pop(GUARD_CONFIGURATION_KEY, None) or {}
+
+        if ConfigurationValidator:
+            ConfigurationValidator.validate_analyzer_configuration(configuration)
+        return configuration
+
+    def create_engine(self) -> GuardAnalyzerEngine:
+        supported_languages = self.configuration.get("supported_languages", ["en"])
+
+        store_dir = resolve_store_dir(self.conf_file, self.guard_configuration)
+        self.model_store = ModelStore(store_dir) if store_dir else None
+        if self.model_store and self.logger:
+            self.logger.info(
+                "Loading models from the model store %s: %s",
+                store_dir,
+                self.model_store.load_manifest(),
+            )
+
+        # Models are quantized as they are loaded
+        self.quantize = self.guard_configuration.get("quantize")
+        if self.quantize and torch.cuda.is_available():
+            if self.logger: self.logger.warning("Quantization '%s' skipped, it is only supported on CPU", self.quantize)
+            self.quantize = None
+
+        nlp_settings = json.dumps(
+            {
+                "nlp_configuration": self.configuration.get("nlp_configuration"),
+                "supported_languages": supported_languages,
+                **{name: self.guard_configuration.get(name) for name in NLP_ENGINE_SETTINGS},
+            },
+            sort_keys=True,
+        )
+        if nlp_settings in self.nlp_engines:
+            nlp_engine, self.model_manager = self.nlp_engines[nlp_settings]
+        else:
+            models_configuration = self.guard_configuration.get("models") or {}
+            self.model_manager = LanguageModelManager(
+                memory_budget_mb=models_configuration.get("memory_budget_mb"),
+                # Without a preload list all languages are loaded up front
+                preload=models_configuration.get("preload", supported_languages),
+                logger=self.logger,
+            )
+            nlp_engine = self._load_nlp_engine()
+            self.nlp_engines[nlp_settings] = (nlp_engine, self.model_manager)
+        default_score_threshold = self.configuration.get("default_score_threshold", 0)
+
+        registry = self._load_recognizer_registry(
+            supported_languages=supported_languages, nlp_engine=nlp_engine
+        )
+
+        chunking_configuration = self.guard_configuration.get("chunking")
+        text_chunker = (
+            SentenceWindowChunker(**chunking_configuration) if chunking_configuration else None
+        )
+
+        parallel_configuration = self.guard_configuration.get("parallel") or {}
+
+        return GuardAnalyzerEngine(
+            text_chunker=text_chunker,
+            model_manager=self.model_manager,
+            parallel_workers=parallel_configuration.get("workers", 0),
+            recognizer_timeout=parallel_configuration.get("timeout_seconds"),
+            recognizer_timeouts=parallel_configuration.get("recognizer_timeouts"),
+            nlp_engine=nlp_engine,
+            registry=registry,
+            supported_languages=supported_languages,
+            default_score_threshold=default_score_threshold,
+        )
+
+    def _load_nlp_engine(self) -> NlpEngine:
+        nlp_configuration = self.configuration.get("nlp_configuration")
+        if not nlp_configuration:
+            # Presidio's default engine, loaded up front
+            nlp_engine = super()._load_nlp_engine()
+            for nlp in nlp_engine.nlp.values():
+                self._prepare_pipeline(nlp)
+            return nlp_engine
+
+        models = nlp_configuration["models"]
+        nlp_engine = self._create_nlp_engine(models)
+        for model in models:
+            self.model_manager.register(
+                model["lang_code"],
+                NLP_MODEL_NAME,
+                partial(self._load_pipeline, model),
+                unloader=release_pipeline,
+            )
+        nlp_engine.nlp = LazyModelMapping(
+            self.model_manager, NLP_MODEL_NAME, [model["lang_code"] for model in models]
+        )
+        return nlp_engine
+
+    def _create_nlp_engine(self, models: List[Dict]) -> NlpEngine:
+        """Create the NLP engine of the configured backend for the given models, without loading them."""
+        nlp_configuration = self.configuration["nlp_configuration"]
+        nlp_engine_name = nlp_configuration.get("nlp_engine_name")
+        ner_model_configuration = nlp_configuration.get("ner_model_configuration")
+        if ner_model_configuration:
+            ner_model_configuration = NerModelConfiguration.from_dict(ner_model_configuration)
+
+        ner_backend = self.guard_configuration.get("ner_backend", NER_BACKEND_TRANSFORMERS)
+        if self.model_store:
+            models = self.model_store.resolve_nlp_models(models, onnx=ner_backend == NER_BACKEND_ONNX)
+
+        if ner_backend == NER_BACKEND_ONNX:
+            if nlp_engine_name != TransformersNlpEngine.engine_name:
+                raise ValueError("The onnx ner_backend requires the transformers nlp engine")
+            return OnnxTransformersNlpEngine(
+                models=models,
+                ner_model_configuration=ner_model_configuration,
+                cache_dir=self.model_store.onnx_dir
+                if self.model_store
+                else self.conf_file.parent
+                / self.guard_configuration.get("onnx_cache_dir", DEFAULT_ONNX_CACHE_DIR),
+                num_threads=int(os.environ.get("GUARD_TORCH_THREADS", 0)),
+            )
+        if ner_backend != NER_BACKEND_TRANSFORMERS:
+            raise ValueError(
+                f"Unsupported ner_backend '{ner_backend}'. "
+                f"Available: {[NER_BACKEND_TRANSFORMERS, NER_BACKEND_ONNX]}"
+            )
+        if nlp_engine_name == TransformersNlpEngine.engine_name:
+            return SharedTransformersNlpEngine(
+                models=models,
+                ner_model_configuration=ner_model_configuration,
+                quantize=self.quantize,
+            )
+
+        nlp_engine_class = NlpEngineProvider(nlp_configuration=nlp_configuration).nlp_engines.get(
+            nlp_engine_name
+        )
+        if not nlp_engine_class:
+            raise ValueError(
+                f"NLP engine '{nlp_engine_name}' is not available. "
+                "Make sure you have all required packages installed"
+            )
+        return nlp_engine_class(models=models, ner_model_configuration=ner_model_configuration)
+
+    def _load_pipeline(self, model: Dict) -> Language:
+        """Load the spaCy pipeline, including the NER model, of one language."""
+        nlp_engine = self._create_nlp_engine([model])
+        nlp_engine.load()
+        nlp = nlp_engine.nlp[model["lang_code"]]
+        self._prepare_pipeline(nlp)
+        return nlp
+
+    def _prepare_pipeline(self, nlp: Language) -> None:
+        # Flair predicts sentence by sentence, enable spaCy's lightweight sentence recognizer
+        # (disabled by default, the transformers engine also disables the parser)
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+
+
+def merge_configuration(configuration: Dict, overlay: Dict) -> Dict:
+    """Return the configuration with the overlay merged in: mappings are merged recursively, other values replaced."""
+    merged = dict(configuration)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_configuration(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def profile_names(profiles: Dict) -> List[str]:
+    """Return the names of the profiles of a ``guard.profiles`` section."""
+    return [name for name in profiles if name != DEFAULT_PROFILE_KEY]
+
+
+def analyzer_profiles() -> Tuple[Optional[str], List[str]]:
+    """
+    Return the default profile and all profiles of the analyzer configuration set by ANALYZER_CONF_FILE.
+
+    :return: The name of the default profile (the first profile if none is set) and the
+        names of all profiles, (None, []) if no profiles are configured.
+    """
+    with open(resolve_analyzer_conf_file()) as file:
+        configuration = yaml.safe_load(file)
+    profiles = (configuration.get(GUARD_CONFIGURATION_KEY) or {}).get(PROFILES_KEY) or {}
+    names = profile_names(profiles)
+    return profiles.get(DEFAULT_PROFILE_KEY, names[0] if names else None), names
+
+
+def resolve_analyzer_conf_file() -> Path:
+    """Return the path of the analyzer configuration file set by ANALYZER_CONF_FILE."""
     analyzer_conf_file = os.environ.get("ANALYZER_CONF_FILE")
 
     project_root = os.environ.get("PROJECT_ROOT")
@@ -21,14 +303,40 @@ def create_analyzer_engine(logger: Logger=None) -> AnalyzerEngine:
     if not resolved_path.exists():
         raise Exception(f"Configuration file {resolved_path} not found!")
 
+    return resolved_path
+
+
+def create_analyzer_engine(
+    logger: Logger=None,
+    profile: Optional[str] = None,
+    nlp_engines: Optional[Dict[str, Tuple[NlpEngine, LanguageModelManager]]] = None,
+) -> GuardAnalyzerEngine:
+    """
+    Create the analyzer engine of the configuration set by ANALYZER_CONF_FILE.
+
+    :param logger: Optional logger.
+    :param profile: Optional name of the profile of ``guard.profiles`` to apply.
+    :param nlp_engines: Optional cache of NLP engines shared by the engines of several profiles,
+        see GuardAnalyzerEngineProvider.
+    """
+    resolved_path = resolve_analyzer_conf_file()
+
     # Check if CUDA is available and prefer the GPU in spacy
     if torch.cuda.is_available():
        use_gpu = spacy.prefer_gpu()
        if logger: logger.info("Running SpaCy on GPU: %s", use_gpu)
 
-    engine = AnalyzerEngineProvider(
+    if logger and not model_registry.logger:
+        model_registry.logger = logger
+
+    provider = GuardAnalyzerEngineProvider(
         analyzer_engine_conf_file=str(resolved_path),
-    ).create_engine()
+        logger=logger,
+        profile=profile,
+        nlp_engines=nlp_engines,
+    )
+    guard_configuration = provider.guard_configuration
+    engine = provider.create_engine()
 
     # Add the context enhancer
     engine.context_aware_enhancer = LemmaContextAwareEnhancer(
@@ -36,10 +344,35 @@ def create_analyzer_engine(logger: Logger=None) -> AnalyzerEngine:
         context_suffix_count=10,
     )
 
-    # Add Flair recognizers
-    supported_languages = ["en", "de"]
-    for lang in supported_languages:
-        recognizer = FlairRecognizer(supported_language=lang)
+    # Add Flair recognizers, their models are loaded with the other models of their language
+    flair_configuration = guard_configuration.get("flair", {})
+    flair_models = (
+        {**FlairRecognizer.MODEL_LANGUAGES, **flair_configuration.get("models", {})}
+        if flair_configuration.get("enabled", True)
+        else {}
+    )
+    for lang, flair_model in flair_models.items():
+        model_path = (
+            str(provider.model_store.flair_path(flair_model)) if provider.model_store else flair_model
+        )
+        # Profiles sharing the model manager may use different Flair models
+        model_name = f"{FLAIR_MODEL_NAME}:{flair_model}"
+        engine.model_manager.register(
+            lang,
+            model_name,
+            partial(FlairRecognizer.acquire_model, lang, model_path, provider.quantize),
+            unloader=model_registry.release,
+        )
+        recognizer = FlairRecognizer(
+            supported_language=lang,
+            mini_batch_size=flair_configuration.get(
+                "mini_batch_size", FlairRecognizer.DEFAULT_MINI_BATCH_SIZE
+            ),
+            model_provider=partial(engine.model_manager.get, lang, model_name),
+        )
         engine.registry.add_recognizer(recognizer)
 
+    engine.model_manager.preload()
+
     return engine
+
@@ -1,35 +1,74 @@
+import fnmatch
+import os
+import sys
 import fitz
 from pathlib import Path
 
+DEFAULT_PATTERNS = ("*.pdf",)
+
 class FileHandler:
-    def __init__(self, path, type):
+    def __init__(self, path, type, recursive=False, patterns=None):
+        """
+        Source of the PDF files to process.
+
+        Args:
+            path: A PDF file ("file"), a directory ("dir"), or a text file listing one path per line ("list", "-" reads stdin).
+            type: "file", "dir" or "list".
+            recursive (bool): If True, directories are walked with all their subdirectories. Defaults to False.
+            patterns (List[str]): Glob patterns the file names in directories must match. Defaults to "*.pdf".
+        """
         self.path = Path(path)
         self.type = type
-    
+        self.recursive = recursive
+        self.patterns = tuple(patterns or DEFAULT_PATTERNS)
+
     def read_pdf_to_document(self, pdf_file):
         """Read PDF as a document."""
         print(f"\nReading: {pdf_file}")
         document = fitz.open(pdf_file)
         return document
         # return "\n".join([page.get_text() for page in document])
-    
+
+    def iter_paths(self):
+        """
+        Yield the paths of the PDF files one after the other, without opening them.
+        Directories and file lists are read while the paths are consumed, so millions of files start immediately.
+        """
+        if self.type == "file":
+            yield self.path
+        elif self.type == "dir":
+            yield from self._walk_directory()
+        elif self.type == "list":
+            yield from self._read_file_list()
+
     def get_document_list(self):
         """
         Read file(s) and return text content.
         returns document_list: An array consisting of fitz.document objects, representing each pdf read.
+        Opens every PDF at once, prefer iter_paths for large batches.
         """
-        document_list = []
-        if self.type == "file":
-            doc = self.read_pdf_to_document(str(self.path))
-            document_list.append(doc)
+        document_list = [self.read_pdf_to_document(str(pdf_file)) for pdf_file in self.iter_paths()]
+        if not document_list:
+            print(f"No PDF files found in {self.path}")
+        return document_list
 
-        elif self.type == "dir":
-            pdf_list = list(self.path.glob("*.pdf"))
-            if not pdf_list:
-                print(f"No PDF files found in {self.path}")
-                return document_list
-            print(f"Processing {len(pdf_list)} PDF files in {self.path}")
-            for pdf_file in pdf_list:
-                doc = self.read_pdf_to_document(str(pdf_file))
-                document_list.append(doc)
-        return document_list
\ No newline at end of file
+    def _walk_directory(self):
+        for root, directories, files in os.walk(self.path):
+            if self.recursive:
+                directories.sort()
+            else:
+                directories.clear()
+            for name in sorted(files):
+                if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns):
+                    yield Path(root) / name
+
+    def _read_file_list(self):
+        stream = sys.stdin if str(self.path) == "-" else open(self.path, encoding="utf-8")
+        try:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield Path(line)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
@@ -0,0 +1,274 @@
+"""
+Offline store of all models used by the analyzer.
+
+The store holds the spaCy pipelines, the transformers models (as safetensors,
+which are memory-mapped when loaded), the Flair taggers and optionally the
+ONNX exports, so the analyzer starts without downloads or hub lookups.
+
+Usage: python -m utils.model_store [--config CONF_FILE] [--store DIR] [--onnx]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import spacy
+import yaml
+
+from core.flair_recognizer import FlairRecognizer
+from core.onnx_nlp_engine import ONNX_MODEL_FILE, export_onnx_model
+
+logger = logging.getLogger("presidio-analyzer")
+
+MANIFEST_FILE = "manifest.json"
+FLAIR_MODEL_FILE = "model.pt"
+
+# Kinds of models in the store, each in its own subdirectory
+SPACY_MODELS = "spacy"
+TRANSFORMERS_MODELS = "transformers"
+FLAIR_MODELS = "flair"
+ONNX_MODELS = "onnx"
+
+DEFAULT_CONF_FILE = Path(__file__).parent.parent / "config" / "full_analyzer_config.yaml"
+DEFAULT_STORE_DIR = "model_store"
+
+
+class ModelStore:
+    """
+    Local directory holding every model of the analyzer under a fixed path.
+
+    ``materialize`` downloads the models once (e.g. while building the image).
+    The ``*_path`` methods resolve a model name to its directory in the store
+    and raise a FileNotFoundError if it was not materialized, so an analyzer
+    loading from the store never falls back to the network.
+
+    :param root: The directory of the store.
+
+    :example:
+    >store = ModelStore("/app/model_store")
+    >store.materialize(nlp_models, flair_models=["flair/ner-german"])
+    >tagger = SequenceTagger.load(str(store.flair_path("flair/ner-german")))
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def spacy_path(self, name: str) -> Path:
+        """Return the directory of a spaCy pipeline."""
+        return self._require(self._model_dir(SPACY_MODELS, name), name)
+
+    def transformers_path(self, name: str) -> Path:
+        """Return the directory of a transformers model and its tokenizer."""
+        return self._require(self._model_dir(TRANSFORMERS_MODELS, name), name)
+
+    def flair_path(self, name: str) -> Path:
+        """Return the file of a Flair tagger."""
+        return self._require(self._model_dir(FLAIR_MODELS, name) / FLAIR_MODEL_FILE, name)
+
+    @property
+    def onnx_dir(self) -> Path:
+        """Return the directory of the ONNX exports, the cache of the OnnxTransformersNlpEngine."""
+        return self.root / ONNX_MODELS
+
+    def require_onnx(self, name: str) -> Path:
+        """Return the directory of the ONNX export of a transformers model."""
+        return self._require(self.onnx_dir / name.replace("/", "__") / ONNX_MODEL_FILE, name).parent
+
+    def resolve_nlp_models(self, models: List[Dict], onnx: bool = False) -> List[Dict]:
+        """
+        Return the model configurations of the NLP engine with the model names replaced by their paths in the store.
+
+        :param models: The ``models`` of the ``nlp_configuration``.
+        :param onnx: Whether the transformers models are served from their ONNX export.
+            Their names are kept then, the engine finds the export in ``onnx_dir``.
+        """
+        resolved_models = []
+        for model in models:
+            model_name = model["model_name"]
+            if isinstance(model_name, dict):
+                model_name = dict(model_name, spacy=str(self.spacy_path(model_name["spacy"])))
+                if onnx:
+                    self.require_onnx(model_name["transformers"])
+                else:
+                    model_name["transformers"] = str(self.transformers_path(model_name["transformers"]))
+            else:
+                model_name = str(self.spacy_path(model_name))
+            resolved_models.append(dict(model, model_name=model_name))
+        return resolved_models
+
+    def materialize(
+        self, nlp_models: List[Dict], flair_models: Iterable[str] = (), onnx: bool = False
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Download all models into the store, skipping the ones already stored.
+
+        :param nlp_models: The ``models`` of the ``nlp_configuration``.
+        :param flair_models: Names of the Flair taggers.
+        :param onnx: Whether to export the transformers models to ONNX as well.
+        :return: The manifest of the store, also written to its directory.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifest = {SPACY_MODELS: {}, TRANSFORMERS_MODELS: {}, FLAIR_MODELS: {}, ONNX_MODELS: {}}
+        for model in nlp_models:
+            model_name = model["model_name"]
+            spacy_name = model_name["spacy"] if isinstance(model_name, dict) else model_name
+            manifest[SPACY_MODELS][spacy_name] = self._materialize(
+                SPACY_MODELS, spacy_name, lambda path, name=spacy_name: self._save_spacy(name, path)
+            )
+            if isinstance(model_name, dict):
+                transformers_name = model_name["transformers"]
+                manifest[TRANSFORMERS_MODELS][transformers_name] = self._materialize(
+                    TRANSFORMERS_MODELS,
+                    transformers_name,
+                    lambda path, name=transformers_name: self._save_transformers(name, path),
+                )
+                if onnx:
+                    export_onnx_model(transformers_name, self.onnx_dir)
+                    manifest[ONNX_MODELS][transformers_name] = str(
+                        self.require_onnx(transformers_name).relative_to(self.root)
+                    )
+
+        for flair_name in flair_models:
+            manifest[FLAIR_MODELS][flair_name] = self._materialize(
+                FLAIR_MODELS, flair_name, lambda path, name=flair_name: self._save_flair(name, path)
+            )
+
+        (self.root / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        return manifest
+
+    def load_manifest(self) -> Dict[str, Dict[str, str]]:
+        """Return the manifest written by the last ``materialize``."""
+        manifest_file = self.root / MANIFEST_FILE
+        if not manifest_file.exists():
+            raise FileNotFoundError(
+                f"No model store in {self.root}, create it with: python -m utils.model_store --store {self.root}"
+            )
+        return json.loads(manifest_file.read_text())
+
+    def _model_dir(self, kind: str, name: str) -> Path:
+        return self.root / kind / name.replace("/", "__")
+
+    def _require(self, path: Path, name: str) -> Path:
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Model '{name}' is missing in the model store {self.root}, "
+                f"add it with: python -m utils.model_store --store {self.root}"
+            )
+        return path
+
+    def _materialize(self, kind: str, name: str, save: Callable[[Path], None]) -> str:
+        """Save a model into a temporary directory and move it into the store at once."""
+        model_dir = self._model_dir(kind, name)
+        if not model_dir.exists():
+            logger.info(f"Adding {kind} model {name} to the model store {self.root}")
+            model_dir.parent.mkdir(parents=True, exist_ok=True)
+            save_dir = Path(tempfile.mkdtemp(prefix=".save-", dir=model_dir.parent))
+            try:
+                save(save_dir)
+                os.replace(save_dir, model_dir)
+            finally:
+                shutil.rmtree(save_dir, ignore_errors=True)
+        return str(model_dir.relative_to(self.root))
+
+    @staticmethod
+    def _save_spacy(name: str, path: Path) -> None:
+        if not (spacy.util.is_package(name) or Path(name).exists()):
+            spacy.cli.download(name)
+        spacy.load(name).to_disk(path)
+
+    @staticmethod
+    def _save_transformers(name: str, path: Path) -> None:
+        from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+        AutoModelForTokenClassification.from_pretrained(name).save_pretrained(
+            path, safe_serialization=True
+        )
+        AutoTokenizer.from_pretrained(name).save_pretrained(path)
+
+    @staticmethod
+    def _save_flair(name: str, path: Path) -> None:
+        from flair.models import SequenceTagger
+
+        # Flair only saves pickled torch files
+        SequenceTagger.load(name).save(path / FLAIR_MODEL_FILE)
+
+
+def resolve_store_dir(conf_file, guard_configuration: Dict) -> Optional[Path]:
+    """
+    Return the directory of the model store set by GUARD_MODEL_STORE or ``guard.models.store_dir``.
+
+    A relative ``store_dir`` is resolved against the directory of the configuration file.
+
+    :param conf_file: The analyzer configuration file.
+    :param guard_configuration: The ``guard`` section of the configuration.
+    :return: The directory, None if no model store is used.
+    """
+    store_dir = os.environ.get("GUARD_MODEL_STORE") or (
+        (guard_configuration.get("models") or {}).get("store_dir")
+    )
+    return Path(conf_file).parent / store_dir if store_dir else None
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Materialize all models referenced by the analyzer configuration into a model store."""
+    parser = argparse.ArgumentParser(description="Download all models of the analyzer into a local model store.")
+    parser.add_argument("-c", "--config", type=Path,
+                        help=f"Analyzer configuration file. Defaults to ANALYZER_CONF_FILE, else {DEFAULT_CONF_FILE}.")
+    parser.add_argument("-s", "--store", type=Path,
+                        help="Directory of the model store. Defaults to GUARD_MODEL_STORE or guard.models.store_dir "
+                             f"of the configuration, else '{DEFAULT_STORE_DIR}' next to the configuration file.")
+    parser.add_argument("--onnx", action="store_true",
+                        help="Export the transformers models to ONNX as well (for ner_backend: onnx).")
+    args = parser.parse_args(args)
+
+    from utils.engine_factory import (
+        GUARD_CONFIGURATION_KEY,
+        NER_BACKEND_ONNX,
+        PROFILES_KEY,
+        merge_configuration,
+        profile_names,
+        resolve_analyzer_conf_file,
+    )
+
+    logging.basicConfig(level=logging.INFO)
+    conf_file = args.config or (
+        resolve_analyzer_conf_file() if os.environ.get("ANALYZER_CONF_FILE") else DEFAULT_CONF_FILE
+    )
+    with open(conf_file) as file:
+        configuration = yaml.safe_load(file)
+
+    guard_configuration = configuration.get(GUARD_CONFIGURATION_KEY) or {}
+    store_dir = (
+        args.store
+        or resolve_store_dir(conf_file, guard_configuration)
+        or Path(conf_file).parent / DEFAULT_STORE_DIR
+    )
+
+    # The store serves every profile of the configuration
+    profiles = guard_configuration.get(PROFILES_KEY) or {}
+    configurations = [configuration] + [
+        merge_configuration(configuration, profiles[name] or {}) for name in profile_names(profiles)
+    ]
+    nlp_models, flair_models, onnx = [], {}, args.onnx
+    for profile_configuration in configurations:
+        nlp_models += (profile_configuration.get("nlp_configuration") or {}).get("models", [])
+        profile_guard_configuration = profile_configuration.get(GUARD_CONFIGURATION_KEY) or {}
+        flair_configuration = profile_guard_configuration.get("flair") or {}
+        if flair_configuration.get("enabled", True):
+            flair_models.update(
+                (name, None)
+                for name in {**FlairRecognizer.MODEL_LANGUAGES, **flair_configuration.get("models", {})}.values()
+            )
+        onnx = onnx or profile_guard_configuration.get("ner_backend") == NER_BACKEND_ONNX
+
+    manifest = ModelStore(store_dir).materialize(nlp_models, flair_models=flair_models, onnx=onnx)
+    print(f"Model store ready in {store_dir}:")
+    print(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
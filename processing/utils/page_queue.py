@@ -0,0 +1,102 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Page tasks queued per worker thread, so the workers never wait for the submitting thread
+PENDING_PAGES_PER_WORKER = 2
+
+
+def default_workers() -> int:
+    """Return the number of worker threads of a ThreadPoolExecutor without max_workers."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class PageWorkQueue:
+    """
+    Bounded work queue running the pages of several documents on one thread pool.
+
+    Every page of every document is a task of its own, so all workers stay
+    busy whatever the sizes of the documents are: a 400-page document is
+    analyzed by all threads at once instead of by one. Pages are submitted in
+    document order, and the submitting thread blocks while too many pages are
+    pending, so pages are only read as fast as they are analyzed.
+
+    Once all pages of a document are done, its completion callback gets their
+    results in page order, on the worker thread finishing the last page.
+
+    :param max_workers: Number of worker threads, defaults to the one of ThreadPoolExecutor.
+    :param max_pending: Pages submitted but not done yet, defaults to two per worker.
+
+    :example:
+    >with PageWorkQueue(max_workers=8) as queue:
+    >    done = queue.submit_document((partial(analyze, page.get_text()) for page in pdf), save)
+    >    done.result()
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_workers = max_workers or default_workers()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending or self.max_workers * PENDING_PAGES_PER_WORKER)
+
+    def submit_document(
+        self, pages: Iterable[Callable[[], Any]], on_complete: Callable[[List[Any]], Any]
+    ) -> Future:
+        """
+        Queue the page tasks of a document.
+
+        :param pages: One callable per page, in page order. A generator is consumed as slots get free.
+        :param on_complete: Called with the results of the pages in page order once all are done.
+        :return: Future of the return value of on_complete, or of the first exception of a page or on_complete.
+        """
+        document = {
+            "future": Future(),
+            "results": {},
+            "error": None,
+            # One for the submission itself, so the document cannot complete while pages are submitted
+            "remaining": 1,
+            "on_complete": on_complete,
+            "lock": threading.Lock(),
+        }
+        for index, page in enumerate(pages):
+            self._slots.acquire()
+            with document["lock"]:
+                document["remaining"] += 1
+            future = self._executor.submit(page)
+            future.add_done_callback(
+                lambda future, index=index: self._page_done(document, index, future)
+            )
+        self._page_done(document, None, None)
+        return document["future"]
+
+    def shutdown(self) -> None:
+        """Wait for the queued pages and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "PageWorkQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def _page_done(self, document: Dict[str, Any], index: Optional[int], future: Optional[Future]) -> None:
+        if future is not None:
+            self._slots.release()
+        with document["lock"]:
+            if future is not None:
+                if future.exception() is not None:
+                    document["error"] = document["error"] or future.exception()
+                else:
+                    document["results"][index] = future.result()
+            document["remaining"] -= 1
+            if document["remaining"]:
+                return
+
+        if document["error"] is not None:
+            document["future"].set_exception(document["error"])
+            return
+        results = [document["results"][index] for index in sorted(document["results"])]
+        try:
+            document["future"].set_result(document["on_complete"](results))
+        except Exception as e:
+            document["future"].set_exception(e)
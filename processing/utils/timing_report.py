@@ -0,0 +1,116 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+
+class TimingReport:
+    """
+    Aggregates the timing breakdowns returned by the analyzer (``"timing": true``) per document.
+
+    Pages may be added from several threads. Per document, the milliseconds of
+    every stage and recognizer and the analyzed counts are summed up, and the
+    slowest page is kept.
+
+    :example:
+    >report = TimingReport()
+    >report.add_page("contract.pdf", 0, response_json["timing"])
+    >print(report.format())
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add_page(self, document: str, page: int, timing: Dict[str, Any]) -> None:
+        """
+        Add the timing breakdown of one page.
+
+        :param document: The name of the document.
+        :param page: The number of the page, starting at 0.
+        :param timing: The ``timing`` of the analyzer response.
+        """
+        with self._lock:
+            summary = self._documents.setdefault(
+                document,
+                {
+                    "pages": 0,
+                    "total_ms": 0.0,
+                    "serialization_ms": 0.0,
+                    "slowest_page": None,
+                    "slowest_page_ms": 0.0,
+                    "stages_ms": {},
+                    "recognizers_ms": {},
+                    "counts": {},
+                },
+            )
+            summary["pages"] += 1
+            summary["total_ms"] += timing.get("total_ms", 0.0)
+            summary["serialization_ms"] += timing.get("serialization_ms", 0.0)
+            if summary["slowest_page"] is None or timing.get("total_ms", 0.0) > summary["slowest_page_ms"]:
+                summary["slowest_page"] = page
+                summary["slowest_page_ms"] = timing.get("total_ms", 0.0)
+            for name in ("stages_ms", "recognizers_ms", "counts"):
+                for key, value in timing.get(name, {}).items():
+                    summary[name][key] = summary[name].get(key, 0) + value
+
+    def pop_documents(self) -> Dict[str, Dict[str, Any]]:
+        """Return the summaries of the documents added so far and remove them, to merge them into another report."""
+        with self._lock:
+            documents, self._documents = self._documents, {}
+        return documents
+
+    def add_documents(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        """Add the summaries of documents taken from another report, e.g. of a worker process."""
+        with self._lock:
+            for document, added in documents.items():
+                summary = self._documents.get(document)
+                if summary is None:
+                    self._documents[document] = added
+                    continue
+                for key in ("pages", "total_ms", "serialization_ms"):
+                    summary[key] += added[key]
+                if added["slowest_page_ms"] > summary["slowest_page_ms"]:
+                    summary["slowest_page"] = added["slowest_page"]
+                    summary["slowest_page_ms"] = added["slowest_page_ms"]
+                for name in ("stages_ms", "recognizers_ms", "counts"):
+                    for key, value in added[name].items():
+                        summary[name][key] = summary[name].get(key, 0) + value
+
+    def documents(self) -> Dict[str, Dict[str, Any]]:
+        """Return the summary per document, with the milliseconds rounded."""
+        with self._lock:
+            return {
+                document: self._rounded(summary) for document, summary in self._documents.items()
+            }
+
+    def format(self) -> str:
+        """Return a readable report: per document the time per page and the share of each stage and recognizer."""
+        lines = []
+        for document, summary in self.documents().items():
+            total_ms = summary["total_ms"] or 1.0
+            lines.append(
+                f"{document}: {summary['pages']} page(s), {summary['total_ms'] / 1000:.2f}s "
+                f"({summary['total_ms'] / summary['pages']:.0f}ms per page, "
+                f"slowest page {summary['slowest_page']} with {summary['slowest_page_ms']:.0f}ms), "
+                f"{summary['counts'].get('tokens', 0)} tokens"
+            )
+            for name in ("stages_ms", "recognizers_ms"):
+                for key, milliseconds in sorted(summary[name].items(), key=lambda item: -item[1]):
+                    lines.append(f"    {key:<32} {milliseconds:>10.0f}ms {milliseconds / total_ms:>6.1%}")
+            lines.append(f"    {'serialization':<32} {summary['serialization_ms']:>10.0f}ms")
+        return "\n".join(lines)
+
+    def save(self, path: Path) -> None:
+        """Write the summary per document as JSON."""
+        Path(path).write_text(json.dumps(self.documents(), indent=2), encoding="utf-8")
+
+    @staticmethod
+    def _rounded(summary: Dict[str, Any]) -> Dict[str, Any]:
+        rounded = dict(summary)
+        for key in ("total_ms", "serialization_ms", "slowest_page_ms"):
+            rounded[key] = round(summary[key], 3)
+        for name in ("stages_ms", "recognizers_ms"):
+            rounded[name] = {key: round(value, 3) for key, value in summary[name].items()}
+        rounded["counts"] = dict(summary["counts"])
+        return rounded
@@ -0,0 +1,149 @@
+"""
+Compare the accuracy and speed of the analyzer engine with and without quantized models.
+
+The engine is built from the processing configuration (ANALYZER_CONF_FILE in
+processing/.env) and evaluated on a generated dataset. A second engine is built
+from a copy of the configuration with guard.quantize set and evaluated on the
+same samples. Its models are loaded separately, the model registry keys them by
+precision. A prediction counts as correct if it overlaps an annotated span of
+the same entity type.
+
+Usage:
+    python quantization_check.py --dataset experiment/data/generated_size_1500_date_April_11_2025.json --limit 300
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROCESSING_DIR = Path(__file__).resolve().parents[1] / "processing"
+
+# Needed to import the processing modules
+if str(PROCESSING_DIR) not in sys.path:
+    sys.path.insert(0, str(PROCESSING_DIR))
+
+import yaml
+from dotenv import load_dotenv
+from core.quantization import QUANTIZATION_DTYPES
+from utils.engine_factory import GUARD_CONFIGURATION_KEY, create_analyzer_engine, resolve_analyzer_conf_file
+
+DEFAULT_DATASET = Path(__file__).parent / "experiment" / "data" / "generated_size_1500_date_April_11_2025.json"
+
+# Dataset entity types named differently by the analyzer
+ENTITIES_MAPPING = {
+    "STREET_ADDRESS": "LOCATION",
+}
+
+
+def load_dataset(path: Path, limit: int = None) -> List[Dict]:
+    """Load the samples of a generated dataset, with entity types aligned to the analyzer."""
+    with open(path, encoding="utf-8") as file:
+        samples = json.load(file)[:limit]
+    for sample in samples:
+        for span in sample["spans"]:
+            span["entity_type"] = ENTITIES_MAPPING.get(span["entity_type"], span["entity_type"])
+    return samples
+
+
+def write_quantized_configuration(conf_file: Path, mode: str) -> Path:
+    """Write a copy of the analyzer configuration with guard.quantize set, next to it so relative paths still resolve."""
+    with open(conf_file, encoding="utf-8") as file:
+        configuration = yaml.safe_load(file)
+    configuration[GUARD_CONFIGURATION_KEY] = {**(configuration.get(GUARD_CONFIGURATION_KEY) or {}), "quantize": mode}
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=conf_file.parent, prefix=f"{conf_file.stem}_{mode}_", suffix=".yaml", delete=False
+    ) as file:
+        yaml.safe_dump(configuration, file)
+    return Path(file.name)
+
+
+def warm_up(engine, samples: List[Dict], language: str) -> None:
+    """Analyze a few samples, so the evaluation does not pay for loading the models."""
+    engine.analyze_batch([sample["full_text"] for sample in samples[:8]], language=language)
+
+
+def evaluate(engine, samples: List[Dict], language: str) -> Tuple[Dict[str, Dict[str, float]], float]:
+    """Return the precision, recall and F1 per entity type (and overall), and the analysis time in seconds."""
+    entities = sorted({span["entity_type"] for sample in samples for span in sample["spans"]})
+    true_positives, false_positives, false_negatives = Counter(), Counter(), Counter()
+
+    start = time.perf_counter()
+    predictions = engine.analyze_batch(
+        [sample["full_text"] for sample in samples], language=language, entities=entities
+    )
+    duration = time.perf_counter() - start
+
+    for sample, results in zip(samples, predictions):
+        spans = sample["spans"]
+        for result in results:
+            if any(_overlaps(result, span) for span in spans):
+                true_positives[result.entity_type] += 1
+            else:
+                false_positives[result.entity_type] += 1
+        for span in spans:
+            if not any(_overlaps(result, span) for result in results):
+                false_negatives[span["entity_type"]] += 1
+
+    scores = {
+        entity: _scores(true_positives[entity], false_positives[entity], false_negatives[entity])
+        for entity in entities
+    }
+    scores["ALL"] = _scores(
+        sum(true_positives.values()), sum(false_positives.values()), sum(false_negatives.values())
+    )
+    return scores, duration
+
+
+def _overlaps(result, span: Dict) -> bool:
+    return (
+        result.entity_type == span["entity_type"]
+        and result.start < span["end_position"]
+        and span["start_position"] < result.end
+    )
+
+
+def _scores(true_positives: int, false_positives: int, false_negatives: int) -> Dict[str, float]:
+    precision = true_positives / (true_positives + false_positives) if true_positives else 0.0
+    recall = true_positives / (true_positives + false_negatives) if true_positives else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def print_comparison(baseline: Dict, quantized: Dict, baseline_time: float, quantized_time: float):
+    print(f"{'Entity':<20} {'F1 baseline':>12} {'F1 quantized':>13} {'Delta':>8}")
+    for entity in baseline:
+        delta = quantized[entity]["f1"] - baseline[entity]["f1"]
+        print(f"{entity:<20} {baseline[entity]['f1']:>12.3f} {quantized[entity]['f1']:>13.3f} {delta:>+8.3f}")
+    print(f"\nAnalysis time: {baseline_time:.1f}s baseline, {quantized_time:.1f}s quantized "
+          f"(speedup {baseline_time / quantized_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the analyzer with and without quantized models.")
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET, help="Generated dataset (JSON).")
+    parser.add_argument("--language", default="de", help="Language of the dataset.")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N samples.")
+    parser.add_argument("--mode", default="int8", choices=list(QUANTIZATION_DTYPES), help="Quantization mode.")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=PROCESSING_DIR / ".env")
+    samples = load_dataset(args.dataset, args.limit)
+    engine = create_analyzer_engine()
+    warm_up(engine, samples, args.language)
+    baseline, baseline_time = evaluate(engine, samples, args.language)
+
+    quantized_conf_file = write_quantized_configuration(resolve_analyzer_conf_file(), args.mode)
+    try:
+        os.environ["ANALYZER_CONF_FILE"] = str(quantized_conf_file)
+        quantized_engine = create_analyzer_engine()
+        warm_up(quantized_engine, samples, args.language)
+        quantized, quantized_time = evaluate(quantized_engine, samples, args.language)
+    finally:
+        quantized_conf_file.unlink()
+
+    print_comparison(baseline, quantized, baseline_time, quantized_time)